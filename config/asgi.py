@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Variantes async de las APIs (ver PORTFOLIOS_ASYNC_APIS)
+os.environ.setdefault('PORTFOLIOS_ASYNC_APIS', '1')
 
 application = get_asgi_application()
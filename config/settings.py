@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero: mide todo el request (incluido el resto de los middlewares)
+    'portfolios.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +90,28 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Resultados de portfolio_timeseries, versionados por Portfolio.data_version.
+    # CULL_FREQUENCY == MAX_ENTRIES: al llenarse se desaloja solo la entrada
+    # menos usada (LRU estricto) en vez de un tercio de la cache.
+    'timeseries': {
+        'BACKEND': 'portfolios.cache.CountingLocMemCache',
+        'LOCATION': 'portfolios-timeseries',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 256,
+            'CULL_FREQUENCY': 256,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -123,3 +148,31 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+
+
+# Portfolios
+# Motor por defecto de portfolio_timeseries: "decimal" (referencia) o "numpy"
+PORTFOLIOS_TIMESERIES_ENGINE = "decimal"
+# Alias de CACHES usado por portfolio_timeseries_cached
+PORTFOLIOS_TIMESERIES_CACHE = "timeseries"
+# Instrumentacion por request (portfolios.instrumentation.PerformanceMiddleware)
+PORTFOLIOS_SERVER_TIMING = True
+# Requests mas lentos que esto (ms) loguean sus queries mas lentas; None desactiva
+PORTFOLIOS_SLOW_REQUEST_MS = 1000
+PORTFOLIOS_SLOW_REQUEST_QUERIES = 5
+# Perfiles bajo demanda (cProfile + tracemalloc) de requests de staff con
+# `X-Profile: 1` o `?profile=1`; ver `python manage.py profiles`
+PORTFOLIOS_PROFILING_ENABLED = False
+PORTFOLIOS_PROFILING_DIR = BASE_DIR / "profiles"
+PORTFOLIOS_PROFILING_TOP_ALLOCATIONS = 25
+# Vistas async de las APIs: dispatch y computo en pools de hilos acotados
+# (portfolios.executors). config/asgi.py las activa; WSGI usa las sync
+PORTFOLIOS_ASYNC_APIS = os.environ.get("PORTFOLIOS_ASYNC_APIS", "0") == "1"
+# Hilos por pool: "compute" (timeseries, analytics, trades) y "default"
+PORTFOLIOS_ASYNC_POOLS = {"compute": 4, "default": 8}
+# Jobs de timeseries (POST .../timeseries/jobs/): "process" los corre en un
+# pool de procesos local; "worker" solo los encola para `manage.py timeseries_worker`
+PORTFOLIOS_TIMESERIES_JOBS = "process"
+PORTFOLIOS_TIMESERIES_JOB_PROCESSES = 2
+# Un job RUNNING (o PENDING) mas viejo que esto se marca FAILED y no se reutiliza
+PORTFOLIOS_TIMESERIES_JOB_LEASE_SECONDS = 3600
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+from portfolios.executors import POOL_DEFAULT, run_in_pool
+from portfolios.instrumentation import serializing
+
+
+# Respuestas streaming: los chunks se agrupan hasta este tamano antes de
+# pasar al event loop, con a lo sumo STREAM_BUFFER_CHUNKS en transito
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_BUFFER_CHUNKS = 16
+
+_END = object()
+
+
+def async_api(view_class, *, pool: str = POOL_DEFAULT, **initkwargs):
+    """
+    Variante async de una APIView sync: dispatch (ORM + computo) y render
+    corren en un hilo del pool `pool`, sin ocupar el hilo sync compartido
+    de ASGI. Las respuestas streaming se generan completas en ese mismo hilo
+    (cursores y conexion no cambian de hilo) y llegan al event loop por un
+    buffer acotado.
+    """
+    sync_view = view_class.as_view(**initkwargs)
+
+    async def view(request, *args, **kwargs):
+        relay = _StreamRelay(asyncio.get_running_loop())
+        job = asyncio.ensure_future(
+            run_in_pool(pool, _serve, sync_view, relay, request, *args, **kwargs)
+        )
+        streamed = asyncio.ensure_future(relay.get())
+        await asyncio.wait({job, streamed}, return_when=asyncio.FIRST_COMPLETED)
+
+        # El job retorna la respuesta salvo en streaming (la entrega el relay)
+        if job.done() and (job.exception() is not None or job.result() is not None):
+            streamed.cancel()
+            return job.result()
+
+        response = await streamed
+        response.streaming_content = relay.chunks(job)
+        return response
+
+    view.cls = view_class
+    view.initkwargs = initkwargs
+    # Igual que APIView.as_view: el CSRF lo aplica la autenticacion de DRF
+    view.csrf_exempt = True
+    return view
+
+
+def _serve(sync_view, relay: "_StreamRelay", request, *args, **kwargs):
+    response = sync_view(request, *args, **kwargs)
+    if not response.streaming:
+        if hasattr(response, "render"):
+            with serializing():
+                response.render()
+        return response
+
+    # Se toma el iterador antes de entregar la respuesta (la vista lo reemplaza)
+    content = response.streaming_content
+    relay.send(response)
+    try:
+        pending, size = [], 0
+        for chunk in content:
+            if relay.closed.is_set():
+                return None
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_BYTES:
+                relay.send(b"".join(pending))
+                pending, size = [], 0
+        if pending:
+            relay.send(b"".join(pending))
+    finally:
+        relay.send(_END)
+    return None
+
+
+class _StreamRelay:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+        self.closed = threading.Event()
+
+    def send(self, item) -> None:
+        # Desde el hilo del pool: bloquea mientras el buffer esta lleno
+        if self.closed.is_set():
+            return
+        asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop).result()
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def chunks(self, job: asyncio.Future):
+        try:
+            while (chunk := await self.queue.get()) is not _END:
+                yield chunk
+        finally:
+            # Cliente desconectado: el hilo deja de generar y termina. Vaciar
+            # el buffer libera un send() bloqueado; despues de closed no hay
+            # mas que uno en vuelo
+            self.closed.set()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            await job
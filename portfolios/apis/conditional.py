@@ -0,0 +1,38 @@
+import hashlib
+from functools import wraps
+from typing import Callable
+
+from django.views.decorators.http import condition
+
+from portfolios.selectors.versions import DataVersion
+
+
+def conditional_get(version_func: Callable[..., DataVersion | None]):
+    """
+    Decorador del `get` de una APIView: ETag fuerte y Last-Modified a partir
+    de la version de los datos (`version_func(view, request, *args, **kwargs)`).
+    Un request con If-None-Match / If-Modified-Since vigente recibe 304 sin
+    ejecutar la vista. El ETag incluye path, query string y formato
+    negociado: distintas representaciones no comparten ETag.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            version = version_func(self, request, *args, **kwargs)
+            if version is None:
+                # Sin datos (p.ej. 404): respuesta normal, sin validadores
+                return method(self, request, *args, **kwargs)
+
+            query = sorted(request.GET.lists())
+            representation = f"{version.tag}|{request.path}|{query}|{request.accepted_renderer.format}"
+            etag = hashlib.sha256(representation.encode()).hexdigest()[:32]
+
+            def view(request, *args, **kwargs):
+                return method(self, request, *args, **kwargs)
+
+            return condition(
+                etag_func=lambda *a, **k: etag,
+                last_modified_func=lambda *a, **k: version.last_modified,
+            )(view)(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,14 +1,17 @@
+from functools import cached_property
+
 from rest_framework import serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from portfolios.apis.conditional import conditional_get
 from portfolios.models import (
     Asset,
-    DataImport,
     InitialHolding,
     Portfolio,
     Price,
 )
+from portfolios.selectors.versions import import_data_version, latest_data_import
 
 
 class LatestImportStatusApi(APIView):
@@ -20,25 +23,42 @@ class LatestImportStatusApi(APIView):
         rows_inserted = serializers.IntegerField()
         rows_updated = serializers.IntegerField()
         notes = serializers.CharField(allow_blank=True)
+        # Por fase (hash, read, assets, prices, holdings): seconds, rows, rows_per_sec, peak_alloc_kb
+        metrics = serializers.JSONField()
         assets = serializers.IntegerField()
         prices = serializers.IntegerField()
         holdings = serializers.IntegerField()
         portfolios = serializers.IntegerField()
 
+    @cached_property
+    def latest(self):
+        # Una sola lectura para el ETag y el payload (la vista es por request)
+        return latest_data_import()
+
+    @conditional_get(lambda view, request: import_data_version(data_import=view.latest))
     def get(self, request):
-        latest = DataImport.objects.order_by("-imported_at").first()
+        latest = self.latest
         if not latest:
             return Response(
                 {"detail": "No hay importaciones registradas"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        metrics = {
-            "assets": Asset.objects.count(),
-            "prices": Price.objects.count(),
-            "holdings": InitialHolding.objects.count(),
-            "portfolios": Portfolio.objects.count(),
+        # Totales registrados por el ETL (una sola lectura por indice). Solo
+        # los imports anteriores a esos campos caen en los COUNT(*)
+        totals = {
+            "assets": latest.assets_total,
+            "prices": latest.prices_total,
+            "holdings": latest.holdings_total,
+            "portfolios": latest.portfolios_total,
         }
+        if None in totals.values():
+            totals = {
+                "assets": Asset.objects.count(),
+                "prices": Price.objects.count(),
+                "holdings": InitialHolding.objects.count(),
+                "portfolios": Portfolio.objects.count(),
+            }
 
         payload = {
             "source_name": latest.source_name,
@@ -48,7 +68,8 @@ class LatestImportStatusApi(APIView):
             "rows_inserted": latest.rows_inserted,
             "rows_updated": latest.rows_updated,
             "notes": latest.notes,
-            **metrics,
+            "metrics": latest.metrics,
+            **totals,
         }
 
         serializer = self.OutputSerializer(payload)
@@ -0,0 +1,55 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError, NotFound
+
+from portfolios.models import Portfolio
+from portfolios.services.analytics import DEFAULT_ROLLING_WINDOW, portfolio_analytics
+from portfolios.services.timeseries import ENGINES
+
+
+class PortfolioAnalyticsApi(APIView):
+    class InputSerializer(serializers.Serializer):
+        start = serializers.DateField()
+        end = serializers.DateField()
+        engine = serializers.ChoiceField(choices=ENGINES, required=False)
+        # Largo de la ventana movil (en observaciones)
+        window = serializers.IntegerField(
+            required=False, default=DEFAULT_ROLLING_WINDOW, min_value=2, max_value=1000
+        )
+
+        def validate(self, data):
+            start, end = data["start"], data["end"]
+            if start > end:
+                raise ValidationError({"start": "el rango es invalido (start > end)"})
+
+            portfolio: Portfolio | None = self.context.get("portfolio")
+            if portfolio and start < portfolio.start_date:
+                raise ValidationError({"start": "fecha inicial no disponible"})
+            return data
+
+    def get(self, request, portfolio_id: int):
+        portfolio = Portfolio.objects.filter(id=portfolio_id).first()
+        if not portfolio:
+            raise NotFound(f"Portfolio {portfolio_id} no existe")
+
+        input_serializer = self.InputSerializer(
+            data=request.query_params, context={"portfolio": portfolio}
+        )
+        input_serializer.is_valid(raise_exception=True)
+
+        params = input_serializer.validated_data
+
+        try:
+            data = portfolio_analytics(
+                portfolio=portfolio,
+                start=params["start"],
+                end=params["end"],
+                engine=params.get("engine"),
+                window=params["window"],
+            )
+        except ValueError as exc:
+            # Map domain errors to a 400 for clearer API responses
+            raise ValidationError({"detail": str(exc)})
+
+        return Response(data, status=status.HTTP_200_OK)
@@ -1,16 +1,38 @@
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.renderers import JSONRenderer
 
+from portfolios.apis.conditional import conditional_get
+from portfolios.apis.profiling import ProfilingMixin
+from portfolios.apis.renderers import ColumnarJSONRenderer, NpzRenderer
+from portfolios.apis.utils import stream_json_object
 from portfolios.models import Portfolio
-from portfolios.services.timeseries import portfolio_timeseries
+from portfolios.selectors.versions import portfolio_data_version
+from portfolios.services.timeseries import (
+    ENGINES,
+    FREQ_DAILY,
+    FREQUENCIES,
+    portfolio_timeseries_stream,
+)
+from portfolios.services.timeseries_cache import portfolio_timeseries_cached
 
 
-class PortfolioTimeseriesApi(APIView):
+class PortfolioTimeseriesApi(ProfilingMixin, APIView):
+    # ?format=json (filas, por defecto) | columnar | npz
+    renderer_classes = [JSONRenderer, ColumnarJSONRenderer, NpzRenderer]
+    COLUMNAR_FORMATS = (ColumnarJSONRenderer.format, NpzRenderer.format)
+
     class InputSerializer(serializers.Serializer):
         start = serializers.DateField()
         end = serializers.DateField()
+        engine = serializers.ChoiceField(choices=ENGINES, required=False)
+        # D (todas las fechas) | W | M | Q (solo cierres de periodo)
+        freq = serializers.ChoiceField(choices=FREQUENCIES, required=False, default=FREQ_DAILY)
+        # Emite las filas a medida que se calculan (sin pasar por la cache)
+        stream = serializers.BooleanField(required=False, default=False)
 
         def validate(self, data):
             start, end = data["start"], data["end"]
@@ -20,6 +42,9 @@ class PortfolioTimeseriesApi(APIView):
             portfolio: Portfolio | None = self.context.get("portfolio")
             if portfolio and start < portfolio.start_date:
                 raise ValidationError({"start": "fecha inicial no disponible"})
+
+            if data["stream"] and self.context.get("columnar"):
+                raise ValidationError({"stream": "solo disponible para el formato de filas"})
             return data
 
     def get_portfolio(self, portfolio_id: int) -> Portfolio:
@@ -28,20 +53,41 @@ class PortfolioTimeseriesApi(APIView):
             raise NotFound(f"Portfolio {portfolio_id} no existe")
         return portfolio
 
+    # 304 (If-None-Match / If-Modified-Since) antes de calcular la serie
+    @conditional_get(lambda view, request, portfolio_id: portfolio_data_version(portfolio_id=portfolio_id))
     def get(self, request, portfolio_id: int):
         portfolio = self.get_portfolio(portfolio_id)
+        columnar = request.accepted_renderer.format in self.COLUMNAR_FORMATS
 
         input_serializer = self.InputSerializer(
             data=request.query_params,
-            context={"portfolio": portfolio},
+            context={"portfolio": portfolio, "columnar": columnar},
         )
         input_serializer.is_valid(raise_exception=True)
 
+        params = input_serializer.validated_data
+
         try:
-            data = portfolio_timeseries(
-                portfolio_id=portfolio_id,
-                start=input_serializer.validated_data["start"],
-                end=input_serializer.validated_data["end"],
+            if params["stream"]:
+                header, rows = portfolio_timeseries_stream(
+                    portfolio_id=portfolio_id,
+                    start=params["start"],
+                    end=params["end"],
+                    engine=params.get("engine"),
+                    freq=params["freq"],
+                )
+                return StreamingHttpResponse(
+                    stream_json_object(header=header, key="rows", items=rows),
+                    content_type="application/json",
+                )
+
+            data = portfolio_timeseries_cached(
+                portfolio=portfolio,
+                start=params["start"],
+                end=params["end"],
+                engine=params.get("engine"),
+                freq=params["freq"],
+                columnar=columnar,
             )
         except ValueError as exc:
             # Map domain errors to a 400 for clearer API responses
@@ -4,11 +4,12 @@ from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError as DRFValidationError
 from django.core.exceptions import ValidationError as DjangoValidationError
 
+from portfolios.apis.profiling import ProfilingMixin
 from portfolios.apis.utils import inline_serializer
 from portfolios.services.trades import trade_create, TradeLegInput
 
 
-class PortfolioTradeCreateApi(APIView):
+class PortfolioTradeCreateApi(ProfilingMixin, APIView):
     class InputSerializer(serializers.Serializer):
         date = serializers.DateField()
         legs = inline_serializer(
@@ -0,0 +1,71 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError, NotFound
+
+from portfolios.models import Portfolio
+from portfolios.services.timeseries import ENGINES, portfolios_timeseries
+
+
+class PortfoliosTimeseriesBatchApi(APIView):
+    # Limite de portafolios por request (la respuesta no se pagina)
+    MAX_PORTFOLIOS = 50
+
+    class InputSerializer(serializers.Serializer):
+        # ids separados por coma: ?ids=1,2,3
+        ids = serializers.CharField()
+        start = serializers.DateField()
+        end = serializers.DateField()
+        engine = serializers.ChoiceField(choices=ENGINES, required=False)
+
+        def validate_ids(self, value: str) -> list[int]:
+            try:
+                ids = [int(part) for part in value.split(",") if part.strip()]
+            except ValueError:
+                raise ValidationError("lista de ids invalida")
+            if not ids:
+                raise ValidationError("se requiere al menos un id")
+            if len(ids) > PortfoliosTimeseriesBatchApi.MAX_PORTFOLIOS:
+                raise ValidationError(
+                    f"maximo {PortfoliosTimeseriesBatchApi.MAX_PORTFOLIOS} portafolios por request"
+                )
+            # Sin duplicados, preservando el orden pedido
+            return list(dict.fromkeys(ids))
+
+        def validate(self, data):
+            if data["start"] > data["end"]:
+                raise ValidationError({"start": "el rango es invalido (start > end)"})
+            return data
+
+    def get(self, request):
+        input_serializer = self.InputSerializer(data=request.query_params)
+        input_serializer.is_valid(raise_exception=True)
+
+        params = input_serializer.validated_data
+        ids = params["ids"]
+
+        portfolios = Portfolio.objects.in_bulk(ids)
+        missing = [pid for pid in ids if pid not in portfolios]
+        if missing:
+            raise NotFound(f"Portfolio {', '.join(map(str, missing))} no existe")
+
+        if any(params["start"] < p.start_date for p in portfolios.values()):
+            raise ValidationError({"start": "fecha inicial no disponible"})
+
+        try:
+            series = portfolios_timeseries(
+                portfolio_ids=ids,
+                start=params["start"],
+                end=params["end"],
+                engine=params.get("engine"),
+            )
+        except ValueError as exc:
+            # Map domain errors to a 400 for clearer API responses
+            raise ValidationError({"detail": str(exc)})
+
+        data = {
+            "start": params["start"].isoformat(),
+            "end": params["end"].isoformat(),
+            "portfolios": series,
+        }
+        return Response(data, status=status.HTTP_200_OK)
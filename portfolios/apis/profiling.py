@@ -0,0 +1,23 @@
+from portfolios.profiling import profile_request, profiling_enabled, profiling_requested
+
+
+class ProfilingMixin:
+    """
+    Perfila el request (cProfile + tracemalloc) si la captura esta habilitada
+    por setting y un usuario staff la pide con `X-Profile: 1` o `?profile=1`.
+    Deshabilitado, solo agrega la lectura del setting.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not profiling_enabled() or not profiling_requested(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        def call():
+            response = super(ProfilingMixin, self).dispatch(request, *args, **kwargs)
+            # El render (serializacion) tambien forma parte del perfil
+            if not response.streaming and hasattr(response, "render"):
+                response.render()
+            return response
+
+        label = "-".join([self.__class__.__name__, *map(str, kwargs.values())])
+        return profile_request(label=label, request=request, call=call)
@@ -0,0 +1,50 @@
+import io
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    JSON seleccionado con ?format=columnar. El renderer es el mismo JSON;
+    la vista arma el payload columnar (dates / V / weights como matriz).
+    """
+    format = "columnar"
+
+
+class NpzRenderer(BaseRenderer):
+    """
+    Serie columnar como archivo NumPy .npz sin comprimir (?format=npz):
+    `assets`, `dates` (datetime64[D]), `V` (float64) y `weights`
+    (float64, fechas x assets). Se carga con np.load sin parsear JSON.
+
+    Las respuestas de error se emiten como JSON.
+    """
+    media_type = "application/octet-stream"
+    format = "npz"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        response = (renderer_context or {}).get("response")
+        if response is not None and response.status_code >= 400:
+            response["Content-Type"] = JSONRenderer.media_type
+            return JSONRenderer().render(data)
+
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            portfolio_id=np.array(data["portfolio_id"]),
+            start=np.array(data["start"], dtype="datetime64[D]"),
+            end=np.array(data["end"], dtype="datetime64[D]"),
+            assets=np.array(data["assets"], dtype=str),
+            dates=np.array(data["dates"], dtype="datetime64[D]"),
+            V=np.array(data["V"], dtype=np.float64),
+            weights=np.array(data["weights"], dtype=np.float64).reshape(
+                len(data["dates"]), len(data["assets"])
+            ),
+        )
+        return buffer.getvalue()
@@ -0,0 +1,19 @@
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from portfolios.services.timeseries_cache import timeseries_cache_stats
+
+
+class TimeseriesCacheStatsApi(APIView):
+    class OutputSerializer(serializers.Serializer):
+        hits = serializers.IntegerField()
+        misses = serializers.IntegerField()
+        hit_rate = serializers.FloatField()
+        evictions = serializers.IntegerField(allow_null=True)
+        entries = serializers.IntegerField(allow_null=True)
+        max_entries = serializers.IntegerField(allow_null=True)
+
+    def get(self, request):
+        serializer = self.OutputSerializer(timeseries_cache_stats())
+        return Response(serializer.data, status=status.HTTP_200_OK)
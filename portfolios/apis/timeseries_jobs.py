@@ -0,0 +1,124 @@
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.http import HttpResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError, NotFound
+
+from portfolios.models import Portfolio, TimeseriesJob
+from portfolios.services.timeseries import ENGINES, FREQ_DAILY, FREQUENCIES
+from portfolios.services.timeseries_jobs import (
+    timeseries_job_create,
+    timeseries_job_is_stale,
+    timeseries_jobs_expire,
+)
+
+
+def _job_url(job: TimeseriesJob) -> str:
+    return f"/api/portfolios/{job.portfolio_id}/timeseries/jobs/{job.id}/"
+
+
+class TimeseriesJobOutputSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    portfolio_id = serializers.IntegerField()
+    status = serializers.CharField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    engine = serializers.CharField()
+    freq = serializers.CharField()
+    data_version = serializers.IntegerField()
+    error = serializers.CharField(allow_blank=True)
+    created_at = serializers.DateTimeField()
+    started_at = serializers.DateTimeField(allow_null=True)
+    finished_at = serializers.DateTimeField(allow_null=True)
+    status_url = serializers.SerializerMethodField()
+    # Solo con status SUCCESS
+    result_url = serializers.SerializerMethodField()
+
+    def get_status_url(self, job: TimeseriesJob) -> str:
+        return _job_url(job)
+
+    def get_result_url(self, job: TimeseriesJob) -> str | None:
+        return f"{_job_url(job)}result/" if job.status == TimeseriesJob.SUCCESS else None
+
+
+class PortfolioTimeseriesJobCreateApi(APIView):
+    class InputSerializer(serializers.Serializer):
+        start = serializers.DateField()
+        end = serializers.DateField()
+        engine = serializers.ChoiceField(choices=ENGINES, required=False)
+        freq = serializers.ChoiceField(choices=FREQUENCIES, required=False, default=FREQ_DAILY)
+
+        def validate(self, data):
+            start, end = data["start"], data["end"]
+            if start > end:
+                raise ValidationError({"start": "el rango es invalido (start > end)"})
+
+            portfolio: Portfolio | None = self.context.get("portfolio")
+            if portfolio and start < portfolio.start_date:
+                raise ValidationError({"start": "fecha inicial no disponible"})
+            return data
+
+    def post(self, request, portfolio_id: int):
+        portfolio = Portfolio.objects.filter(id=portfolio_id).first()
+        if not portfolio:
+            raise NotFound(f"Portfolio {portfolio_id} no existe")
+
+        input_serializer = self.InputSerializer(data=request.data, context={"portfolio": portfolio})
+        input_serializer.is_valid(raise_exception=True)
+
+        params = input_serializer.validated_data
+        try:
+            job = timeseries_job_create(
+                portfolio=portfolio,
+                start=params["start"],
+                end=params["end"],
+                engine=params.get("engine"),
+                freq=params["freq"],
+            )
+        except ValueError as exc:
+            raise ValidationError({"detail": str(exc)})
+
+        # 200 si el resultado ya estaba calculado (mismos parametros y datos)
+        code = status.HTTP_200_OK if job.status == TimeseriesJob.SUCCESS else status.HTTP_202_ACCEPTED
+        return Response(
+            TimeseriesJobOutputSerializer(job).data,
+            status=code,
+            headers={"Location": _job_url(job)},
+        )
+
+
+class TimeseriesJobDetailApi(APIView):
+    def get(self, request, portfolio_id: int, job_id):
+        # Sin el resultado: consultar el estado es leer una fila chica
+        job = TimeseriesJob.objects.filter(id=job_id, portfolio_id=portfolio_id).defer("result").first()
+        if not job:
+            raise NotFound(f"Job {job_id} no existe")
+        if timeseries_job_is_stale(job):
+            # Lease vencido: se informa FAILED en vez de dejar al cliente esperando
+            timeseries_jobs_expire(job_id=job.id)
+            job.refresh_from_db()
+        return Response(TimeseriesJobOutputSerializer(job).data, status=status.HTTP_200_OK)
+
+
+class TimeseriesJobResultApi(APIView):
+    def get(self, request, portfolio_id: int, job_id):
+        row = (
+            TimeseriesJob.objects.filter(id=job_id, portfolio_id=portfolio_id)
+            .annotate(raw=Cast("result", output_field=TextField()))
+            .values_list("status", "raw")
+            .first()
+        )
+        if not row:
+            raise NotFound(f"Job {job_id} no existe")
+
+        job_status, raw = row
+        if job_status != TimeseriesJob.SUCCESS:
+            return Response(
+                {"detail": "el resultado aun no esta disponible", "status": job_status},
+                status=status.HTTP_409_CONFLICT,
+            )
+        # El JSON persistido se entrega tal cual (mismo contrato que /timeseries/),
+        # sin decodificarlo ni volver a serializarlo
+        return HttpResponse(raw, content_type="application/json")
@@ -0,0 +1,42 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+from portfolios.services.trades_bulk import trade_row_parse, trades_bulk_create
+
+
+class TradesBulkCreateApi(APIView):
+    class InputSerializer(serializers.Serializer):
+        # Cada fila se valida por separado para poder rechazarla sola.
+        # Tope por request; cargas mayores via `manage.py load_trades`
+        trades = serializers.ListField(
+            child=serializers.DictField(), allow_empty=False, max_length=10000
+        )
+        strict = serializers.BooleanField(required=False, default=False)
+
+    class OutputSerializer(serializers.Serializer):
+        created = serializers.IntegerField()
+        rejected = serializers.ListField(child=serializers.DictField())
+
+    def post(self, request):
+        input_serializer = self.InputSerializer(data=request.data)
+        input_serializer.is_valid(raise_exception=True)
+
+        params = input_serializer.validated_data
+        # Filas numeradas desde 1 segun su posicion en "trades"
+        rows = [trade_row_parse(row=i, raw=raw) for i, raw in enumerate(params["trades"], start=1)]
+
+        try:
+            result = trades_bulk_create(rows=rows, strict=params["strict"])
+        except DjangoValidationError as exc:
+            raise DRFValidationError(exc.message_dict or exc.messages or str(exc))
+
+        output_serializer = self.OutputSerializer(
+            {
+                "created": result.created,
+                "rejected": [{"row": r.row, "error": r.error} for r in result.rejected],
+            }
+        )
+        return Response(output_serializer.data, status=status.HTTP_201_CREATED)
@@ -1,4 +1,8 @@
+from typing import Iterable, Iterator
+
 from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.compat import SHORT_SEPARATORS, LONG_SEPARATORS
 
 
 def inline_serializer(*, fields, **kwargs):
@@ -7,3 +11,37 @@ def inline_serializer(*, fields, **kwargs):
         (serializers.Serializer,),
         fields,
     )(**kwargs)
+
+
+def stream_json_object(*, header: dict, key: str, items: Iterable, batch_size: int = 256) -> Iterator[bytes]:
+    """
+    Emite `{**header, key: [items...]}` en bloques, con los mismos bytes que
+    produciria JSONRenderer sobre el objeto completo (mismo encoder,
+    separadores y escapes), sin materializar la lista.
+    """
+    renderer = JSONRenderer()
+    item_separator, key_separator = SHORT_SEPARATORS if renderer.compact else LONG_SEPARATORS
+    encoder = renderer.encoder_class(
+        ensure_ascii=renderer.ensure_ascii,
+        allow_nan=not renderer.strict,
+        separators=(item_separator, key_separator),
+    )
+
+    def encode(obj) -> str:
+        # Mismos escapes que JSONRenderer.render
+        return encoder.encode(obj).replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+
+    opening = encode(header)[:-1] + (item_separator if header else "")
+    yield f"{opening}{encode(key)}{key_separator}[".encode()
+
+    batch: list[str] = []
+    prefix = ""
+    for item in items:
+        batch.append(encode(item))
+        if len(batch) >= batch_size:
+            yield (prefix + item_separator.join(batch)).encode()
+            prefix, batch = item_separator, []
+    if batch:
+        yield (prefix + item_separator.join(batch)).encode()
+
+    yield b"]}"
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from portfolios.models import Asset, InitialHolding, Portfolio, Price, TradeLeg
+from portfolios.services.etl import chunked
+from portfolios.services.positions import position_ledger_rebuild, position_snapshots_rebuild
+
+
+# -------------------------------------------------------------------
+# Datos sinteticos para benchmarks
+# -------------------------------------------------------------------
+# Activos BENCH0000.., precios diarios (dias habiles) como random walk,
+# holdings iniciales equiponderados y trades aleatorios ya valorizados
+# (executed_price / quantity), con snapshots y ledger reconstruidos como
+# en produccion. Misma semilla = mismo dataset.
+
+BENCH_PREFIX = "BENCH"
+BENCH_START = date(2015, 1, 2)
+BENCH_V0 = Decimal("1000000000")
+BATCH_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class BenchDataset:
+    portfolio_id: int
+    asset_codes: list[str]
+    start: date
+    end: date
+    prices: int
+    trades: int
+
+
+def business_days(*, start: date, years: int) -> list[date]:
+    end = start.replace(year=start.year + years)
+    days, dt = [], start
+    while dt < end:
+        if dt.weekday() < 5:
+            days.append(dt)
+        dt += timedelta(days=1)
+    return days
+
+
+def bench_dataset_create(
+    *,
+    assets: int,
+    years: int,
+    trades: int,
+    seed: int = 0,
+    start: date = BENCH_START,
+) -> BenchDataset:
+    """
+    Crea un portafolio sintetico de `assets` activos con `years` anios de
+    precios diarios y `trades` trades. Inserta todo con bulk_create por lotes.
+    """
+    rng = random.Random(seed)
+    days = business_days(start=start, years=years)
+    codes = [f"{BENCH_PREFIX}{i:04d}" for i in range(assets)]
+
+    Asset.objects.bulk_create([Asset(code=c, name=c) for c in codes], batch_size=BATCH_SIZE)
+    asset_ids = dict(Asset.objects.filter(code__in=codes).values_list("code", "id"))
+    portfolio = Portfolio.objects.create(
+        name=f"{BENCH_PREFIX} {assets}x{years}y/{trades} seed={seed}",
+        start_date=days[0],
+        initial_value=BENCH_V0,
+    )
+
+    # Trades planificados antes que los precios: solo se retienen en memoria
+    # los precios que se necesitan para valorizarlos (no la matriz completa)
+    plan = [
+        (
+            asset_ids[rng.choice(codes)],
+            rng.choice(days[1:]) if len(days) > 1 else days[0],
+            # Mayoria de compras y ventas chicas respecto del holding inicial,
+            # para que ninguna posicion quede en negativo
+            TradeLeg.SELL if rng.random() < 0.3 else TradeLeg.BUY,
+            Decimal(rng.randint(1_000, 20_000)),
+        )
+        for _ in range(trades)
+    ]
+    needed = {(asset_id, dt) for asset_id, dt, _, _ in plan}
+    needed.update((asset_id, days[0]) for asset_id in asset_ids.values())
+
+    # Precios: random walk multiplicativo por activo (~1% diario)
+    prices: dict[tuple[int, date], Decimal] = {}
+
+    def price_rows():
+        for code in codes:
+            asset_id = asset_ids[code]
+            px = rng.uniform(10, 500)
+            for dt in days:
+                px *= 1 + rng.gauss(0.0002, 0.01)
+                value = Decimal(f"{px:.8f}")
+                if (asset_id, dt) in needed:
+                    prices[(asset_id, dt)] = value
+                yield Price(asset_id=asset_id, date=dt, price=value)
+
+    for chunk in chunked(price_rows(), BATCH_SIZE):
+        Price.objects.bulk_create(chunk)
+
+    # Holdings equiponderados a precios de la primera fecha
+    weight = BENCH_V0 / assets
+    InitialHolding.objects.bulk_create(
+        [
+            InitialHolding(portfolio=portfolio, asset_id=asset_id, quantity=weight / prices[(asset_id, days[0])])
+            for asset_id in asset_ids.values()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    trade_rows = (
+        TradeLeg(
+            portfolio=portfolio,
+            date=dt,
+            asset_id=asset_id,
+            side=side,
+            amount_usd=amount,
+            executed_price=prices[(asset_id, dt)],
+            quantity=amount / prices[(asset_id, dt)],
+        )
+        for asset_id, dt, side, amount in plan
+    )
+    for chunk in chunked(trade_rows, BATCH_SIZE):
+        TradeLeg.objects.bulk_create(chunk)
+
+    position_snapshots_rebuild(portfolio_id=portfolio.id)
+    position_ledger_rebuild(portfolio_id=portfolio.id)
+
+    return BenchDataset(
+        portfolio_id=portfolio.id,
+        asset_codes=codes,
+        start=days[0],
+        end=days[-1],
+        prices=len(days) * assets,
+        trades=trades,
+    )
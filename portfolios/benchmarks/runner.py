@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import statistics
+import time
+import tracemalloc
+from typing import Callable
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+# -------------------------------------------------------------------
+# Medicion
+# -------------------------------------------------------------------
+# Cada caso se ejecuta `warmup` veces sin medir (caches de Python / BD) y
+# luego `repeat` veces cronometradas. Queries y memoria (tracemalloc) se
+# miden en una pasada extra, para no inflar los tiempos.
+
+def bench_case(*, fn: Callable[[], object], warmup: int = 1, repeat: int = 5) -> dict:
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as ctx:
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "repeat": repeat,
+        "min": round(min(timings), 6),
+        "median": round(statistics.median(timings), 6),
+        "mean": round(statistics.fmean(timings), 6),
+        "max": round(max(timings), 6),
+        "queries": len(ctx.captured_queries),
+        "peak_alloc_kb": peak // 1024,
+    }
+
+
+def bench_regressions(*, results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compara contra un baseline (misma estructura de `results`): un caso
+    regresa si su mediana supera la del baseline en mas de `threshold`
+    (0.2 = +20%) o si ejecuta mas queries. Los casos ausentes se ignoran.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        limit = base["median"] * (1 + threshold)
+        if current["median"] > limit:
+            regressions.append(
+                f"{name}: mediana {current['median']:.6f}s > {limit:.6f}s (baseline {base['median']:.6f}s +{threshold:.0%})"
+            )
+        if base.get("queries") is not None and current["queries"] > base["queries"]:
+            regressions.append(f"{name}: {current['queries']} queries > baseline {base['queries']}")
+    return regressions
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import random
+from datetime import date, datetime
+
+from openpyxl import Workbook
+
+from portfolios.benchmarks.data import BENCH_PREFIX, BENCH_START, business_days
+
+
+# -------------------------------------------------------------------
+# Libros sinteticos para el ETL
+# -------------------------------------------------------------------
+# Mismo layout que datos.xlsx (lo que leen XlsxReader / import_datos_xlsx):
+#   weights: Fecha | Activo | Portfolio 1 | Portfolio 2  (filas en start)
+#   Precios: Dates | Asset1 | Asset2 | ...
+# Se escriben en modo write_only: la memoria no crece con el tamano del libro.
+
+def bench_workbook_write(
+    *,
+    path: str,
+    assets: int,
+    days: int,
+    seed: int = 0,
+    start: date = BENCH_START,
+) -> date:
+    """
+    Escribe un libro de `assets` activos x `days` dias habiles desde `start`.
+    Retorna la primera fecha (la de los weights, usar como start_date del import).
+    """
+    rng = random.Random(seed)
+    codes = [f"{BENCH_PREFIX}{i:04d}" for i in range(assets)]
+    # Suficientes anios para cubrir `days` dias habiles
+    dates = business_days(start=start, years=days // 250 + 1)[:days]
+
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet("weights")
+    ws.append(["Fecha", "Activo", "Portfolio 1", "Portfolio 2"])
+    raw = [rng.random() for _ in codes]
+    total = sum(raw)
+    for code, r in zip(codes, raw):
+        ws.append([datetime.combine(dates[0], datetime.min.time()), code, 1 / assets, r / total])
+
+    ws = wb.create_sheet("Precios")
+    ws.append(["Dates", *codes])
+    px = [rng.uniform(10, 500) for _ in codes]
+    for dt in dates:
+        px = [p * (1 + rng.gauss(0.0002, 0.01)) for p in px]
+        ws.append([datetime.combine(dt, datetime.min.time()), *(round(p, 6) for p in px)])
+
+    wb.save(path)
+    return dates[0]
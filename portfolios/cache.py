@@ -0,0 +1,35 @@
+from django.core.cache.backends.locmem import LocMemCache
+
+# Contadores por LOCATION: Django crea una instancia del backend por thread,
+# pero todas comparten el mismo almacenamiento (y por lo tanto los desalojos)
+_evictions: dict[str, int] = {}
+
+
+class CountingLocMemCache(LocMemCache):
+    """
+    LocMemCache (LRU acotado por MAX_ENTRIES) que cuenta las entradas
+    desalojadas para poder dimensionar la cache.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._name = name
+        _evictions.setdefault(name, 0)
+
+    def _cull(self):
+        # Se ejecuta con el lock del backend tomado
+        before = len(self._cache)
+        super()._cull()
+        _evictions[self._name] += before - len(self._cache)
+
+    @property
+    def evictions(self) -> int:
+        return _evictions[self._name]
+
+    @property
+    def entries(self) -> int:
+        return len(self._cache)
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+
+import django
+from django.conf import settings
+from django.db import close_old_connections
+
+from portfolios.instrumentation import recording_queries
+
+
+# -------------------------------------------------------------------
+# Executors acotados para las vistas async
+# -------------------------------------------------------------------
+# Bajo ASGI el ORM y el computo (sync) de las vistas async corren en pools
+# de hilos con tamano fijo (PORTFOLIOS_ASYNC_POOLS). Los endpoints caros
+# (timeseries, analytics, trades) usan "compute" y los baratos "default":
+# cuando "compute" esta lleno, sus requests esperan en la cola de ese pool
+# y no demoran a los de "default".
+#
+# Aparte, un pool de procesos (PORTFOLIOS_TIMESERIES_JOB_PROCESSES) corre
+# los jobs de timeseries en segundo plano (services.timeseries_jobs).
+
+POOL_COMPUTE = "compute"
+POOL_DEFAULT = "default"
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_process_executor: ProcessPoolExecutor | None = None
+_executors_lock = threading.Lock()
+
+
+def pool_sizes() -> dict[str, int]:
+    return getattr(settings, "PORTFOLIOS_ASYNC_POOLS", {POOL_COMPUTE: 4, POOL_DEFAULT: 8})
+
+
+def executor_for(pool: str) -> ThreadPoolExecutor:
+    with _executors_lock:
+        executor = _executors.get(pool)
+        if executor is None:
+            sizes = pool_sizes()
+            if pool not in sizes:
+                raise ValueError(f"Pool desconocido: {pool}")
+            executor = ThreadPoolExecutor(max_workers=sizes[pool], thread_name_prefix=f"portfolios-{pool}")
+            _executors[pool] = executor
+        return executor
+
+
+def process_executor() -> ProcessPoolExecutor:
+    """
+    Pool de procesos local para los jobs de timeseries (computo fuera del
+    proceso web). Los hijos arrancan con spawn y su propio django.setup():
+    no heredan conexiones abiertas del padre.
+    """
+    global _process_executor
+    with _executors_lock:
+        if _process_executor is None:
+            _process_executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, "PORTFOLIOS_TIMESERIES_JOB_PROCESSES", 2),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_process_setup,
+                initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings"),),
+            )
+        return _process_executor
+
+
+def process_executor_discard(executor: ProcessPoolExecutor) -> None:
+    """
+    Descarta un pool roto (BrokenProcessPool: un hijo murio, p.ej. por OOM);
+    el proximo process_executor() crea uno nuevo.
+    """
+    global _process_executor
+    with _executors_lock:
+        if _process_executor is executor:
+            _process_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _process_setup(settings_module: str) -> None:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+def executors_shutdown(*, wait: bool = True) -> None:
+    """
+    Cierra los pools; el proximo uso los recrea con los tamanos vigentes.
+    """
+    global _process_executor
+    with _executors_lock:
+        executors = [*_executors.values(), *filter(None, [_process_executor])]
+        _executors.clear()
+        _process_executor = None
+    for executor in executors:
+        executor.shutdown(wait=wait)
+
+
+async def run_in_pool(pool: str, fn: Callable, *args, **kwargs):
+    """
+    Ejecuta `fn` en un hilo del pool. Propaga el contexto (metricas del
+    request) y, como un request sync, cierra las conexiones vencidas antes y
+    despues (CONN_MAX_AGE).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = partial(context.run, _call_with_connections, fn, args, kwargs)
+    return await loop.run_in_executor(executor_for(pool), call)
+
+
+def _call_with_connections(fn: Callable, args: tuple, kwargs: dict):
+    close_old_connections()
+    try:
+        with recording_queries():
+            return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
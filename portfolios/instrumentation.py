@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("portfolios.performance")
+
+
+# -------------------------------------------------------------------
+# Metricas por request
+# -------------------------------------------------------------------
+# PerformanceMiddleware abre un RequestMetrics por request y registra cada
+# query (execute_wrapper) y el tiempo de render del Response. Los servicios
+# marcan su tiempo de computo con @timed / timing(); fuera de un request
+# (comandos, tests de servicios) esos hooks no hacen nada. Las conexiones
+# son por hilo: el codigo que corre en otro hilo (executors de las vistas
+# async) registra sus queries con recording_queries().
+
+@dataclass
+class RequestMetrics:
+    queries: list[tuple[float, str]] = field(default_factory=list)  # (segundos, sql)
+    timings: dict[str, float] = field(default_factory=dict)         # hook -> segundos
+    serialize: float = 0.0
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(seconds for seconds, _ in self.queries)
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar("portfolios_request_metrics", default=None)
+
+
+@contextmanager
+def timing(name: str):
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] = metrics.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def timed(name: str):
+    """
+    Decorador de servicios: acumula su tiempo bajo `name` en el request actual.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timing(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def serializing():
+    """
+    Render hecho fuera de process_template_response (vistas async).
+    """
+    metrics = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.serialize += time.perf_counter() - start
+
+
+class _QueryRecorder:
+    def __init__(self, metrics: RequestMetrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.queries.append((time.perf_counter() - start, sql))
+
+
+@contextmanager
+def recording_queries():
+    """
+    Registra en el request actual las queries de las conexiones de este hilo.
+    """
+    metrics = _current.get()
+    with ExitStack() as stack:
+        if metrics is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_QueryRecorder(metrics)))
+        yield
+
+
+# -------------------------------------------------------------------
+# Middleware
+# -------------------------------------------------------------------
+
+class PerformanceMiddleware:
+    """
+    Por request: cantidad de queries, tiempo en BD, tiempo de cada servicio
+    instrumentado, tiempo de serializacion (render) y total.
+
+    - Header `Server-Timing` (visible en las devtools del navegador), salvo
+      PORTFOLIOS_SERVER_TIMING = False.
+    - Una linea de log JSON en `portfolios.performance` (INFO).
+    - Si el total supera PORTFOLIOS_SLOW_REQUEST_MS, un WARNING con las
+      PORTFOLIOS_SLOW_REQUEST_QUERIES queries mas lentas.
+
+    Los tiempos se solapan (las queries de un servicio cuentan en `db` y en el
+    servicio). En respuestas streaming solo se mide hasta crear la respuesta.
+
+    Soporta ambos modos: bajo ASGI con vistas async no fuerza la cadena a
+    un hilo sync compartido.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with recording_queries():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self._report(request=request, response=response, metrics=metrics, total=time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with recording_queries():
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self._report(request=request, response=response, metrics=metrics, total=time.perf_counter() - start)
+        return response
+
+    def process_template_response(self, request, response):
+        # Se ejecuta justo antes del render del Response de DRF
+        metrics = _current.get()
+        if metrics is not None:
+            start = time.perf_counter()
+
+            def rendered(_response):
+                metrics.serialize += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def _report(self, *, request, response, metrics: RequestMetrics, total: float) -> None:
+        db = metrics.db_seconds
+        entries = [
+            ("db", db, f"{len(metrics.queries)} queries"),
+            *((name, seconds, None) for name, seconds in metrics.timings.items()),
+            ("serialize", metrics.serialize, None),
+            ("total", total, None),
+        ]
+        if getattr(settings, "PORTFOLIOS_SERVER_TIMING", True):
+            response["Server-Timing"] = ", ".join(
+                f"{name};dur={seconds * 1000:.1f}" + (f';desc="{desc}"' if desc else "")
+                for name, seconds, desc in entries
+            )
+
+        payload = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "streaming": response.streaming,
+            "queries": len(metrics.queries),
+            "db_ms": round(db * 1000, 1),
+            "serialize_ms": round(metrics.serialize * 1000, 1),
+            "total_ms": round(total * 1000, 1),
+            "timings_ms": {name: round(seconds * 1000, 1) for name, seconds in metrics.timings.items()},
+        }
+        logger.info(json.dumps(payload), extra={"performance": payload})
+
+        slow_ms = getattr(settings, "PORTFOLIOS_SLOW_REQUEST_MS", None)
+        if slow_ms is not None and total * 1000 >= slow_ms:
+            limit = getattr(settings, "PORTFOLIOS_SLOW_REQUEST_QUERIES", 5)
+            slowest = sorted(metrics.queries, key=lambda q: q[0], reverse=True)[:limit]
+            slow = {
+                **payload,
+                "event": "slow_request",
+                "threshold_ms": slow_ms,
+                "slowest_queries": [
+                    {"ms": round(seconds * 1000, 2), "sql": sql[:1000]} for seconds, sql in slowest
+                ],
+            }
+            logger.warning(json.dumps(slow), extra={"performance": slow})
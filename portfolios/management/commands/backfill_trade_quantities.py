@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from portfolios.services.trades import trade_quantities_backfill
+
+
+class Command(BaseCommand):
+    help = "Completa executed_price y quantity de los TradeLegs creados antes de esas columnas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated, skipped = trade_quantities_backfill(batch_size=options["batch_size"])
+
+        if skipped:
+            self.stderr.write(f"Trades sin precio en su fecha (quedan sin cantidad): {skipped}")
+        self.stdout.write(self.style.SUCCESS(f"Backfill OK: updated={updated}"))
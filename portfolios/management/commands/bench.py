@@ -0,0 +1,137 @@
+import json
+import platform
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from portfolios.benchmarks.data import BENCH_PREFIX, bench_dataset_create
+from portfolios.benchmarks.runner import bench_case, bench_regressions
+from portfolios.models import Asset
+from portfolios.services.timeseries import ENGINES, portfolio_timeseries
+from portfolios.services.trades import TradeLegInput, _current_quantities, trade_create
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de servicios (timeseries, trade_create, _current_quantities) sobre un "
+        "dataset sintetico. Por defecto todo corre en una transaccion que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--assets", type=int, default=500)
+        parser.add_argument("--years", type=int, default=10)
+        parser.add_argument("--trades", type=int, default=100_000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--engines",
+            type=str,
+            default=",".join(ENGINES),
+            help="Motores de timeseries a medir, separados por coma.",
+        )
+        parser.add_argument("--output", type=str, help="Escribe los resultados en este JSON.")
+        parser.add_argument("--baseline", type=str, help="JSON de una corrida previa para comparar.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Tolerancia sobre la mediana del baseline (0.2 = +20%%).",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Conserva el dataset sintetico en la BD (no revierte).",
+        )
+
+    def handle(self, *args, **options):
+        engines = [e.strip() for e in options["engines"].split(",") if e.strip()]
+        unknown = set(engines) - set(ENGINES)
+        if unknown:
+            raise CommandError(f"Motores desconocidos: {', '.join(sorted(unknown))}")
+        if options["repeat"] < 1 or min(options["assets"], options["years"]) < 1:
+            raise CommandError("--repeat, --assets y --years deben ser >= 1")
+        if Asset.objects.filter(code__startswith=BENCH_PREFIX).exists():
+            raise CommandError(f"Ya existen activos {BENCH_PREFIX}* (corrida previa con --keep)")
+
+        baseline = None
+        if options["baseline"]:
+            baseline = json.loads(Path(options["baseline"]).read_text())["results"]
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            dataset = bench_dataset_create(
+                assets=options["assets"],
+                years=options["years"],
+                trades=options["trades"],
+                seed=options["seed"],
+            )
+            setup_seconds = time.perf_counter() - start
+            self.stdout.write(
+                f"Dataset: {len(dataset.asset_codes)} activos, {dataset.prices} precios, "
+                f"{dataset.trades} trades ({dataset.start}..{dataset.end}) en {setup_seconds:.1f}s"
+            )
+
+            results = {
+                name: bench_case(fn=fn, warmup=options["warmup"], repeat=options["repeat"])
+                for name, fn in self._cases(dataset=dataset, engines=engines)
+            }
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+        report = {
+            "meta": {
+                "assets": options["assets"],
+                "years": options["years"],
+                "trades": options["trades"],
+                "seed": options["seed"],
+                "warmup": options["warmup"],
+                "repeat": options["repeat"],
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "setup_seconds": round(setup_seconds, 3),
+            },
+            "results": results,
+        }
+
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<32} median={r['median']:.6f}s min={r['min']:.6f}s "
+                f"queries={r['queries']} peak_alloc_kb={r['peak_alloc_kb']}"
+            )
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"Resultados en {options['output']}")
+
+        if baseline is not None:
+            regressions = bench_regressions(
+                results=results, baseline=baseline, threshold=options["threshold"]
+            )
+            if regressions:
+                raise CommandError("Regresiones:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto del baseline"))
+
+    def _cases(self, *, dataset, engines):
+        portfolio_id = dataset.portfolio_id
+        mid = dataset.start + (dataset.end - dataset.start) / 2
+        leg = [TradeLegInput(asset_code=dataset.asset_codes[0], side="BUY", amount_usd=Decimal("1000"))]
+
+        for engine in engines:
+            yield f"timeseries_{engine}", lambda engine=engine: portfolio_timeseries(
+                portfolio_id=portfolio_id, start=dataset.start, end=dataset.end, engine=engine
+            )
+
+        yield "current_quantities_end", lambda: _current_quantities(
+            portfolio_id=portfolio_id, up_to_dt=dataset.end
+        )
+        yield "current_quantities_mid", lambda: _current_quantities(
+            portfolio_id=portfolio_id, up_to_dt=mid
+        )
+        # Cada repeticion crea un trade (se revierte con el resto del dataset)
+        yield "trade_create_latest", lambda: trade_create(
+            portfolio_id=portfolio_id, dt=dataset.end, legs=leg
+        )
@@ -0,0 +1,160 @@
+import json
+import platform
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from portfolios.benchmarks.workbooks import bench_workbook_write
+from portfolios.models import Price
+from portfolios.services.etl import PRICE_CHUNK_SIZE, import_datos_xlsx, peak_rss_kb
+
+
+# Corridas medidas en cada escenario, en orden
+RUNS = ("first", "rehash", "force")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de import_datos_xlsx sobre libros sinteticos: primer import, reimport "
+        "idempotente (hash ya procesado) y --force, en BD vacia y pre-poblada. "
+        "Con --write solo genera el libro."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--assets", type=int, default=100)
+        parser.add_argument("--days", type=int, default=2500, help="Dias habiles de precios.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--chunk-size", type=int, default=PRICE_CHUNK_SIZE)
+        parser.add_argument("--write", type=str, help="Solo escribe el libro sintetico en esta ruta.")
+        parser.add_argument(
+            "--scenarios",
+            type=str,
+            default="fresh,prepopulated",
+            help="fresh (BD vacia) y/o prepopulated (precios previos de los mismos activos).",
+        )
+        parser.add_argument("--output", type=str, help="Escribe los resultados en este JSON.")
+        parser.add_argument(
+            "--trace-memory",
+            action="store_true",
+            help="Mide el pico de memoria por fase (tracemalloc) en una pasada aparte, sin cronometrar.",
+        )
+
+    def handle(self, *args, **options):
+        assets, days = options["assets"], options["days"]
+        if min(assets, days) < 1:
+            raise CommandError("--assets y --days deben ser >= 1")
+
+        if options["write"]:
+            start = bench_workbook_write(path=options["write"], assets=assets, days=days, seed=options["seed"])
+            self.stdout.write(self.style.SUCCESS(f"Libro escrito: {options['write']} (start_date={start})"))
+            return
+
+        scenarios = [s.strip() for s in options["scenarios"].split(",") if s.strip()]
+        unknown = set(scenarios) - {"fresh", "prepopulated"}
+        if unknown:
+            raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+        if "fresh" in scenarios and Price.objects.exists():
+            self.stderr.write("Aviso: la BD ya tiene precios; 'fresh' no parte de una BD vacia")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "bench.xlsx")
+            started = time.perf_counter()
+            start = bench_workbook_write(path=path, assets=assets, days=days, seed=options["seed"])
+            self.stdout.write(
+                f"Libro: {assets} activos x {days} dias ({Path(path).stat().st_size // 1024} KB) "
+                f"en {time.perf_counter() - started:.1f}s"
+            )
+
+            # Libro previo: mismos activos, fechas anteriores (no se solapan)
+            seed_path = str(Path(tmp) / "seed.xlsx")
+            seed_start = start.replace(year=start.year - (days // 250 + 1))
+            if "prepopulated" in scenarios:
+                bench_workbook_write(
+                    path=seed_path, assets=assets, days=days, seed=options["seed"] + 1, start=seed_start
+                )
+
+            def scenario_runs(scenario: str, *, trace_memory: bool) -> dict:
+                with transaction.atomic():
+                    if scenario == "prepopulated":
+                        import_datos_xlsx(path=seed_path, start_date=seed_start, chunk_size=options["chunk_size"])
+                    runs = {
+                        run: self._run(
+                            path=path,
+                            start=start,
+                            run=run,
+                            chunk_size=options["chunk_size"],
+                            trace_memory=trace_memory,
+                        )
+                        for run in RUNS
+                    }
+                    # Cada escenario parte de la BD original
+                    transaction.set_rollback(True)
+                return runs
+
+            results = {}
+            for scenario in scenarios:
+                results[scenario] = scenario_runs(scenario, trace_memory=False)
+                if options["trace_memory"]:
+                    # tracemalloc distorsiona los tiempos: la memoria se mide
+                    # en una pasada aparte y solo se toma su pico por fase
+                    traced = scenario_runs(scenario, trace_memory=True)
+                    for run, r in results[scenario].items():
+                        r["peak_alloc_kb"] = traced[run]["peak_alloc_kb"]
+                        for name, phase in r["phases"].items():
+                            phase["peak_alloc_kb"] = traced[run]["phases"][name]["peak_alloc_kb"]
+
+        report = {
+            "meta": {
+                "assets": assets,
+                "days": days,
+                "price_rows": assets * days,
+                "seed": options["seed"],
+                "chunk_size": options["chunk_size"],
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                # ru_maxrss es el maximo del proceso: no baja entre corridas
+                "peak_rss_kb": peak_rss_kb(),
+            },
+            "results": results,
+        }
+
+        for scenario, runs in results.items():
+            for run, r in runs.items():
+                phases = " ".join(
+                    f"{name}={p['seconds']:.3f}s" for name, p in r["phases"].items() if p["seconds"]
+                )
+                self.stdout.write(
+                    f"{scenario:<13} {run:<7} {r['seconds']:>8.3f}s inserted={r['rows_inserted']} "
+                    f"updated={r['rows_updated']} {phases}"
+                )
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"Resultados en {options['output']}")
+
+    def _run(self, *, path, start, run, chunk_size, trace_memory) -> dict:
+        started = time.perf_counter()
+        data_import = import_datos_xlsx(
+            path=path,
+            start_date=start,
+            force=run == "force",
+            chunk_size=chunk_size,
+            trace_memory=trace_memory,
+        )
+        seconds = time.perf_counter() - started
+
+        # rehash: el hash ya fue procesado y se retorna el DataImport del primer
+        # import sin volver a leer el libro (solo cuenta el tiempo total)
+        skipped = run == "rehash"
+        metrics = {} if skipped else data_import.metrics
+        return {
+            "seconds": round(seconds, 6),
+            "skipped": skipped,
+            "rows_inserted": 0 if skipped else data_import.rows_inserted,
+            "rows_updated": 0 if skipped else data_import.rows_updated,
+            "phases": metrics.get("phases", {}),
+            # Pico del propio import (tracemalloc); None sin --trace-memory o si no se ejecuto
+            "peak_alloc_kb": metrics.get("peak_alloc_kb"),
+        }
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolios.models import Asset, Portfolio
+from portfolios.services.positions import position_ledger_discrepancies, position_ledger_rebuild
+
+
+class Command(BaseCommand):
+    help = "Compara el ledger de posiciones contra un replay completo (holdings iniciales + trades)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--portfolio", type=int, action="append", dest="portfolio_ids")
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Reconstruye el ledger de los portafolios con diferencias.",
+        )
+
+    def handle(self, *args, **options):
+        portfolios = Portfolio.objects.order_by("id")
+        if options["portfolio_ids"]:
+            portfolios = portfolios.filter(id__in=options["portfolio_ids"])
+            missing = set(options["portfolio_ids"]) - set(portfolios.values_list("id", flat=True))
+            if missing:
+                raise CommandError(f"Portfolios inexistentes: {sorted(missing)}")
+
+        codes = dict(Asset.objects.values_list("id", "code"))
+        inconsistent = []
+
+        for portfolio in portfolios:
+            mismatches = position_ledger_discrepancies(portfolio_id=portfolio.id)
+            if not mismatches:
+                self.stdout.write(f"{portfolio.name}: OK")
+                continue
+
+            inconsistent.append(portfolio.name)
+            for asset_id, ledger_qty, replay_qty in mismatches:
+                self.stdout.write(
+                    f"{portfolio.name}: {codes.get(asset_id, asset_id)} "
+                    f"ledger={ledger_qty if ledger_qty is not None else '-'} replay={replay_qty}"
+                )
+            if options["fix"]:
+                position_ledger_rebuild(portfolio_id=portfolio.id)
+                self.stdout.write(f"{portfolio.name}: ledger reconstruido")
+
+        if inconsistent and not options["fix"]:
+            raise CommandError(f"Ledger inconsistente en: {', '.join(inconsistent)}")
+
+        self.stdout.write(self.style.SUCCESS("Ledger verificado"))
@@ -3,7 +3,7 @@ from decimal import Decimal
 
 from django.core.management.base import BaseCommand, CommandError
 
-from portfolios.services.etl import import_datos_xlsx
+from portfolios.services.etl import PRICE_CHUNK_SIZE, import_datos_xlsx
 
 
 class Command(BaseCommand):
@@ -14,6 +14,17 @@ class Command(BaseCommand):
         parser.add_argument("--force", action="store_true")
         parser.add_argument("--start-date", type=str, default="2022-02-15")
         parser.add_argument("--v0", type=str, default="1000000000")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=PRICE_CHUNK_SIZE,
+            help="Filas de precios por bulk_create (acota la memoria del import).",
+        )
+        parser.add_argument(
+            "--trace-memory",
+            action="store_true",
+            help="Registra el pico de memoria por fase (tracemalloc; el import es varias veces mas lento).",
+        )
 
     def handle(self, *args, **options):
         path = options["path"]
@@ -26,10 +37,17 @@ class Command(BaseCommand):
 
         v0 = Decimal(options["v0"])
 
-        data_import = import_datos_xlsx(path=path, start_date=start_date, v0=v0, force=force)
+        data_import = import_datos_xlsx(
+            path=path,
+            start_date=start_date,
+            v0=v0,
+            force=force,
+            chunk_size=options["chunk_size"],
+            trace_memory=options["trace_memory"],
+        )
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Import OK: {data_import.source_name} inserted={data_import.rows_inserted} updated={data_import.rows_updated}"
+                f"Import OK: {data_import.source_name} inserted={data_import.rows_inserted} updated={data_import.rows_updated} ({data_import.notes})"
             )
         )
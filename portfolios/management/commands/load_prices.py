@@ -0,0 +1,62 @@
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolios.services.etl import PRICE_CHUNK_SIZE, import_prices
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa precios en formato ancho (Dates | Asset1 | ...) desde XLSX, CSV o Parquet, "
+        "con la misma normalizacion, idempotencia y upsert que load_datos_xlsx."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=str)
+        parser.add_argument(
+            "--weights",
+            type=str,
+            default=None,
+            help="Archivo de weights (Fecha | Activo | Portfolio 1 | Portfolio 2); obligatorio si la fuente no es XLSX.",
+        )
+        parser.add_argument("--force", action="store_true")
+        parser.add_argument("--start-date", type=str, default="2022-02-15")
+        parser.add_argument("--v0", type=str, default="1000000000")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=PRICE_CHUNK_SIZE,
+            help="Filas de precios por bloque (acota la memoria del import).",
+        )
+        parser.add_argument(
+            "--trace-memory",
+            action="store_true",
+            help="Registra el pico de memoria por fase (tracemalloc; el import es varias veces mas lento).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options["start_date"], "%Y-%m-%d").date()
+        except ValueError as e:
+            raise CommandError("start-date debe ser YYYY-MM-DD") from e
+
+        try:
+            data_import = import_prices(
+                path=options["path"],
+                weights_path=options["weights"],
+                start_date=start_date,
+                v0=Decimal(options["v0"]),
+                force=options["force"],
+                chunk_size=options["chunk_size"],
+                trace_memory=options["trace_memory"],
+            )
+        except ValueError as e:
+            # Formato no soportado, weights ausentes o sin weights para start_date
+            raise CommandError(str(e)) from e
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Import OK: {data_import.source_name} inserted={data_import.rows_inserted} updated={data_import.rows_updated} ({data_import.notes})"
+            )
+        )
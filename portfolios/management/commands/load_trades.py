@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolios.services.trades_bulk import (
+    trade_rows_from_csv,
+    trade_rows_from_jsonl,
+    trades_bulk_create,
+)
+
+
+READERS = {
+    "csv": trade_rows_from_csv,
+    "jsonl": trade_rows_from_jsonl,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga masiva de trades desde CSV o JSONL "
+        "(columnas: portfolio, date, asset, side, amount_usd)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=str)
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            help="Formato de entrada; por defecto se infiere de la extension.",
+        )
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Aborta toda la carga si alguna fila es rechazada.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"No existe el archivo: {path}")
+
+        fmt = options["format"] or path.suffix.lstrip(".").lower()
+        reader = READERS.get(fmt)
+        if reader is None:
+            raise CommandError(f"Formato no soportado: {fmt} (usa --format csv|jsonl)")
+
+        with path.open(newline="", encoding="utf-8") as stream:
+            try:
+                result = trades_bulk_create(
+                    rows=reader(stream=stream),
+                    strict=options["strict"],
+                    batch_size=options["batch_size"],
+                )
+            except ValidationError as exc:
+                raise CommandError("\n".join(exc.messages)) from exc
+
+        for reject in result.rejected:
+            self.stderr.write(f"fila {reject.row}: {reject.error}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Trades OK: created={result.created} rejected={len(result.rejected)} batches={result.batches}")
+        )
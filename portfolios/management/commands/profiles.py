@@ -0,0 +1,52 @@
+import io
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolios.profiling import profile_captures, profiling_dir
+
+
+class Command(BaseCommand):
+    help = "Lista los perfiles capturados (X-Profile / ?profile=1) o resume uno con --show."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--show", type=str, help="Id de la captura a resumir.")
+        parser.add_argument(
+            "--sort",
+            choices=["cumulative", "tottime", "calls"],
+            default="cumulative",
+        )
+        parser.add_argument("--limit", type=int, default=20)
+
+    def handle(self, *args, **options):
+        captures = profile_captures()
+
+        if not options["show"]:
+            if not captures:
+                self.stdout.write(f"Sin capturas en {profiling_dir()}")
+                return
+            for c in captures:
+                query = f"?{c['query']}" if c["query"] else ""
+                self.stdout.write(
+                    f"{c['id']}  {c['method']} {c['path']}{query}  status={c['status']} "
+                    f"{c['seconds'] * 1000:.1f}ms peak_alloc_kb={c['peak_alloc_kb']} user={c['user']}"
+                )
+            return
+
+        capture = next((c for c in captures if c["id"] == options["show"]), None)
+        if capture is None:
+            raise CommandError(f"No existe la captura: {options['show']}")
+
+        self.stdout.write(
+            f"{capture['method']} {capture['path']}?{capture['query']} -> {capture['status']} "
+            f"en {capture['seconds'] * 1000:.1f}ms (peak_alloc_kb={capture['peak_alloc_kb']})"
+        )
+
+        out = io.StringIO()
+        stats = pstats.Stats(str(profiling_dir() / f"{capture['id']}.prof"), stream=out)
+        stats.strip_dirs().sort_stats(options["sort"]).print_stats(options["limit"])
+        self.stdout.write(out.getvalue())
+
+        self.stdout.write("Asignaciones de memoria (top):")
+        for alloc in capture["top_allocations"][: options["limit"]]:
+            self.stdout.write(f"  {alloc['size_kb']:>10.1f} KB  {alloc['count']:>8}  {alloc['site']}")
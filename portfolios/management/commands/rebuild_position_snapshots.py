@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolios.models import Portfolio
+from portfolios.services.positions import position_snapshots_rebuild
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los snapshots de posiciones (holdings iniciales + replay completo de trades)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--portfolio", type=int, action="append", dest="portfolio_ids")
+
+    def handle(self, *args, **options):
+        portfolios = Portfolio.objects.order_by("id")
+        if options["portfolio_ids"]:
+            portfolios = portfolios.filter(id__in=options["portfolio_ids"])
+            missing = set(options["portfolio_ids"]) - set(portfolios.values_list("id", flat=True))
+            if missing:
+                raise CommandError(f"Portfolios inexistentes: {sorted(missing)}")
+
+        for portfolio in portfolios:
+            created = position_snapshots_rebuild(portfolio_id=portfolio.id)
+            self.stdout.write(f"{portfolio.name}: snapshots={created}")
+
+        self.stdout.write(self.style.SUCCESS("Snapshots reconstruidos"))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from portfolios.services.timeseries_jobs import (
+    timeseries_job_next,
+    timeseries_job_run,
+    timeseries_jobs_expire,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta los jobs de timeseries pendientes (POST /api/portfolios/<id>/timeseries/jobs/). "
+        "Sin --once queda esperando jobs nuevos; se pueden correr varios workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Procesa los pendientes y termina.")
+        parser.add_argument("--poll", type=float, default=2.0, help="Segundos entre consultas a la cola.")
+        parser.add_argument("--max-jobs", type=int, help="Termina despues de ejecutar esta cantidad.")
+
+    def handle(self, *args, **options):
+        done = 0
+        expired = timeseries_jobs_expire()
+        if expired:
+            self.stdout.write(f"Jobs con lease vencido marcados FAILED: {expired}")
+        while options["max_jobs"] is None or done < options["max_jobs"]:
+            job_id = timeseries_job_next()
+            if job_id is None:
+                if options["once"]:
+                    break
+                # Proceso de larga vida: conexiones vencidas fuera mientras espera
+                close_old_connections()
+                timeseries_jobs_expire()
+                time.sleep(options["poll"])
+                continue
+
+            started = time.perf_counter()
+            # Otro worker pudo tomarlo entre la consulta y el UPDATE condicional
+            if timeseries_job_run(job_id=job_id):
+                done += 1
+                self.stdout.write(f"job {job_id} en {time.perf_counter() - started:.2f}s")
+
+        self.stdout.write(self.style.SUCCESS(f"Jobs ejecutados: {done}"))
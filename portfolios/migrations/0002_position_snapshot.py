@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-17 21:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PositionSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.DecimalField(decimal_places=10, max_digits=30)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='portfolios.asset')),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='portfolios.portfolio')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['portfolio', 'date'], name='portfolios__portfol_8bb575_idx')],
+                'constraints': [models.UniqueConstraint(fields=('portfolio', 'asset', 'date'), name='uq_snapshot_portfolio_asset_date')],
+            },
+        ),
+    ]
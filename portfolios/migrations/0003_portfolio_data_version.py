@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 21:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0002_position_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolio',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
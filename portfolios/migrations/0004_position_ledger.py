@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-17 21:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0003_portfolio_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PositionLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=10, max_digits=30)),
+                ('as_of', models.DateField(blank=True, null=True)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='portfolios.asset')),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='portfolios.portfolio')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('portfolio', 'asset'), name='uq_ledger_portfolio_asset')],
+            },
+        ),
+    ]
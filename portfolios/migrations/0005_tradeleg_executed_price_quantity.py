@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 21:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0004_position_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tradeleg',
+            name='executed_price',
+            field=models.DecimalField(blank=True, decimal_places=8, max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='tradeleg',
+            name='quantity',
+            field=models.DecimalField(blank=True, decimal_places=10, max_digits=30, null=True),
+        ),
+    ]
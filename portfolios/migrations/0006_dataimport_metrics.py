@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 21:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0005_tradeleg_executed_price_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataimport',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-17 21:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0006_dataimport_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataimport',
+            name='assets_total',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataimport',
+            name='holdings_total',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataimport',
+            name='portfolios_total',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataimport',
+            name='prices_total',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dataimport',
+            index=models.Index(fields=['-imported_at'], name='idx_dataimport_imported_at'),
+        ),
+    ]
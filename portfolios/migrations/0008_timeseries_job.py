@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-17 22:09
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0007_dataimport_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeseriesJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('start', models.DateField()),
+                ('end', models.DateField()),
+                ('engine', models.CharField(max_length=10)),
+                ('freq', models.CharField(max_length=1)),
+                ('data_version', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'PENDING'), ('RUNNING', 'RUNNING'), ('SUCCESS', 'SUCCESS'), ('FAILED', 'FAILED')], default='PENDING', max_length=10)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='portfolios.portfolio')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='idx_tsjob_status_created'), models.Index(fields=['portfolio', 'start', 'end', 'engine', 'freq', 'data_version'], name='idx_tsjob_params')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 22:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0008_timeseries_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolio',
+            name='data_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
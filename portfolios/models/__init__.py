@@ -4,3 +4,5 @@ from .price import Price
 from .holding import InitialHolding
 from .trade import TradeLeg
 from .imports import DataImport
+from .position import PositionSnapshot, PositionLedger
+from .jobs import TimeseriesJob
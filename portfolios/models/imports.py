@@ -8,3 +8,17 @@ class DataImport(models.Model):
     rows_inserted = models.IntegerField(default=0)
     rows_updated = models.IntegerField(default=0)
     notes = models.TextField(blank=True, default="")
+    # Tiempo, filas, filas/seg y pico de memoria opcional por fase (ver ImportMetrics)
+    metrics = models.JSONField(blank=True, default=dict)
+
+    # Totales de la BD al cierre del import: el endpoint de estado los lee de
+    # aqui en vez de hacer COUNT(*) sobre tablas grandes (null en imports previos)
+    assets_total = models.IntegerField(null=True, blank=True)
+    prices_total = models.BigIntegerField(null=True, blank=True)
+    holdings_total = models.IntegerField(null=True, blank=True)
+    portfolios_total = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-imported_at"], name="idx_dataimport_imported_at"),
+        ]
@@ -0,0 +1,39 @@
+import uuid
+
+from django.db import models
+
+class TimeseriesJob(models.Model):
+    """
+    Calculo de portfolio_timeseries en segundo plano (POST .../timeseries/jobs/).
+    El resultado queda persistido: cada consulta de estado es una lectura por PK.
+    """
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    SUCCESS = "SUCCESS"
+    FAILED = "FAILED"
+    STATUS_CHOICES = [(PENDING, "PENDING"), (RUNNING, "RUNNING"), (SUCCESS, "SUCCESS"), (FAILED, "FAILED")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    portfolio = models.ForeignKey("portfolios.Portfolio", on_delete=models.CASCADE)
+    start = models.DateField()
+    end = models.DateField()
+    engine = models.CharField(max_length=10)
+    freq = models.CharField(max_length=1)
+    # Portfolio.data_version con la que se calculo (al encolar, hasta que corre)
+    data_version = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Cola del worker: PENDING mas antiguos primero
+            models.Index(fields=["status", "created_at"], name="idx_tsjob_status_created"),
+            models.Index(
+                fields=["portfolio", "start", "end", "engine", "freq", "data_version"],
+                name="idx_tsjob_params",
+            ),
+        ]
@@ -4,6 +4,11 @@ class Portfolio(models.Model):
     name = models.CharField(max_length=100, unique=True)
     start_date = models.DateField()
     initial_value = models.DecimalField(max_digits=20, decimal_places=2)
+    # Se incrementa cada vez que cambian los datos que alimentan la serie
+    # (trades, precios, holdings); versiona las entradas de cache
+    data_version = models.PositiveIntegerField(default=0)
+    # Momento del ultimo incremento de data_version (Last-Modified de la serie)
+    data_updated_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self) -> str:
         return self.name
@@ -0,0 +1,39 @@
+from django.db import models
+
+class PositionSnapshot(models.Model):
+    """
+    Cantidad de un activo en un portafolio al cierre de `date`
+    (holdings iniciales + todos los trades con fecha <= date).
+    """
+    portfolio = models.ForeignKey("portfolios.Portfolio", on_delete=models.CASCADE)
+    asset = models.ForeignKey("portfolios.Asset", on_delete=models.CASCADE)
+    date = models.DateField()
+    quantity = models.DecimalField(max_digits=30, decimal_places=10)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["portfolio", "asset", "date"], name="uq_snapshot_portfolio_asset_date"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["portfolio", "date"]),
+        ]
+
+
+class PositionLedger(models.Model):
+    """
+    Cantidad vigente de un activo en un portafolio (holdings iniciales +
+    todos los trades). Se actualiza en la misma transaccion que crea los
+    TradeLegs; `as_of` es la fecha del ultimo trade del activo (None si solo
+    refleja los holdings iniciales).
+    """
+    portfolio = models.ForeignKey("portfolios.Portfolio", on_delete=models.CASCADE)
+    asset = models.ForeignKey("portfolios.Asset", on_delete=models.CASCADE)
+    quantity = models.DecimalField(max_digits=30, decimal_places=10)
+    as_of = models.DateField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["portfolio", "asset"], name="uq_ledger_portfolio_asset")
+        ]
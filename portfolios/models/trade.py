@@ -10,6 +10,11 @@ class TradeLeg(models.Model):
     asset = models.ForeignKey("portfolios.Asset", on_delete=models.CASCADE)
     side = models.CharField(max_length=4, choices=SIDE_CHOICES)
     amount_usd = models.DecimalField(max_digits=20, decimal_places=2)
+    # Precio del activo en `date` y cantidad transada (amount_usd / precio, sin
+    # signo), fijados al crear el trade. Nulos solo en trades anteriores a
+    # estas columnas que aun no pasan por `backfill_trade_quantities`.
+    executed_price = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True)
+    quantity = models.DecimalField(max_digits=30, decimal_places=10, null=True, blank=True)
 
     class Meta:
         indexes = [
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+
+
+# -------------------------------------------------------------------
+# Captura de perfiles bajo demanda
+# -------------------------------------------------------------------
+# Un request de staff con `X-Profile: 1` (o `?profile=1`) se ejecuta bajo
+# cProfile + tracemalloc cuando PORTFOLIOS_PROFILING_ENABLED = True. Por
+# captura se escriben dos archivos en PORTFOLIOS_PROFILING_DIR:
+#   <id>.prof  estadisticas de cProfile (pstats / snakeviz)
+#   <id>.json  metadatos del request, funciones mas costosas y sitios de
+#              asignacion de memoria
+# tracemalloc es global al proceso: se captura un request a la vez (si hay
+# otro en curso, el request se atiende sin perfilar).
+
+PROFILE_TOP_FUNCTIONS = 15
+# Frames por traza de tracemalloc (mas frames = mas costo mientras se perfila)
+TRACEBACK_FRAMES = 10
+
+_capture_lock = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    return getattr(settings, "PORTFOLIOS_PROFILING_ENABLED", False)
+
+
+def profiling_dir() -> Path:
+    return Path(getattr(settings, "PORTFOLIOS_PROFILING_DIR", settings.BASE_DIR / "profiles"))
+
+
+def profiling_requested(request) -> bool:
+    flag = request.headers.get("X-Profile") == "1" or request.GET.get("profile") in ("1", "true")
+    user = getattr(request, "user", None)
+    return flag and user is not None and user.is_staff
+
+
+def profile_request(*, label: str, request, call: Callable):
+    """
+    Ejecuta `call()` (dispatch + render de la vista) bajo los profilers,
+    escribe la captura y agrega el header X-Profile-Id a la respuesta.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        return call()
+
+    try:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(TRACEBACK_FRAMES)
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = call()
+        finally:
+            profiler.disable()
+            seconds = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+
+        capture_id = _capture_write(
+            label=label,
+            request=request,
+            response=response,
+            profiler=profiler,
+            snapshot=snapshot,
+            seconds=seconds,
+            peak=peak,
+        )
+        response["X-Profile-Id"] = capture_id
+        return response
+    finally:
+        _capture_lock.release()
+
+
+def _capture_write(*, label, request, response, profiler, snapshot, seconds, peak) -> str:
+    directory = profiling_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    created = datetime.now(timezone.utc)
+    capture_id = f"{created:%Y%m%dT%H%M%S%f}-{label}"
+    profiler.dump_stats(directory / f"{capture_id}.prof")
+
+    stats = pstats.Stats(profiler)
+    top_functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+    top_allocations = snapshot.filter_traces([
+        # Sin el ruido del propio profiler / tracemalloc
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+    ]).statistics("lineno")
+
+    limit = getattr(settings, "PORTFOLIOS_PROFILING_TOP_ALLOCATIONS", 25)
+    meta = {
+        "id": capture_id,
+        "view": label,
+        "created_at": created.isoformat(),
+        "method": request.method,
+        "path": request.path,
+        "query": request.META.get("QUERY_STRING", ""),
+        "user": getattr(request.user, "username", ""),
+        "status": response.status_code,
+        "seconds": round(seconds, 6),
+        "peak_alloc_kb": peak // 1024,
+        "top_functions": [
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "tottime": round(tottime, 6),
+                "cumtime": round(cumtime, 6),
+            }
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in top_functions[:PROFILE_TOP_FUNCTIONS]
+        ],
+        "top_allocations": [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in top_allocations[:limit]
+        ],
+    }
+    (directory / f"{capture_id}.json").write_text(json.dumps(meta, indent=2))
+    return capture_id
+
+
+def profile_captures(*, directory: Path | None = None) -> list[dict]:
+    """
+    Metadatos de las capturas, de la mas reciente a la mas antigua.
+    """
+    directory = directory or profiling_dir()
+    if not directory.is_dir():
+        return []
+    captures = [json.loads(p.read_text()) for p in directory.glob("*.json")]
+    return sorted(captures, key=lambda c: c["created_at"], reverse=True)
@@ -0,0 +1,38 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import OuterRef, Subquery
+
+from portfolios.models import PositionLedger, PositionSnapshot
+
+def latest_snapshot_for_portfolio(
+    *, portfolio_id: int, on_or_before: date
+) -> tuple[date | None, dict[int, Decimal]]:
+    """
+    Snapshot mas reciente con fecha <= on_or_before, en una sola query.
+    Retorna (fecha, {asset_id: quantity}) o (None, {}) si no hay snapshot.
+    """
+    latest_date = (
+        PositionSnapshot.objects
+        .filter(portfolio_id=OuterRef("portfolio_id"), date__lte=on_or_before)
+        .order_by("-date")
+        .values("date")[:1]
+    )
+    rows = list(
+        PositionSnapshot.objects
+        .filter(portfolio_id=portfolio_id, date=Subquery(latest_date))
+        .values_list("date", "asset_id", "quantity")
+    )
+    if not rows:
+        return None, {}
+    return rows[0][0], {asset_id: Decimal(qty) for _, asset_id, qty in rows}
+
+def position_ledger_for_portfolio(*, portfolio_id: int, for_update: bool = False) -> dict[int, PositionLedger]:
+    """
+    Filas del ledger por asset_id. Con for_update=True quedan bloqueadas hasta
+    el fin de la transaccion (serializa trades concurrentes del portafolio).
+    """
+    qs = PositionLedger.objects.filter(portfolio_id=portfolio_id)
+    if for_update:
+        qs = qs.select_for_update()
+    return {row.asset_id: row for row in qs}
@@ -1,13 +1,109 @@
 from datetime import date
-from portfolios.models import Price
+from decimal import Decimal
 
-def prices_in_range(*, asset_ids: list[int], start: date, end: date):
-    return (
+from django.db.models import FloatField, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Cast
+
+from portfolios.models import Price, TradeLeg
+
+def prices_in_range(*, asset_ids: list[int], start: date, end: date, dates: list[date] | None = None):
+    """
+    Precios de los activos entre start y end; si se indica `dates`, solo
+    los de esas fechas (p.ej. cierres de periodo).
+    """
+    qs = Price.objects.filter(asset_id__in=asset_ids, date__gte=start, date__lte=end)
+    if dates is not None:
+        qs = qs.filter(date__in=dates)
+    return qs.order_by("date").select_related("asset")
+
+def price_points_in_range(*, asset_ids: list[int], start: date, end: date, dates: list[date] | None = None):
+    """
+    Tuplas (date, asset_id, price) con el precio ya casteado a float en la BD:
+    evita instanciar modelos y Decimals cuando el consumidor trabaja en float.
+    """
+    qs = Price.objects.filter(asset_id__in=asset_ids, date__gte=start, date__lte=end)
+    if dates is not None:
+        qs = qs.filter(date__in=dates)
+    return qs.order_by("date").values_list("date", "asset_id", Cast("price", FloatField()))
+
+def price_dates_in_range(*, asset_ids: list[int], start: date, end: date) -> list[date]:
+    """
+    Fechas distintas con algun precio de los activos, en orden.
+    """
+    return list(
         Price.objects
         .filter(asset_id__in=asset_ids, date__gte=start, date__lte=end)
         .order_by("date")
-        .select_related("asset")
+        .values_list("date", flat=True)
+        .distinct()
     )
 
 def price_on_date(*, asset_id: int, dt: date):
     return Price.objects.filter(asset_id=asset_id, date=dt).first()
+
+def prices_for_trades(*, trades: QuerySet[TradeLeg]) -> dict[tuple[int, date], Decimal]:
+    """
+    Precios de ejecucion de un conjunto de trades en una sola query:
+    cada (asset_id, date) distinto se cruza con Price por su indice unico.
+    """
+    trade_price = (
+        Price.objects
+        .filter(asset_id=OuterRef("asset_id"), date=OuterRef("date"))
+        .values("price")[:1]
+    )
+    rows = (
+        trades
+        .order_by()
+        .values_list("asset_id", "date")
+        .annotate(price=Subquery(trade_price))
+        .distinct()
+    )
+    return {
+        (asset_id, dt): Decimal(px)
+        for asset_id, dt, px in rows
+        if px is not None
+    }
+
+def prices_for_pairs(
+    *, pairs: set[tuple[int, date]], chunk_size: int = 500
+) -> dict[tuple[int, date], Decimal]:
+    """
+    Precios de un conjunto arbitrario de (asset_id, date), en bloques de
+    fechas: una query por bloque en vez de una por par.
+    """
+    asset_ids = sorted({asset_id for asset_id, _ in pairs})
+    dates = sorted({dt for _, dt in pairs})
+
+    result = {}
+    for i in range(0, len(dates), chunk_size):
+        rows = (
+            Price.objects
+            .filter(asset_id__in=asset_ids, date__in=dates[i:i + chunk_size])
+            .values_list("asset_id", "date", "price")
+        )
+        for asset_id, dt, px in rows:
+            if (asset_id, dt) in pairs:
+                result[(asset_id, dt)] = Decimal(px)
+    return result
+
+def price_rows_for_pairs(
+    *, pairs: set[tuple[int, date]], chunk_size: int = 500
+) -> dict[tuple[int, date], Price]:
+    """
+    Filas de Price existentes (id, asset_id, date, price) para un conjunto de
+    (asset_id, date): base de la comparacion del import incremental.
+    """
+    asset_ids = sorted({asset_id for asset_id, _ in pairs})
+    dates = sorted({dt for _, dt in pairs})
+
+    result = {}
+    for i in range(0, len(dates), chunk_size):
+        rows = (
+            Price.objects
+            .filter(asset_id__in=asset_ids, date__in=dates[i:i + chunk_size])
+            .only("id", "asset_id", "date", "price")
+        )
+        for row in rows:
+            if (row.asset_id, row.date) in pairs:
+                result[(row.asset_id, row.date)] = row
+    return result
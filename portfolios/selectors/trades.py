@@ -8,3 +8,17 @@ def trades_for_portfolio(*, portfolio_id: int, start: date | None = None, end: d
     if end:
         qs = qs.filter(date__lte=end)
     return qs.order_by("date", "id")
+
+
+def portfolio_ids_with_unpriced_trades() -> list[int]:
+    """
+    Portafolios con trades sin cantidad registrada (legacy): su cantidad se
+    convierte con el precio de la fecha, asi que cambia si cambian los precios.
+    """
+    return list(
+        TradeLeg.objects
+        .filter(quantity__isnull=True)
+        .values_list("portfolio_id", flat=True)
+        .order_by("portfolio_id")
+        .distinct()
+    )
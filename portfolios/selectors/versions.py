@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db.models import OuterRef, Subquery
+
+from portfolios.models import DataImport, Portfolio, TradeLeg
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    """
+    Version de los datos detras de una respuesta: `tag` cambia con cualquier
+    cambio de datos (base del ETag) y `last_modified` es el momento del
+    ultimo cambio conocido (None si no hay registro).
+    """
+    tag: str
+    last_modified: datetime | None
+
+
+def _latest_import():
+    return DataImport.objects.order_by("-imported_at")
+
+
+def latest_data_import() -> DataImport | None:
+    return _latest_import().first()
+
+
+def import_data_version(*, data_import: DataImport | None) -> DataVersion | None:
+    """
+    Version del estado de importacion (p.ej. el de latest_data_import()).
+    Un reimport con --force reutiliza la fila pero cambia imported_at.
+    """
+    if data_import is None:
+        return None
+    return DataVersion(
+        tag=(
+            f"import:{data_import.id}:{data_import.file_hash}:{data_import.status}"
+            f":{data_import.imported_at.isoformat()}"
+        ),
+        last_modified=data_import.imported_at,
+    )
+
+
+def portfolio_data_version(*, portfolio_id: int) -> DataVersion | None:
+    """
+    Ultimo import + ultimo TradeLeg del portafolio + data_version, en una query.
+    """
+    row = (
+        Portfolio.objects.filter(id=portfolio_id)
+        .annotate(
+            last_trade_id=Subquery(
+                TradeLeg.objects.filter(portfolio_id=OuterRef("id")).order_by("-id").values("id")[:1]
+            ),
+            import_hash=Subquery(_latest_import().values("file_hash")[:1]),
+            imported_at=Subquery(_latest_import().values("imported_at")[:1]),
+        )
+        .values("data_version", "data_updated_at", "last_trade_id", "import_hash", "imported_at")
+        .first()
+    )
+    if not row:
+        return None
+
+    imported_at = row["imported_at"]
+    changes = [dt for dt in (row["data_updated_at"], imported_at) if dt is not None]
+    return DataVersion(
+        tag=(
+            f"portfolio:{portfolio_id}:{row['data_version']}:trade:{row['last_trade_id']}"
+            f":import:{row['import_hash']}:{imported_at.isoformat() if imported_at else ''}"
+        ),
+        last_modified=max(changes) if changes else None,
+    )
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import math
+from datetime import date
+
+from portfolios.instrumentation import timed
+from portfolios.models import Portfolio
+from portfolios.services.timeseries_cache import portfolio_timeseries_cached
+
+
+# ---------------------------------------------------------------------
+# Metricas de riesgo sobre V(t)
+# ---------------------------------------------------------------------
+# Se calculan sobre la serie columnar cacheada (misma entrada de cache que
+# usa /timeseries/?format=columnar), por lo que pedir serie y luego
+# analytics para el mismo rango calcula la serie una sola vez (en paralelo,
+# con la cache fria, ambos requests la calcularian).
+#
+# Retorno simple:   r_t = V_t / V_{t-1} - 1   (None si V_{t-1} == 0)
+# Drawdown:         dd_t = V_t / max_{s<=t} V_s - 1
+# Volatilidad:      desviacion estandar (poblacional) de r_t; anualizada
+#                   con sqrt(PERIODS_PER_YEAR)
+PERIODS_PER_YEAR = 252
+DEFAULT_ROLLING_WINDOW = 20
+
+
+@timed("analytics")
+def portfolio_analytics(
+    *,
+    portfolio: Portfolio,
+    start: date,
+    end: date,
+    engine: str | None = None,
+    window: int = DEFAULT_ROLLING_WINDOW,
+) -> dict:
+    """
+    Retornos, volatilidad anualizada, drawdown y metricas moviles del
+    portafolio entre start y end. Todas las series estan alineadas con
+    `dates` (None donde la metrica aun no esta definida).
+    """
+    if window < 2:
+        raise ValueError("La ventana movil debe ser de al menos 2 periodos")
+
+    series = portfolio_timeseries_cached(
+        portfolio=portfolio, start=start, end=end, engine=engine, columnar=True
+    )
+    values = series["V"]
+
+    returns = _returns(values)
+    drawdown = _drawdowns(values)
+    rolling_mean, rolling_vol = _rolling_mean_volatility(returns, window=window)
+
+    valid_returns = [r for r in returns if r is not None]
+    volatility = _population_std(valid_returns)
+
+    max_dd_idx = min(range(len(drawdown)), key=drawdown.__getitem__) if drawdown else None
+    first, last = (values[0], values[-1]) if values else (0.0, 0.0)
+
+    return {
+        "portfolio_id": series["portfolio_id"],
+        "start": series["start"],
+        "end": series["end"],
+        "window": window,
+        "periods_per_year": PERIODS_PER_YEAR,
+        "summary": {
+            "final_value": last,
+            "total_return": last / first - 1 if first else None,
+            "volatility": volatility,
+            "annualized_volatility": (
+                volatility * math.sqrt(PERIODS_PER_YEAR) if volatility is not None else None
+            ),
+            "max_drawdown": drawdown[max_dd_idx] if max_dd_idx is not None else 0.0,
+            "max_drawdown_date": series["dates"][max_dd_idx] if max_dd_idx is not None else None,
+        },
+        "dates": series["dates"],
+        "returns": returns,
+        "drawdown": drawdown,
+        "rolling": {
+            "mean": rolling_mean,
+            "volatility": rolling_vol,
+            "annualized_volatility": [
+                v * math.sqrt(PERIODS_PER_YEAR) if v is not None else None for v in rolling_vol
+            ],
+        },
+    }
+
+
+def _returns(values: list[float]) -> list[float | None]:
+    # r_0 no existe; se deja None para mantener la alineacion con dates
+    returns: list[float | None] = [None] * len(values)
+    for i in range(1, len(values)):
+        prev = values[i - 1]
+        if prev:
+            returns[i] = values[i] / prev - 1
+    return returns
+
+
+def _drawdowns(values: list[float]) -> list[float]:
+    # Una pasada manteniendo el maximo acumulado
+    drawdown = []
+    peak = -math.inf
+    for v in values:
+        peak = max(peak, v)
+        drawdown.append(v / peak - 1 if peak > 0 else 0.0)
+    return drawdown
+
+
+def _population_std(xs: list[float]) -> float | None:
+    if not xs:
+        return None
+    m = sum(xs) / len(xs)
+    return math.sqrt(sum((x - m) ** 2 for x in xs) / len(xs))
+
+
+def _rolling_mean_volatility(
+    returns: list[float | None], *, window: int
+) -> tuple[list[float | None], list[float | None]]:
+    """
+    Media y desviacion estandar moviles sobre las ultimas `window`
+    observaciones, en O(n): se mantienen suma y suma de cuadrados de la
+    ventana y se actualizan al entrar/salir cada retorno. Los retornos None
+    no cuentan; la metrica se emite cuando la ventana esta completa.
+    """
+    means: list[float | None] = [None] * len(returns)
+    vols: list[float | None] = [None] * len(returns)
+
+    total = total_sq = 0.0
+    count = 0
+    for i, r in enumerate(returns):
+        if r is not None:
+            total += r
+            total_sq += r * r
+            count += 1
+
+        if i >= window:
+            out = returns[i - window]
+            if out is not None:
+                total -= out
+                total_sq -= out * out
+                count -= 1
+
+        if i >= window and count:
+            m = total / count
+            means[i] = m
+            # max(): la resta de sumas puede dejar un residuo negativo minimo
+            vols[i] = math.sqrt(max(total_sq / count - m * m, 0.0))
+
+    return means, vols
@@ -2,19 +2,40 @@ from __future__ import annotations
 
 import hashlib
 import logging
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
 from decimal import Decimal
 from datetime import date
-from typing import Iterable
+from itertools import islice
+from typing import Iterable, Iterator
 
 from django.db import transaction
-from openpyxl import load_workbook
+from django.utils import timezone
 
 from portfolios.models import Asset, Portfolio, Price, InitialHolding, DataImport
+from portfolios.selectors.prices import price_rows_for_pairs
+from portfolios.selectors.trades import portfolio_ids_with_unpriced_trades
+from portfolios.services.etl_readers import PriceReader, price_reader_for
+from portfolios.services.portfolios import portfolio_data_version_bump
+from portfolios.services.positions import position_ledger_invalidate, position_snapshots_invalidate
 
 
 START_DATE_DEFAULT = date(2022, 2, 15)
 V0_DEFAULT = Decimal("1000000000")
 
+# Filas de Price por bloque: acota la memoria independientemente del
+# tamano de la hoja
+PRICE_CHUNK_SIZE = 5000
+
+# Totales de la BD registrados en cada DataImport (ver import_totals)
+IMPORT_TOTAL_FIELDS = ("assets_total", "prices_total", "holdings_total", "portfolios_total")
+
+# Precision de Price.price: dos precios iguales a esta escala no se reescriben
+PRICE_QUANTUM = Decimal("1e-8")
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,76 +51,159 @@ def file_sha256(path: str) -> str:
     return h.hexdigest()
 
 
-def parse_decimal(value) -> Decimal:
-    if value is None:
-        return Decimal("0")
-
-    if isinstance(value, (int, float, Decimal)):
-        return Decimal(str(value))
-
-    s = str(value).strip()
-    if s == "" or s in {"-", "—", "–", "N/A", "na", "null"}:
-        return Decimal("0")
+def peak_rss_kb() -> int | None:
+    """
+    Pico de memoria residente del proceso en KB (None si la plataforma no
+    expone `resource`, p.ej. Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
 
-    s = s.replace(" ", "").replace(",", ".")
-    if s.endswith("%"):
-        return Decimal(s[:-1]) / Decimal("100")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS, bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
 
-    return Decimal(s)
 
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
 
-# -------------------------------------------------------------------
-# Excel readers
-# -------------------------------------------------------------------
 
-def read_weights(wb, start_date: date) -> tuple[dict[str, Decimal], dict[str, Decimal]]:
+def sources_sha256(paths: list[str]) -> str:
     """
-    Hoja 'weights':
-    Fecha | Activo | Portfolio 1 | Portfolio 2
+    Hash del conjunto de archivos de un import. Con un solo archivo coincide
+    con file_sha256 (los imports previos siguen siendo reconocidos).
     """
-    ws = wb["weights"]
+    hashes = [file_sha256(p) for p in paths]
+    if len(hashes) == 1:
+        return hashes[0]
+    return hashlib.sha256(":".join(hashes).encode()).hexdigest()
 
-    w1, w2 = {}, {}
 
-    for fecha, asset, p1, p2, *_ in ws.iter_rows(min_row=2, values_only=True):
-        if not fecha or not asset:
-            continue
+# -------------------------------------------------------------------
+# Metricas por fase
+# -------------------------------------------------------------------
 
-        if hasattr(fecha, "date"):
-            fecha = fecha.date()
+@dataclass
+class PhaseMetrics:
+    seconds: float = 0.0
+    rows: int = 0
+    peak_alloc_kb: int | None = None
 
-        if fecha != start_date:
-            continue
 
-        code = str(asset).strip()
-        w1[code] = parse_decimal(p1)
-        w2[code] = parse_decimal(p2)
+class ImportMetrics:
+    """
+    Tiempo, filas y pico de memoria por fase del import. Una fase puede
+    medirse en varios tramos (p.ej. lectura y upsert se alternan por bloque):
+    los tiempos y filas se acumulan.
+
+    Con trace_memory=True (opcional: tracemalloc hace el import varias veces
+    mas lento y distorsiona los tiempos) se registra peak_alloc_kb: el pico
+    de memoria asignada por Python durante la fase, por sobre lo asignado al
+    comenzar cada tramo; se queda el mayor de sus tramos. A diferencia de
+    ru_maxrss (maximo de toda la vida del proceso) no depende de lo que el
+    proceso hizo antes del import. No incluye memoria de extensiones en C
+    que no pasa por el allocator de Python. Sin trazado queda en None.
+    """
+    PHASES = ("hash", "read", "assets", "prices", "holdings")
+
+    def __init__(self, *, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.phases = {name: PhaseMetrics() for name in self.PHASES}
+
+    @contextmanager
+    def track(self, name: str) -> Iterator[PhaseMetrics]:
+        phase = self.phases[name]
+        if not self.trace_memory:
+            start = time.perf_counter()
+            try:
+                yield phase
+            finally:
+                phase.seconds += time.perf_counter() - start
+            return
+
+        was_tracing = tracemalloc.is_tracing()
+        if was_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds += time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+            phase.peak_alloc_kb = max(phase.peak_alloc_kb or 0, (peak - baseline) // 1024)
+
+    def track_chunks(self, name: str, chunks: Iterable[list]) -> Iterator[list]:
+        # Mide solo el tiempo de producir cada bloque (no el de procesarlo)
+        it = iter(chunks)
+        while True:
+            with self.track(name) as phase:
+                chunk = next(it, None)
+                phase.rows += len(chunk or ())
+            if chunk is None:
+                return
+            yield chunk
+
+    def as_dict(self) -> dict:
+        phases = {
+            name: {
+                "seconds": round(m.seconds, 6),
+                "rows": m.rows,
+                "rows_per_sec": round(m.rows / m.seconds, 1) if m.rows and m.seconds else None,
+                "peak_alloc_kb": m.peak_alloc_kb,
+            }
+            for name, m in self.phases.items()
+        }
+        return {
+            "total_seconds": round(sum(m.seconds for m in self.phases.values()), 6),
+            "peak_alloc_kb": self.peak_alloc_kb(),
+            "phases": phases,
+        }
 
-    if not w1 or not w2:
-        raise ValueError(f"No weights encontrados para start_date={start_date}")
+    def peak_alloc_kb(self) -> int | None:
+        # Pico del import: el de la fase que mas memoria requirio
+        if not self.trace_memory:
+            return None
+        return max(m.peak_alloc_kb or 0 for m in self.phases.values())
 
-    return w1, w2
 
+# -------------------------------------------------------------------
+# Upsert de precios
+# -------------------------------------------------------------------
 
-def read_prices(wb) -> Iterable[tuple[str, date, Decimal]]:
+def upsert_prices(*, rows: list[tuple[int, date, Decimal]]) -> tuple[int, int, int]:
     """
-    Hoja 'Precios':
-    Dates | Asset1 | Asset2 | ...
+    Inserta o actualiza un bloque de precios (asset_id, date, price)
+    comparando contra lo ya persistido: solo se escriben las filas nuevas o
+    cuyo precio cambio. Retorna (insertados, actualizados, sin_cambios).
     """
-    ws = wb["Precios"]
-    headers = [c.value for c in ws[1]]
-    assets = [str(h).strip() for h in headers[1:] if h]
+    latest: dict[tuple[int, date], Decimal] = {}
+    for asset_id, dt, px in rows:
+        # Si la hoja repite (activo, fecha), prevalece la ultima aparicion
+        latest[(asset_id, dt)] = px.quantize(PRICE_QUANTUM)
 
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        if not row or not row[0]:
-            continue
+    existing = price_rows_for_pairs(pairs=set(latest))
 
-        dt = row[0].date() if hasattr(row[0], "date") else row[0]
+    to_create, to_update = [], []
+    for (asset_id, dt), px in latest.items():
+        current = existing.get((asset_id, dt))
+        if current is None:
+            to_create.append(Price(asset_id=asset_id, date=dt, price=px))
+        elif current.price != px:
+            current.price = px
+            to_update.append(current)
 
-        for idx, code in enumerate(assets, start=1):
-            px = row[idx] if idx < len(row) else None
-            if px is not None:
-                yield code, dt, parse_decimal(px)
+    Price.objects.bulk_create(to_create, batch_size=1000)
+    Price.objects.bulk_update(to_update, ["price"], batch_size=1000)
+    return len(to_create), len(to_update), len(latest) - len(to_create) - len(to_update)
 
 
 # -------------------------------------------------------------------
@@ -112,15 +216,59 @@ def import_datos_xlsx(
     start_date: date = START_DATE_DEFAULT,
     v0: Decimal = V0_DEFAULT,
     force: bool = False,
+    chunk_size: int = PRICE_CHUNK_SIZE,
+    trace_memory: bool = False,
+) -> DataImport:
+    """
+    Import del libro datos.xlsx (hojas 'weights' y 'Precios').
+    """
+    return import_prices(
+        path=path,
+        start_date=start_date,
+        v0=v0,
+        force=force,
+        chunk_size=chunk_size,
+        trace_memory=trace_memory,
+    )
+
+
+def import_prices(
+    *,
+    path: str,
+    weights_path: str | None = None,
+    start_date: date = START_DATE_DEFAULT,
+    v0: Decimal = V0_DEFAULT,
+    force: bool = False,
+    chunk_size: int = PRICE_CHUNK_SIZE,
+    trace_memory: bool = False,
 ) -> DataImport:
     """
     Flujo:
     1) Idempotencia por hash
-    2) Lectura y normalización del Excel
+    2) Lectura y normalización de la fuente
     3) Persistencia incremental y creación del estado inicial
+
+    El formato se elige por extension (ver PRICE_READERS: xlsx, csv,
+    parquet). Si la fuente de precios no trae weights (csv/parquet), se leen
+    de `weights_path`, que puede ser de cualquier formato soportado; el hash
+    de idempotencia cubre ambos archivos.
+
+    Los precios se procesan por bloques de `chunk_size` a medida que se
+    leen: la memoria no depende del tamano de la fuente. Cada bloque se
+    compara con lo persistido y solo se insertan los precios nuevos y se
+    actualizan los que cambiaron.
+    Todo ocurre en una transaccion (o se carga todo o nada).
+
+    DataImport.metrics registra tiempo y filas por fase (hash, read, assets,
+    prices, holdings), tambien si el import falla. trace_memory=True agrega
+    el pico de memoria por fase (tracemalloc; mas lento, ver ImportMetrics).
     """
 
-    file_hash = file_sha256(path)
+    metrics = ImportMetrics(trace_memory=trace_memory)
+
+    paths = [path] if weights_path is None else [path, weights_path]
+    with metrics.track("hash"):
+        file_hash = sources_sha256(paths)
 
     if not force:
         existing = DataImport.objects.filter(file_hash=file_hash, status="SUCCESS").first()
@@ -130,14 +278,30 @@ def import_datos_xlsx(
 
     # --- Fase 1: lectura ---
     logger.info("Iniciando import %s (start_date=%s)", path, start_date)
-    wb = load_workbook(filename=path, data_only=True)
-    weights_1, weights_2 = read_weights(wb, start_date)
-    price_rows = list(read_prices(wb))
+    reader = price_reader_for(path)
+    try:
+        with metrics.track("read") as phase:
+            weights_1, weights_2 = _read_weights(
+                reader=reader, weights_path=weights_path, start_date=start_date
+            )
+            phase.rows += len(weights_1.keys() | weights_2.keys())
+    except Exception:
+        reader.close()
+        raise
 
-    data_import = DataImport.objects.create(
-        source_name=path.split("/")[-1],
+    # file_hash es unico: un reintento tras FAILED o un --force reutiliza el
+    # registro (y pasa a ser el mas reciente)
+    data_import, _ = DataImport.objects.update_or_create(
         file_hash=file_hash,
-        status="STARTED",
+        defaults={
+            "source_name": path.split("/")[-1],
+            "imported_at": timezone.now(),
+            "status": "STARTED",
+            "rows_inserted": 0,
+            "rows_updated": 0,
+            "notes": "",
+            "metrics": {},
+        },
     )
 
     try:
@@ -153,46 +317,53 @@ def import_datos_xlsx(
                 defaults={"start_date": start_date, "initial_value": v0},
             )
 
-            all_codes = set(weights_1) | set(weights_2) | {c for c, _, _ in price_rows}
-
-            created_assets = Asset.objects.bulk_create(
-                [Asset(code=c, name=c) for c in all_codes],
-                ignore_conflicts=True,
-                batch_size=500,
-            )
-            assets_created = len(created_assets)
-
-            assets = {a.code: a for a in Asset.objects.filter(code__in=all_codes)}
-
-            # --- Fase 3: precios ---
-            prices = [
-                Price(asset=assets[c], date=dt, price=px)
-                for c, dt, px in price_rows
-                if c in assets
-            ]
-
-            created_prices = Price.objects.bulk_create(
-                prices, ignore_conflicts=True, batch_size=5000
-            )
-
-            data_import.rows_inserted = len(created_prices)
-            data_import.rows_updated = 0
+            assets: dict[str, Asset] = {}
+
+            def ensure_assets(codes: set[str]) -> int:
+                # Crea los activos que aun no conocemos; retorna cuantos se crearon
+                missing = codes - assets.keys()
+                if not missing:
+                    return 0
+                with metrics.track("assets") as phase:
+                    created = Asset.objects.bulk_create(
+                        [Asset(code=c, name=c) for c in missing],
+                        ignore_conflicts=True,
+                        batch_size=500,
+                    )
+                    assets.update((a.code, a) for a in Asset.objects.filter(code__in=missing))
+                    phase.rows += len(created)
+                return len(created)
+
+            assets_created = ensure_assets(set(weights_1) | set(weights_2))
+
+            # --- Fase 3: precios (streaming por bloques, upsert) ---
+            prices_inserted = prices_updated = prices_unchanged = 0
+            for chunk in metrics.track_chunks("read", chunked(reader.read_prices(), chunk_size)):
+                assets_created += ensure_assets({c for c, _, _ in chunk})
+                with metrics.track("prices") as phase:
+                    inserted, updated, unchanged = upsert_prices(
+                        rows=[(assets[c].id, dt, px) for c, dt, px in chunk]
+                    )
+                    phase.rows += len(chunk)
+                prices_inserted += inserted
+                prices_updated += updated
+                prices_unchanged += unchanged
+
+            data_import.rows_inserted = prices_inserted
+            data_import.rows_updated = prices_updated
 
             # --- Holdings iniciales ---
-            if force:
-                InitialHolding.objects.filter(portfolio__in=[p1, p2]).delete()
-
-            prices_t0 = {
-                p.asset_id: Decimal(p.price)
-                for p in Price.objects.filter(date=start_date)
-            }
-
             def create_holdings(portfolio, weights):
+                # Los holdings ya existentes se conservan (sin --force): solo
+                # se cuentan los realmente nuevos
+                existing = set(
+                    InitialHolding.objects.filter(portfolio=portfolio).values_list("asset_id", flat=True)
+                )
                 rows = []
                 for code, weight in weights.items():
                     asset = assets.get(code)
                     px0 = prices_t0.get(asset.id) if asset else None
-                    if px0:
+                    if px0 and asset.id not in existing:
                         qty = (weight * v0) / px0
                         rows.append(
                             InitialHolding(
@@ -206,26 +377,104 @@ def import_datos_xlsx(
                 )
                 return len(rows)
 
-            holdings_created = create_holdings(p1, weights_1) + create_holdings(p2, weights_2)
-
+            with metrics.track("holdings") as phase:
+                if force:
+                    InitialHolding.objects.filter(portfolio__in=[p1, p2]).delete()
+
+                prices_t0 = {
+                    p.asset_id: Decimal(p.price)
+                    for p in Price.objects.filter(date=start_date)
+                }
+
+                holdings_created = create_holdings(p1, weights_1) + create_holdings(p2, weights_2)
+                phase.rows += holdings_created
+
+            # Solo se invalida lo que el import realmente cambio: re-enviar un
+            # libro identico no obliga a reconstruir posiciones ni la cache
+            # Los snapshots y el ledger de posiciones dejan de ser validos (se
+            # reconstruyen bajo demanda) si cambiaron:
+            # - los holdings de los portafolios del import
+            # - precios nuevos o corregidos: la cantidad de los trades sin
+            #   cantidad registrada (de cualquier portafolio) se convierte con
+            #   el precio de su fecha; un trade cuya fecha no tenia precio se
+            #   omitia y ahora aplica
+            stale_positions = set()
+            if force or holdings_created:
+                stale_positions.update((p1.id, p2.id))
+            if force or prices_inserted or prices_updated:
+                stale_positions.update(portfolio_ids_with_unpriced_trades())
+            if stale_positions:
+                position_snapshots_invalidate(portfolio_ids=stale_positions)
+                position_ledger_invalidate(portfolio_ids=stale_positions)
+
+            if force or holdings_created or prices_inserted or prices_updated:
+                # Los precios son compartidos: invalida la cache de todos los portafolios
+                portfolio_data_version_bump()
+
+            peak_kb = metrics.peak_alloc_kb()
             data_import.status = "SUCCESS"
             data_import.notes = (
-                f"assets_created={assets_created}; prices_created={len(created_prices)}; "
+                f"assets_created={assets_created}; prices_inserted={prices_inserted}; "
+                f"prices_updated={prices_updated}; prices_unchanged={prices_unchanged}; "
                 f"holdings_created={holdings_created}"
             )
+            if peak_kb is not None:
+                data_import.notes += f"; peak_alloc_kb={peak_kb}"
+            data_import.metrics = metrics.as_dict()
+            # Contados dentro de la transaccion: reflejan tambien escrituras
+            # fuera del ETL (bench --keep, borrados en cascada)
+            for name, total in import_totals().items():
+                setattr(data_import, name, total)
             data_import.save()
 
         logger.info(
-            "Import completado (assets=%s, prices=%s, holdings=%s)",
+            "Import completado (assets=%s, prices inserted=%s updated=%s unchanged=%s, holdings=%s, peak_alloc_kb=%s)",
             assets_created,
-            len(created_prices),
+            prices_inserted,
+            prices_updated,
+            prices_unchanged,
             holdings_created,
+            peak_kb,
         )
     except Exception as exc:
         logger.exception("Import fallo y se hara rollback completo")
         data_import.status = "FAILED"
         data_import.notes = str(exc)
-        data_import.save(update_fields=["status", "notes"])
+        # Metricas parciales: hasta que fase llego el import
+        data_import.metrics = metrics.as_dict()
+        # Totales tras el rollback (la BD como antes del import)
+        for name, total in import_totals().items():
+            setattr(data_import, name, total)
+        data_import.save(update_fields=["status", "notes", "metrics", *IMPORT_TOTAL_FIELDS])
         raise
+    finally:
+        reader.close()
 
     return data_import
+
+
+def import_totals() -> dict[str, int]:
+    """
+    Totales de la BD al cierre de un import (campos *_total de DataImport).
+    Se cuentan (un COUNT(*) por tabla, una vez por import) en vez de
+    derivarse del import previo: Price tambien cambia fuera del ETL
+    (bench --keep, borrados en cascada) y un total derivado se desviaria.
+    """
+    return {
+        "assets_total": Asset.objects.count(),
+        "prices_total": Price.objects.count(),
+        "holdings_total": InitialHolding.objects.count(),
+        "portfolios_total": Portfolio.objects.count(),
+    }
+
+
+def _read_weights(
+    *, reader: PriceReader, weights_path: str | None, start_date: date
+) -> tuple[dict[str, Decimal], dict[str, Decimal]]:
+    if weights_path is None:
+        if not reader.bundles_weights:
+            raise ValueError(f"{reader.path}: el formato no incluye weights; indicar weights_path")
+        return reader.read_weights(start_date)
+
+    with price_reader_for(weights_path) as weights_reader:
+        return weights_reader.read_weights(start_date)
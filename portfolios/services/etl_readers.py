@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import csv
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Iterable, Iterator
+
+
+# -------------------------------------------------------------------
+# Lectores de fuentes de precios
+# -------------------------------------------------------------------
+# Todos los formatos comparten el mismo layout "ancho":
+#   precios: Dates | Asset1 | Asset2 | ...
+#   weights: Fecha | Activo | Portfolio 1 | Portfolio 2
+# Cada lector solo sabe obtener filas (tuplas de valores) de su formato; la
+# normalizacion (fechas, decimales, celdas vacias) es comun. El ETL elige el
+# lector por extension via PRICE_READERS.
+
+PriceRow = tuple[str, date, Decimal]
+
+
+def parse_decimal(value) -> Decimal:
+    if value is None:
+        return Decimal("0")
+
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+
+    s = str(value).strip()
+    if s == "" or s in {"-", "—", "–", "N/A", "na", "null"}:
+        return Decimal("0")
+
+    s = s.replace(" ", "").replace(",", ".")
+    if s.endswith("%"):
+        return Decimal(s[:-1]) / Decimal("100")
+
+    return Decimal(s)
+
+
+def parse_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if hasattr(value, "date"):
+        # p.ej. pandas.Timestamp
+        return value.date()
+    # Texto ISO ("2022-02-15" o "2022-02-15 00:00:00")
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def weights_from_rows(
+    rows: Iterable[tuple], start_date: date
+) -> tuple[dict[str, Decimal], dict[str, Decimal]]:
+    w1, w2 = {}, {}
+
+    for fecha, asset, p1, p2, *_ in rows:
+        if not fecha or not asset:
+            continue
+
+        if parse_date(fecha) != start_date:
+            continue
+
+        code = str(asset).strip()
+        w1[code] = parse_decimal(p1)
+        w2[code] = parse_decimal(p2)
+
+    if not w1 or not w2:
+        raise ValueError(f"No weights encontrados para start_date={start_date}")
+
+    return w1, w2
+
+
+def prices_from_rows(headers: tuple, rows: Iterable[tuple]) -> Iterator[PriceRow]:
+    assets = [str(h).strip() for h in headers[1:] if h]
+
+    for row in rows:
+        if not row or not row[0]:
+            continue
+
+        dt = parse_date(row[0])
+
+        for idx, code in enumerate(assets, start=1):
+            px = row[idx] if idx < len(row) else None
+            # En CSV una celda vacia llega como "" (en XLSX/Parquet, None)
+            if px is not None and px != "":
+                yield code, dt, parse_decimal(px)
+
+
+class PriceReader:
+    """
+    Fuente de precios (y opcionalmente weights) de un archivo.
+    Las subclases implementan _weights_rows / _price_rows.
+    """
+    extensions: tuple[str, ...] = ()
+    # True si el mismo archivo trae precios y weights (p.ej. un libro con dos hojas)
+    bundles_weights = False
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read_weights(self, start_date: date) -> tuple[dict[str, Decimal], dict[str, Decimal]]:
+        return weights_from_rows(self._weights_rows(), start_date)
+
+    def read_prices(self) -> Iterator[PriceRow]:
+        headers, rows = self._price_rows()
+        return prices_from_rows(headers, rows)
+
+    def _weights_rows(self) -> Iterable[tuple]:
+        raise NotImplementedError
+
+    def _price_rows(self) -> tuple[tuple, Iterable[tuple]]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class XlsxReader(PriceReader):
+    """
+    Libro con hojas 'weights' y 'Precios', abierto en modo read_only.
+    """
+    extensions = (".xlsx", ".xlsm")
+    bundles_weights = True
+
+    def __init__(self, path: str):
+        from openpyxl import load_workbook
+
+        super().__init__(path)
+        self.wb = load_workbook(filename=path, read_only=True, data_only=True)
+
+    def _weights_rows(self):
+        return self.wb["weights"].iter_rows(min_row=2, values_only=True)
+
+    def _price_rows(self):
+        ws = self.wb["Precios"]
+        # Compatible con hojas read_only (sin acceso aleatorio a ws[1])
+        headers = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        return headers, ws.iter_rows(min_row=2, values_only=True)
+
+    def close(self) -> None:
+        # En modo read_only el archivo queda abierto hasta cerrar el libro
+        self.wb.close()
+
+
+class CsvReader(PriceReader):
+    """
+    CSV con cabecera: un archivo de precios o uno de weights (no ambos).
+    """
+    extensions = (".csv",)
+
+    def _rows(self) -> Iterator[tuple]:
+        with open(self.path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.reader(f):
+                yield tuple(row)
+
+    def _weights_rows(self):
+        rows = self._rows()
+        next(rows, None)
+        return rows
+
+    def _price_rows(self):
+        rows = self._rows()
+        return next(rows, ()), rows
+
+
+class ParquetReader(PriceReader):
+    """
+    Parquet leido por record batches (requiere pyarrow, dependencia opcional).
+    """
+    extensions = (".parquet", ".pq")
+    BATCH_SIZE = 10_000
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ValueError("Leer Parquet requiere pyarrow (pip install pyarrow)") from exc
+
+        super().__init__(path)
+        self.file = pq.ParquetFile(path)
+
+    def _rows(self) -> Iterator[tuple]:
+        for batch in self.file.iter_batches(batch_size=self.BATCH_SIZE):
+            columns = [col.to_pylist() for col in batch.columns]
+            yield from zip(*columns)
+
+    def _weights_rows(self):
+        return self._rows()
+
+    def _price_rows(self):
+        return tuple(self.file.schema_arrow.names), self._rows()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+PRICE_READERS: dict[str, type[PriceReader]] = {
+    ext: reader
+    for reader in (XlsxReader, CsvReader, ParquetReader)
+    for ext in reader.extensions
+}
+
+
+def price_reader_for(path: str) -> PriceReader:
+    ext = Path(path).suffix.lower()
+    reader = PRICE_READERS.get(ext)
+    if reader is None:
+        supported = ", ".join(sorted(PRICE_READERS))
+        raise ValueError(f"Formato no soportado: {ext or path} (soportados: {supported})")
+    return reader(path)
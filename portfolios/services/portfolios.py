@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils import timezone
+
+from portfolios.models import Portfolio
+
+
+def portfolio_data_version_bump(*, portfolio_ids: Iterable[int] | None = None) -> int:
+    """
+    Incrementa data_version de los portafolios indicados (o de todos).
+    Cualquier resultado cacheado con la version anterior deja de servirse.
+    """
+    qs = Portfolio.objects.all()
+    if portfolio_ids is not None:
+        qs = qs.filter(id__in=list(portfolio_ids))
+    return qs.update(data_version=F("data_version") + 1, data_updated_at=timezone.now())
+
+
+def portfolio_lock(*, portfolio_id: int) -> Portfolio:
+    """
+    Bloquea la fila del portafolio hasta el fin de la transaccion. Serializa
+    las escrituras del portafolio aunque su ledger aun no tenga filas que
+    bloquear (dos trades concurrentes no lo reconstruyen en paralelo).
+    """
+    try:
+        return Portfolio.objects.select_for_update().get(id=portfolio_id)
+    except Portfolio.DoesNotExist:
+        raise ValidationError(f"Portfolio {portfolio_id} no existe")
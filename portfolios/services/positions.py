@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from portfolios.models import PositionLedger, PositionSnapshot, TradeLeg
+from portfolios.selectors.holdings import initial_holdings_for_portfolio
+from portfolios.selectors.positions import latest_snapshot_for_portfolio, position_ledger_for_portfolio
+from portfolios.selectors.prices import prices_for_trades
+from portfolios.selectors.trades import trades_for_portfolio
+
+
+# ---------------------------------------------------------------------
+# Posiciones por portafolio
+# ---------------------------------------------------------------------
+# Las cantidades se reconstruyen como:
+#   q_i(t) = q_i(snapshot) + sum(delta_qty de trades en (snapshot, t])
+# Si no hay snapshot, el punto de partida son los holdings iniciales.
+# Los snapshots se escriben en cada fecha con trades (checkpoints), por lo
+# que en la practica solo se recorre la "cola" de trades posteriores.
+
+def signed_trade_quantities(*, trades_qs: QuerySet[TradeLeg]) -> list[tuple[TradeLeg, Decimal]]:
+    """
+    Pares (trade, delta_qty) con signo: BUY suma, SELL resta.
+
+    La cantidad se lee de TradeLeg.quantity. Solo los trades antiguos sin
+    cantidad registrada se convierten con el precio de su fecha (una query
+    adicional, y solo si existen); los que no tienen precio se omiten.
+    """
+    trades = list(trades_qs)
+    legacy_prices = (
+        prices_for_trades(trades=trades_qs.filter(quantity__isnull=True))
+        if any(tr.quantity is None for tr in trades)
+        else {}
+    )
+
+    result = []
+    for tr in trades:
+        if tr.quantity is not None:
+            delta = Decimal(tr.quantity)
+        else:
+            px = legacy_prices.get((tr.asset_id, tr.date))
+            if not px:
+                continue
+            # amount_usd / price = cantidad transada
+            delta = Decimal(tr.amount_usd) / px
+
+        if tr.side == TradeLeg.SELL:
+            delta = -delta
+        result.append((tr, delta))
+    return result
+
+
+def position_starting_point(*, portfolio_id: int, on_or_before: date) -> tuple[date | None, dict[int, Decimal]]:
+    """
+    Estado desde el cual reconstruir: snapshot mas reciente <= on_or_before
+    o, si no existe, los holdings iniciales (fecha None).
+    """
+    snapshot_date, quantities = latest_snapshot_for_portfolio(
+        portfolio_id=portfolio_id, on_or_before=on_or_before
+    )
+    if snapshot_date is not None:
+        return snapshot_date, quantities
+
+    holdings = initial_holdings_for_portfolio(portfolio_id=portfolio_id)
+    return None, {h.asset_id: Decimal(h.quantity) for h in holdings}
+
+
+def position_quantities(*, portfolio_id: int, up_to_dt: date) -> dict[int, Decimal]:
+    """
+    Cantidades por asset al cierre de up_to_dt (inclusive).
+    """
+    snapshot_date, base = position_starting_point(portfolio_id=portfolio_id, on_or_before=up_to_dt)
+
+    quantities: dict[int, Decimal] = defaultdict(lambda: Decimal("0"))
+    quantities.update(base)
+
+    tail_start = snapshot_date + timedelta(days=1) if snapshot_date else None
+    tail = trades_for_portfolio(portfolio_id=portfolio_id, start=tail_start, end=up_to_dt)
+    for tr, delta in signed_trade_quantities(trades_qs=tail):
+        quantities[tr.asset_id] += delta
+
+    return quantities
+
+
+# ---------------------------------------------------------------------
+# Mantenimiento de snapshots
+# ---------------------------------------------------------------------
+
+def _snapshot_rows(*, portfolio_id: int, dt: date, quantities: dict[int, Decimal]) -> list[PositionSnapshot]:
+    return [
+        PositionSnapshot(portfolio_id=portfolio_id, asset_id=asset_id, date=dt, quantity=qty)
+        for asset_id, qty in quantities.items()
+    ]
+
+
+def position_snapshot_record(*, portfolio_id: int, dt: date, quantities: dict[int, Decimal]) -> None:
+    """
+    Registra el snapshot al cierre de dt.
+
+    Los snapshots posteriores a dt (trade retroactivo) quedan invalidos y se
+    eliminan: las lecturas siguientes parten de dt y reconstruyen la cola.
+    """
+    position_snapshots_record(portfolio_id=portfolio_id, checkpoints={dt: quantities})
+
+
+@transaction.atomic
+def position_snapshots_record(*, portfolio_id: int, checkpoints: dict[date, dict[int, Decimal]]) -> None:
+    """
+    Variante de position_snapshot_record para varias fechas (carga masiva):
+    se eliminan los snapshots desde la fecha mas antigua y se escriben todos
+    los checkpoints en un solo bulk_create.
+    """
+    if not checkpoints:
+        return
+    PositionSnapshot.objects.filter(portfolio_id=portfolio_id, date__gte=min(checkpoints)).delete()
+    PositionSnapshot.objects.bulk_create(
+        [
+            row
+            for dt, quantities in checkpoints.items()
+            for row in _snapshot_rows(portfolio_id=portfolio_id, dt=dt, quantities=quantities)
+        ],
+        batch_size=500,
+    )
+
+
+def position_snapshots_invalidate(*, portfolio_ids: Iterable[int]) -> int:
+    deleted, _ = PositionSnapshot.objects.filter(portfolio_id__in=list(portfolio_ids)).delete()
+    return deleted
+
+
+def position_quantities_replay(*, portfolio_id: int) -> tuple[dict[int, Decimal], dict[int, date]]:
+    """
+    Replay completo (holdings iniciales + todos los trades, sin snapshots).
+    Retorna las cantidades finales y la fecha del ultimo trade de cada activo.
+    """
+    quantities: dict[int, Decimal] = defaultdict(lambda: Decimal("0"))
+    for holding in initial_holdings_for_portfolio(portfolio_id=portfolio_id):
+        quantities[holding.asset_id] += Decimal(holding.quantity)
+
+    last_trade_dates: dict[int, date] = {}
+    for tr, delta in signed_trade_quantities(trades_qs=trades_for_portfolio(portfolio_id=portfolio_id)):
+        quantities[tr.asset_id] += delta
+        last_trade_dates[tr.asset_id] = tr.date
+    return dict(quantities), last_trade_dates
+
+
+@transaction.atomic
+def position_snapshots_rebuild(*, portfolio_id: int) -> int:
+    """
+    Reconstruye todos los snapshots de un portafolio desde cero
+    (holdings iniciales + replay completo), con un checkpoint por fecha con trades.
+    """
+    PositionSnapshot.objects.filter(portfolio_id=portfolio_id).delete()
+
+    quantities: dict[int, Decimal] = defaultdict(lambda: Decimal("0"))
+    for holding in initial_holdings_for_portfolio(portfolio_id=portfolio_id):
+        quantities[holding.asset_id] += Decimal(holding.quantity)
+
+    rows: list[PositionSnapshot] = []
+    current_dt: date | None = None
+
+    trades = trades_for_portfolio(portfolio_id=portfolio_id)
+    for tr, delta in signed_trade_quantities(trades_qs=trades):
+        if current_dt is not None and tr.date != current_dt:
+            rows.extend(_snapshot_rows(portfolio_id=portfolio_id, dt=current_dt, quantities=quantities))
+        current_dt = tr.date
+        quantities[tr.asset_id] += delta
+
+    if current_dt is not None:
+        rows.extend(_snapshot_rows(portfolio_id=portfolio_id, dt=current_dt, quantities=quantities))
+
+    PositionSnapshot.objects.bulk_create(rows, batch_size=5000)
+    return len(rows)
+
+
+# ---------------------------------------------------------------------
+# Ledger de posiciones vigentes
+# ---------------------------------------------------------------------
+# Una fila por (portafolio, activo) con la cantidad despues de todos los
+# trades: validar un SELL en la ultima fecha lee una fila por activo en vez
+# de reconstruir el historial. trade_create lo actualiza en su transaccion.
+
+# Diferencia admitida entre ledger y replay (el ledger guarda 10 decimales)
+LEDGER_TOLERANCE = Decimal("1e-8")
+
+
+def position_ledger_latest_date(*, ledger: dict[int, PositionLedger]) -> date | None:
+    # Fecha del ultimo trade del portafolio (as_of es por activo)
+    return max((row.as_of for row in ledger.values() if row.as_of), default=None)
+
+
+@transaction.atomic
+def position_ledger_rebuild(*, portfolio_id: int) -> dict[int, PositionLedger]:
+    """
+    Reemplaza el ledger del portafolio por el resultado de un replay completo.
+    """
+    quantities, last_trade_dates = position_quantities_replay(portfolio_id=portfolio_id)
+
+    PositionLedger.objects.filter(portfolio_id=portfolio_id).delete()
+    rows = PositionLedger.objects.bulk_create(
+        [
+            PositionLedger(
+                portfolio_id=portfolio_id,
+                asset_id=asset_id,
+                quantity=qty,
+                as_of=last_trade_dates.get(asset_id),
+            )
+            for asset_id, qty in quantities.items()
+        ]
+    )
+    return {row.asset_id: row for row in rows}
+
+
+def position_ledger_apply(
+    *,
+    portfolio_id: int,
+    ledger: dict[int, PositionLedger],
+    deltas: dict[int, Decimal],
+    last_dates: dict[int, date],
+) -> None:
+    """
+    Suma los deltas por activo a las filas (ya bloqueadas) del ledger;
+    last_dates es la fecha del ultimo trade aplicado a cada activo.
+    Debe llamarse dentro de la transaccion que crea los TradeLegs.
+    """
+    to_update, to_create = [], []
+    for asset_id, delta in deltas.items():
+        row = ledger.get(asset_id)
+        if row is None:
+            row = PositionLedger(portfolio_id=portfolio_id, asset_id=asset_id, quantity=Decimal("0"))
+            ledger[asset_id] = row
+            to_create.append(row)
+        else:
+            to_update.append(row)
+
+        dt = last_dates[asset_id]
+        row.quantity = Decimal(row.quantity) + delta
+        row.as_of = max(row.as_of, dt) if row.as_of else dt
+
+    if to_update:
+        PositionLedger.objects.bulk_update(to_update, ["quantity", "as_of"])
+    if to_create:
+        PositionLedger.objects.bulk_create(to_create)
+
+
+def position_ledger_discrepancies(
+    *, portfolio_id: int, tolerance: Decimal = LEDGER_TOLERANCE
+) -> list[tuple[int, Decimal, Decimal]]:
+    """
+    Compara el ledger contra un replay completo.
+    Retorna (asset_id, cantidad_ledger, cantidad_replay) de cada diferencia.
+    """
+    expected, _ = position_quantities_replay(portfolio_id=portfolio_id)
+    actual = {
+        asset_id: Decimal(row.quantity)
+        for asset_id, row in position_ledger_for_portfolio(portfolio_id=portfolio_id).items()
+    }
+
+    mismatches = []
+    for asset_id in sorted(expected.keys() | actual.keys()):
+        ledger_qty = actual.get(asset_id)
+        replay_qty = expected.get(asset_id, Decimal("0"))
+        if ledger_qty is None or abs(ledger_qty - replay_qty) > tolerance:
+            mismatches.append((asset_id, ledger_qty, replay_qty))
+    return mismatches
+
+
+def position_ledger_invalidate(*, portfolio_ids: Iterable[int]) -> int:
+    # Se reconstruye de forma diferida en el proximo trade_create
+    deleted, _ = PositionLedger.objects.filter(portfolio_id__in=list(portfolio_ids)).delete()
+    return deleted
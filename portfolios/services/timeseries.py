@@ -1,19 +1,279 @@
 from __future__ import annotations
 
 from decimal import Decimal
-from datetime import date
+from datetime import date, timedelta
 from collections import defaultdict
+from dataclasses import dataclass, replace
+from itertools import chain, groupby
+from operator import itemgetter
+from typing import Iterable, Iterator
 
+from django.conf import settings
+
+from portfolios.instrumentation import timed
 # Selectors:
 # - encapsulan queries a la base de datos
 # - evitan SQL dentro del calculo del portafolio
 from portfolios.selectors.holdings import initial_holdings_for_portfolio
 from portfolios.selectors.trades import trades_for_portfolio
-from portfolios.selectors.prices import prices_in_range, price_on_date
+from portfolios.selectors.positions import latest_snapshot_for_portfolio
+from portfolios.selectors.prices import price_dates_in_range, prices_in_range
+from portfolios.services.positions import signed_trade_quantities
+
+
+# Motores de calculo disponibles:
+# - decimal: implementacion de referencia, aritmetica Decimal fila a fila
+# - numpy: matrices fecha x activo en float64 (ver timeseries_numpy)
+# - sql: pushdown a la BD con funciones de ventana (ver timeseries_sql)
+ENGINE_DECIMAL = "decimal"
+ENGINE_NUMPY = "numpy"
+ENGINE_SQL = "sql"
+ENGINES = (ENGINE_DECIMAL, ENGINE_NUMPY, ENGINE_SQL)
+
+# Frecuencias de la serie: diaria (todas las fechas con precio) o solo el
+# ultimo dia con precio de cada semana ISO / mes / trimestre
+FREQ_DAILY = "D"
+FREQ_WEEKLY = "W"
+FREQ_MONTHLY = "M"
+FREQ_QUARTERLY = "Q"
+FREQUENCIES = (FREQ_DAILY, FREQ_WEEKLY, FREQ_MONTHLY, FREQ_QUARTERLY)
+
+# Filas de Price leidas por viaje a la BD en el motor Decimal
+PRICE_CHUNK_SIZE = 2000
+
+# Frame de la serie: (fecha, V_t, pesos en el orden de "assets")
+Frame = tuple[date, float, list[float]]
+
+# Precios de un dia: (fecha, {asset_id: precio})
+PriceDay = tuple[date, dict[int, Decimal]]
+
+
+@dataclass(frozen=True)
+class PortfolioState:
+    """
+    Entrada de los motores: activos del portafolio (orden de "assets"),
+    cantidades al inicio del rango y deltas de trades dentro del rango.
+    """
+    portfolio_id: int
+    asset_ids: list[int]
+    asset_codes: list[str]
+    base_qty: dict[int, Decimal]
+    delta_qty_by_date_asset: dict[tuple[date, int], Decimal]
+
+
+def resolve_engine(engine: str | None) -> str:
+    engine = engine or getattr(settings, "PORTFOLIOS_TIMESERIES_ENGINE", ENGINE_DECIMAL)
+    if engine not in ENGINES:
+        raise ValueError(f"Motor de timeseries desconocido: {engine}")
+    return engine
+
+
+def portfolio_timeseries(
+    *,
+    portfolio_id: int,
+    start: date,
+    end: date,
+    engine: str | None = None,
+    freq: str = FREQ_DAILY,
+) -> dict:
+    """
+    Serie temporal (V_t y w_{i,t}) del portafolio entre start y end.
+
+    `engine` selecciona el motor de calculo; si no se indica se usa
+    settings.PORTFOLIOS_TIMESERIES_ENGINE (por defecto "decimal").
+    `freq` (D|W|M|Q) limita la serie al cierre de cada periodo.
+    """
+    header, rows = portfolio_timeseries_stream(
+        portfolio_id=portfolio_id, start=start, end=end, engine=engine, freq=freq
+    )
+    return {**header, "rows": list(rows)}
+
+
+def portfolio_timeseries_stream(
+    *,
+    portfolio_id: int,
+    start: date,
+    end: date,
+    engine: str | None = None,
+    freq: str = FREQ_DAILY,
+) -> tuple[dict, Iterator[dict]]:
+    """
+    Variante en streaming de portfolio_timeseries: retorna la cabecera del
+    contrato (portfolio_id, start, end, assets) y un iterador de filas.
+
+    Los errores de dominio (sin holdings / sin precios) se levantan antes
+    de retornar, nunca a mitad de la iteracion.
+    """
+    header, frames = _timeseries_frames(
+        portfolio_id=portfolio_id, start=start, end=end, engine=engine, freq=freq
+    )
+    return header, _rows(asset_codes=header["assets"], frames=frames)
+
+
+def portfolio_timeseries_columnar(
+    *,
+    portfolio_id: int,
+    start: date,
+    end: date,
+    engine: str | None = None,
+    freq: str = FREQ_DAILY,
+) -> dict:
+    """
+    Misma serie en formato columnar: `dates` y `V` como arreglos y `weights`
+    como matriz fecha x activo, con columnas en el orden de `assets`.
+    Evita repetir los codigos de activo en cada fila.
+    """
+    header, frames = _timeseries_frames(
+        portfolio_id=portfolio_id, start=start, end=end, engine=engine, freq=freq
+    )
+
+    dates, values, weights = [], [], []
+    for dt, V, w in frames:
+        dates.append(dt.isoformat())
+        values.append(V)
+        weights.append(w)
+
+    return {**header, "dates": dates, "V": values, "weights": weights}
+
 
+@timed("timeseries_batch")
+def portfolios_timeseries(
+    *,
+    portfolio_ids: list[int],
+    start: date,
+    end: date,
+    engine: str | None = None,
+) -> list[dict]:
+    """
+    Serie temporal de varios portafolios en una sola pasada: los precios de
+    la union de sus activos se cargan una unica vez y se comparten, por lo
+    que el costo de lectura escala con los activos distintos y no con
+    portafolios x activos. Cada resultado tiene el contrato de portfolio_timeseries.
 
-def portfolio_timeseries(*, portfolio_id: int, start: date, end: date) -> dict:
+    Con el motor decimal todos los portafolios avanzan juntos sobre un unico
+    recorrido de los precios (un cursor, sin materializar el rango). La
+    excepcion es engine="sql": la serie se calcula en la BD, que relee los
+    precios con una query por portafolio.
+    """
+    engine = resolve_engine(engine)
+    states = [
+        _portfolio_state(portfolio_id=pid, start=start, end=end, with_deltas=engine != ENGINE_SQL)
+        for pid in portfolio_ids
+    ]
+    union_asset_ids = sorted({aid for state in states for aid in state.asset_ids})
 
+    frames_by_state: Iterable[Iterator[Frame]]
+    if engine == ENGINE_SQL:
+        from portfolios.services.timeseries_sql import sql_frames
+
+        # Los precios no llegan a Python: una query por portafolio
+        frames_by_state = (sql_frames(state=state, start=start, end=end) for state in states)
+    elif engine == ENGINE_NUMPY:
+        from portfolios.services.timeseries_numpy import numpy_frames, price_matrix, price_submatrix
+
+        dates, P = price_matrix(asset_ids=union_asset_ids, start=start, end=end)
+        column = {aid: j for j, aid in enumerate(union_asset_ids)}
+
+        def frames_for(state: PortfolioState) -> Iterator[Frame]:
+            # Solo las columnas y fechas con precio de los activos propios
+            own_dates, own_P = price_submatrix(
+                dates=dates, P=P, columns=[column[aid] for aid in state.asset_ids]
+            )
+            return numpy_frames(state=state, dates=own_dates, P=own_P)
+
+        frames_by_state = map(frames_for, states)
+    else:
+        days = _price_days(asset_ids=union_asset_ids, start=start, end=end)
+        frames_by_state = _decimal_frames_batch(states=states, days=days)
+
+    return [
+        {
+            **_header(state=state, start=start, end=end),
+            "rows": list(_rows(asset_codes=state.asset_codes, frames=frames)),
+        }
+        for state, frames in zip(states, frames_by_state)
+    ]
+
+
+def _header(*, state: PortfolioState, start: date, end: date) -> dict:
+    # Contrato del endpoint, sin las filas
+    return {
+        "portfolio_id": state.portfolio_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "assets": state.asset_codes,
+    }
+
+
+def _rows(*, asset_codes: list[str], frames: Iterator[Frame]) -> Iterator[dict]:
+    return (
+        {
+            "date": dt.isoformat(),
+            "V": V,                                 # Valor total del portafolio en t
+            "weights": dict(zip(asset_codes, w)),   # Pesos por activo en t
+        }
+        for dt, V, w in frames
+    )
+
+
+def _timeseries_frames(
+    *,
+    portfolio_id: int,
+    start: date,
+    end: date,
+    engine: str | None,
+    freq: str = FREQ_DAILY,
+) -> tuple[dict, Iterator[Frame]]:
+    """
+    Nucleo comun: cabecera del contrato + iterador de frames
+    (fecha, V_t, [w_{i,t} en el orden de assets]) del motor elegido.
+    """
+    engine = resolve_engine(engine)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Frecuencia desconocida: {freq}")
+
+    if engine == ENGINE_SQL:
+        from portfolios.services.timeseries_sql import sql_frames
+
+        # La BD lee los trades del rango: desde Python solo van las cantidades base
+        state = _portfolio_state(portfolio_id=portfolio_id, start=start, end=end, with_deltas=False)
+        eval_dates = None
+        if freq != FREQ_DAILY:
+            _, eval_dates = _resample_state(state=state, start=start, end=end, freq=freq)
+        frames = sql_frames(state=state, start=start, end=end, dates=eval_dates)
+        return _header(state=state, start=start, end=end), frames
+
+    state = _portfolio_state(portfolio_id=portfolio_id, start=start, end=end)
+
+    # Con freq != D solo se evaluan los cierres de periodo: se leen solo
+    # esos precios y los deltas del periodo se acumulan en su cierre
+    eval_dates = None
+    if freq != FREQ_DAILY:
+        state, eval_dates = _resample_state(state=state, start=start, end=end, freq=freq)
+
+    # ------------------------------------------------------------------
+    # 3) y 4) Precios + serie temporal (segun motor)
+    # ------------------------------------------------------------------
+    if engine == ENGINE_NUMPY:
+        # Import diferido: numpy solo se carga si se usa el motor
+        from portfolios.services.timeseries_numpy import numpy_frames, price_matrix
+
+        dates, P = price_matrix(asset_ids=state.asset_ids, start=start, end=end, dates=eval_dates)
+        frames = numpy_frames(state=state, dates=dates, P=P)
+    else:
+        days = _price_days(asset_ids=state.asset_ids, start=start, end=end, dates=eval_dates)
+        frames = _decimal_frames(state=state, days=days)
+
+    return _header(state=state, start=start, end=end), frames
+
+
+def _portfolio_state(
+    *, portfolio_id: int, start: date, end: date, with_deltas: bool = True
+) -> PortfolioState:
+    """
+    with_deltas=False: solo las cantidades al inicio del rango (no se leen
+    los trades posteriores a start; los usa el motor sql).
+    """
     # ------------------------------------------------------------------
     # 1) Holdings iniciales (estado base del portafolio en t0)
     # ------------------------------------------------------------------
@@ -26,14 +286,15 @@ def portfolio_timeseries(*, portfolio_id: int, start: date, end: date) -> dict:
 
     # Lista de activos del portafolio
     assets = [h.asset for h in holdings_qs]
-    asset_ids = [a.id for a in assets]
-    asset_codes = [a.code for a in assets]
-
-    # Mapeo id
-    id_to_code = {a.id: a.code for a in assets}
 
-    # Cantidades base por activo (q_i en t0)
-    base_qty = {h.asset_id: Decimal(h.quantity) for h in holdings_qs}
+    # Cantidades base por activo: se parte del snapshot mas reciente antes
+    # de start (o de los holdings iniciales, q_i en t0) y se reconstruye
+    # solo la cola de trades posterior
+    snapshot_date, base_qty = latest_snapshot_for_portfolio(
+        portfolio_id=portfolio_id, on_or_before=start - timedelta(days=1)
+    )
+    if snapshot_date is None:
+        base_qty = {h.asset_id: Decimal(h.quantity) for h in holdings_qs}
 
     # ------------------------------------------------------------------
     # 2) Trades (bonus del enunciado)
@@ -41,7 +302,9 @@ def portfolio_timeseries(*, portfolio_id: int, start: date, end: date) -> dict:
     # Trades representan cambios en cantidades:
     # BUY  -> +delta_qty
     # SELL -> -delta_qty
-    trades = list(trades_for_portfolio(portfolio_id=portfolio_id, start=None, end=end))
+    tail_start = snapshot_date + timedelta(days=1) if snapshot_date else None
+    tail_end = end if with_deltas else start - timedelta(days=1)
+    trades_qs = trades_for_portfolio(portfolio_id=portfolio_id, start=tail_start, end=tail_end)
 
     # delta_qty_by_date_asset[(date, asset_id)] = cambio en cantidad
     # Usamos defaultdict para evitar inicializaciones manuales
@@ -49,107 +312,175 @@ def portfolio_timeseries(*, portfolio_id: int, start: date, end: date) -> dict:
         lambda: Decimal("0")
     )
 
-    for tr in trades:
-        # Precio del activo en la fecha del trade
-        px = price_on_date(asset_id=tr.asset_id, dt=tr.date)
-
-        # Si no hay precio, el trade no se puede aplicar
-        if not px or Decimal(px.price) == 0:
-            continue
-
-        # amount_usd / price = cantidad transada
-        delta = Decimal(tr.amount_usd) / Decimal(px.price)
-
-        # SELL reduce cantidad
-        if tr.side == "SELL":
-            delta = -delta
-
+    # Cada trade ya viene convertido a cantidad (amount_usd / precio del dia);
+    # los precios de todos los trades se resuelven en una sola query
+    for tr, delta in signed_trade_quantities(trades_qs=trades_qs):
         # Trades anteriores al start ajustan el estado base
         if tr.date < start:
             base_qty[tr.asset_id] = base_qty.get(tr.asset_id, Decimal("0")) + delta
         else:
             delta_qty_by_date_asset[(tr.date, tr.asset_id)] += delta
 
+    return PortfolioState(
+        portfolio_id=portfolio_id,
+        asset_ids=[a.id for a in assets],
+        asset_codes=[a.code for a in assets],
+        base_qty=base_qty,
+        delta_qty_by_date_asset=delta_qty_by_date_asset,
+    )
+
+
+def _period_key(dt: date, freq: str) -> tuple[int, int]:
+    if freq == FREQ_WEEKLY:
+        iso = dt.isocalendar()
+        return iso.year, iso.week
+    if freq == FREQ_MONTHLY:
+        return dt.year, dt.month
+    return dt.year, (dt.month - 1) // 3
+
+
+def _resample_state(
+    *, state: PortfolioState, start: date, end: date, freq: str
+) -> tuple[PortfolioState, list[date]]:
+    """
+    Fechas de cierre de periodo (ultima fecha con precio de cada periodo) y
+    el estado con los deltas de cada fecha movidos a su cierre.
+
+    Los valores en los cierres coinciden con los de la serie diaria: igual
+    que en ella, solo cuentan los deltas de fechas con precio.
+    """
+    price_dates = price_dates_in_range(asset_ids=state.asset_ids, start=start, end=end)
+    if not price_dates:
+        raise ValueError("No hay precios disponibles en el rango solicitado")
+
+    # price_dates viene ordenado: la ultima fecha de cada grupo es el cierre
+    period_end = {}
+    eval_dates = []
+    for _, group in groupby(price_dates, key=lambda dt: _period_key(dt, freq)):
+        group = list(group)
+        eval_dates.append(group[-1])
+        period_end.update(dict.fromkeys(group, group[-1]))
+
+    deltas: dict[tuple[date, int], Decimal] = defaultdict(lambda: Decimal("0"))
+    for (dt, aid), delta in state.delta_qty_by_date_asset.items():
+        close = period_end.get(dt)
+        if close is not None:
+            deltas[(close, aid)] += delta
+
+    return replace(state, delta_qty_by_date_asset=deltas), eval_dates
+
+
+def _price_days(
+    *, asset_ids: list[int], start: date, end: date, dates: list[date] | None = None
+) -> Iterator[PriceDay]:
+    """
+    Precios del rango agrupados por dia, leidos con un cursor ordenado por
+    fecha: la memoria no depende del largo del rango.
+    """
     # ------------------------------------------------------------------
     # 3) Precios historicos en el rango solicitado
     # ------------------------------------------------------------------
-    prices = list(prices_in_range(asset_ids=asset_ids, start=start, end=end))
-    prices_by_date: dict[date, dict[int, Decimal]] = defaultdict(dict)
-
-    for pr in prices:
-        prices_by_date[pr.date][pr.asset_id] = Decimal(pr.price)
-        
-    dates = sorted(prices_by_date.keys())
-    if not dates:
+    points = (
+        prices_in_range(asset_ids=asset_ids, start=start, end=end, dates=dates)
+        .values_list("date", "asset_id", "price")
+        .iterator(chunk_size=PRICE_CHUNK_SIZE)
+    )
+
+    first = next(points, None)
+    if first is None:
         raise ValueError("No hay precios disponibles en el rango solicitado")
 
+    return (
+        (dt, {aid: Decimal(px) for _, aid, px in day_points})
+        for dt, day_points in groupby(chain([first], points), key=itemgetter(0))
+    )
+
+
+def _decimal_frames(*, state: PortfolioState, days: Iterator[PriceDay]) -> Iterator[Frame]:
+    """
+    Motor de referencia: recorre fecha x activo con aritmetica Decimal.
+    """
     # ------------------------------------------------------------------
     # serie temporal
     # ------------------------------------------------------------------
-    current_qty = dict(base_qty)
-
-    rows = []
-
-    for dt in dates:
-        # --------------------------------------------------------------
-        # 4.1) Aplicar trades del dia dt
-        # --------------------------------------------------------------
-        # Actualizamos cantidades:
-        # q_{i,t} = q_{i,t-1} + delta_qty_{i,t}
-        for aid in asset_ids:
-            current_qty[aid] = current_qty.get(aid, Decimal("0")) + delta_qty_by_date_asset.get(
-                (dt, aid), Decimal("0")
-            )
+    current_qty = dict(state.base_qty)
+
+    for dt, prices_today in days:
+        yield _decimal_frame(state=state, current_qty=current_qty, dt=dt, prices_today=prices_today)
 
-        # --------------------------------------------------------------
-        # 4.2) Calcular valores x_{i,t} y V_t
-        # --------------------------------------------------------------
-        x_by_asset = {}
-        V = Decimal("0")
 
-        for aid in asset_ids:
-            px = prices_by_date[dt].get(aid)
-            if px is None:
+def _decimal_frames_batch(
+    *, states: list[PortfolioState], days: Iterator[PriceDay]
+) -> list[Iterator[Frame]]:
+    """
+    Motor decimal para varios portafolios: un unico recorrido de `days`
+    (precios de la union de activos) avanza el estado de todos. Cada
+    portafolio solo emite las fechas con precio de alguno de sus activos.
+    """
+    own_assets = [set(state.asset_ids) for state in states]
+    current_qty = [dict(state.base_qty) for state in states]
+    frames: list[list[Frame]] = [[] for _ in states]
+
+    for dt, prices_today in days:
+        for i, state in enumerate(states):
+            if own_assets[i].isdisjoint(prices_today):
                 continue
+            frames[i].append(
+                _decimal_frame(state=state, current_qty=current_qty[i], dt=dt, prices_today=prices_today)
+            )
 
-            # x_{i,t} = price_{i,t} * quantity_{i,t}
-            x = px * current_qty.get(aid, Decimal("0"))
-            x_by_asset[aid] = x
-            V += x
-
-        # --------------------------------------------------------------
-        # 4.3) Calcular pesos w_{i,t}
-        # --------------------------------------------------------------
-        weights = {}
-
-        if V != 0:
-            # w_{i,t} = x_{i,t} / V_t
-            for aid in asset_ids:
-                x = x_by_asset.get(aid, Decimal("0"))
-                weights[id_to_code[aid]] = float(x / V)
-        else:
-            # Caso defensivo: portafolio vacio
-            for code in asset_codes:
-                weights[code] = 0.0
-
-        # --------------------------------------------------------------
-        # 4.4) Agregar fila de la serie temporal
-        # --------------------------------------------------------------
-        rows.append(
-            {
-                "date": dt.isoformat(),
-                "V": float(V),          # Valor total del portafolio en t
-                "weights": weights,     # Pesos por activo en t
-            }
+    if not all(frames):
+        raise ValueError("No hay precios disponibles en el rango solicitado")
+    return [iter(portfolio_frames) for portfolio_frames in frames]
+
+
+def _decimal_frame(
+    *, state: PortfolioState, current_qty: dict[int, Decimal], dt: date, prices_today: dict[int, Decimal]
+) -> Frame:
+    """
+    Un dia del motor decimal: aplica los trades de dt sobre current_qty (que
+    se actualiza en el lugar) y valoriza con los precios del dia.
+    """
+    asset_ids = state.asset_ids
+    delta_qty_by_date_asset = state.delta_qty_by_date_asset
+
+    # --------------------------------------------------------------
+    # 4.1) Aplicar trades del dia dt
+    # --------------------------------------------------------------
+    # Actualizamos cantidades:
+    # q_{i,t} = q_{i,t-1} + delta_qty_{i,t}
+    for aid in asset_ids:
+        current_qty[aid] = current_qty.get(aid, Decimal("0")) + delta_qty_by_date_asset.get(
+            (dt, aid), Decimal("0")
         )
 
-    # ------------------------------------------------------------------
-    # 5) Respuesta final (contrato del endpoint)
-    # ------------------------------------------------------------------
-    return {
-        "portfolio_id": portfolio_id,
-        "start": start.isoformat(),
-        "end": end.isoformat(),
-        "assets": asset_codes,
-        "rows": rows,
-    }
+    # --------------------------------------------------------------
+    # 4.2) Calcular valores x_{i,t} y V_t
+    # --------------------------------------------------------------
+    x_by_asset = {}
+    V = Decimal("0")
+
+    for aid in asset_ids:
+        px = prices_today.get(aid)
+        if px is None:
+            continue
+
+        # x_{i,t} = price_{i,t} * quantity_{i,t}
+        x = px * current_qty.get(aid, Decimal("0"))
+        x_by_asset[aid] = x
+        V += x
+
+    # --------------------------------------------------------------
+    # 4.3) Calcular pesos w_{i,t}
+    # --------------------------------------------------------------
+    if V != 0:
+        # w_{i,t} = x_{i,t} / V_t
+        weights = [float(x_by_asset.get(aid, Decimal("0")) / V) for aid in asset_ids]
+    else:
+        # Caso defensivo: portafolio vacio
+        weights = [0.0] * len(asset_ids)
+
+    # --------------------------------------------------------------
+    # 4.4) Frame de la serie temporal
+    # --------------------------------------------------------------
+    return dt, float(V), weights
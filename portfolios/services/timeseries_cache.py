@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import threading
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+
+from portfolios.instrumentation import timed
+from portfolios.models import Portfolio
+from portfolios.services.timeseries import (
+    FREQ_DAILY,
+    resolve_engine,
+    portfolio_timeseries,
+    portfolio_timeseries_columnar,
+)
+
+
+# ---------------------------------------------------------------------
+# Cache de resultados de portfolio_timeseries
+# ---------------------------------------------------------------------
+# La clave incluye (portfolio, start, end, engine, freq, layout) y la version de cache es
+# Portfolio.data_version: trade_create y el ETL la incrementan, por lo que
+# nunca se sirve un resultado calculado con datos anteriores. Las entradas
+# viejas simplemente dejan de leerse y salen por LRU/TIMEOUT.
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def _timeseries_cache():
+    return caches[getattr(settings, "PORTFOLIOS_TIMESERIES_CACHE", "timeseries")]
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def timeseries_cache_key(
+    *,
+    portfolio_id: int,
+    start: date,
+    end: date,
+    engine: str,
+    freq: str = FREQ_DAILY,
+    columnar: bool = False,
+) -> str:
+    layout = "columnar" if columnar else "rows"
+    return f"timeseries:{portfolio_id}:{start.isoformat()}:{end.isoformat()}:{engine}:{freq}:{layout}"
+
+
+@timed("timeseries")
+def portfolio_timeseries_cached(
+    *,
+    portfolio: Portfolio,
+    start: date,
+    end: date,
+    engine: str | None = None,
+    freq: str = FREQ_DAILY,
+    columnar: bool = False,
+) -> dict:
+    """
+    portfolio_timeseries (o portfolio_timeseries_columnar si columnar=True)
+    con cache versionada por portfolio.data_version.
+    Los errores de dominio (ValueError) no se cachean.
+    """
+    engine = resolve_engine(engine)
+    cache = _timeseries_cache()
+    key = timeseries_cache_key(
+        portfolio_id=portfolio.id, start=start, end=end, engine=engine, freq=freq, columnar=columnar
+    )
+
+    data = cache.get(key, version=portfolio.data_version)
+    if data is not None:
+        _count("hits")
+        return data
+
+    _count("misses")
+    compute = portfolio_timeseries_columnar if columnar else portfolio_timeseries
+    data = compute(portfolio_id=portfolio.id, start=start, end=end, engine=engine, freq=freq)
+    cache.set(key, data, version=portfolio.data_version)
+    return data
+
+
+def timeseries_cache_stats() -> dict:
+    """
+    Contadores del proceso actual (cada worker tiene los suyos).
+    evictions/entries/max_entries solo estan disponibles con CountingLocMemCache.
+    """
+    cache = _timeseries_cache()
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "evictions": getattr(cache, "evictions", None),
+        "entries": getattr(cache, "entries", None),
+        "max_entries": getattr(cache, "max_entries", None),
+    }
+
+
+def timeseries_cache_stats_reset() -> None:
+    with _stats_lock:
+        _stats["hits"] = 0
+        _stats["misses"] = 0
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+from functools import partial
+from uuid import UUID
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from portfolios.models import Portfolio, TimeseriesJob
+from portfolios.services.timeseries import FREQ_DAILY, portfolio_timeseries, resolve_engine
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------
+# Jobs de timeseries en segundo plano
+# ---------------------------------------------------------------------
+# Para rangos que superan los timeouts del proxy: el POST encola un
+# TimeseriesJob y el cliente consulta su estado. Sin broker externo, la
+# cola es la propia tabla:
+# - PORTFOLIOS_TIMESERIES_JOBS = "process": al commit, el job se envia al
+#   pool de procesos local (executors.process_executor).
+# - "worker": solo se encola; lo ejecuta `python manage.py timeseries_worker`.
+# El worker toma cualquier PENDING, por lo que tambien recupera los jobs que
+# quedaron sin enviar (p.ej. si el proceso web se reinicio).
+#
+# Lease (PORTFOLIOS_TIMESERIES_JOB_LEASE_SECONDS): un job RUNNING cuyo
+# proceso murio, o uno PENDING que nadie tomo, no debe quedar vivo para
+# siempre. Pasado el lease se marca FAILED y deja de reutilizarse: el
+# siguiente POST con los mismos parametros crea un job nuevo.
+
+JOBS_MODE_PROCESS = "process"
+JOBS_MODE_WORKER = "worker"
+
+
+def jobs_mode() -> str:
+    return getattr(settings, "PORTFOLIOS_TIMESERIES_JOBS", JOBS_MODE_PROCESS)
+
+
+def job_lease() -> timedelta:
+    return timedelta(seconds=getattr(settings, "PORTFOLIOS_TIMESERIES_JOB_LEASE_SECONDS", 3600))
+
+
+def _live_jobs(*, cutoff: datetime) -> Q:
+    return (
+        Q(status=TimeseriesJob.SUCCESS)
+        | Q(status=TimeseriesJob.RUNNING, started_at__gte=cutoff)
+        | Q(status=TimeseriesJob.PENDING, created_at__gte=cutoff)
+    )
+
+
+def timeseries_job_is_stale(job: TimeseriesJob) -> bool:
+    cutoff = timezone.now() - job_lease()
+    if job.status == TimeseriesJob.RUNNING:
+        return job.started_at is not None and job.started_at < cutoff
+    return job.status == TimeseriesJob.PENDING and job.created_at < cutoff
+
+
+def timeseries_jobs_expire(*, job_id: UUID | None = None) -> int:
+    """
+    Marca FAILED los jobs con el lease vencido (todos, o solo `job_id`).
+    """
+    now = timezone.now()
+    cutoff = now - job_lease()
+    qs = TimeseriesJob.objects.all()
+    if job_id is not None:
+        qs = qs.filter(id=job_id)
+
+    expired = qs.filter(status=TimeseriesJob.RUNNING, started_at__lt=cutoff).update(
+        status=TimeseriesJob.FAILED,
+        error="El job no termino dentro del lease (proceso caido?)",
+        finished_at=now,
+    )
+    expired += qs.filter(status=TimeseriesJob.PENDING, created_at__lt=cutoff).update(
+        status=TimeseriesJob.FAILED,
+        error="El job no fue tomado dentro del lease",
+        finished_at=now,
+    )
+    return expired
+
+
+def timeseries_job_create(
+    *,
+    portfolio: Portfolio,
+    start: date,
+    end: date,
+    engine: str | None = None,
+    freq: str = FREQ_DAILY,
+) -> TimeseriesJob:
+    """
+    Encola el calculo. Si ya hay un job con los mismos parametros y la misma
+    data_version (terminado, o pendiente / en curso dentro del lease) se
+    retorna ese.
+    """
+    engine = resolve_engine(engine)
+    existing = (
+        TimeseriesJob.objects.filter(
+            _live_jobs(cutoff=timezone.now() - job_lease()),
+            portfolio=portfolio,
+            start=start,
+            end=end,
+            engine=engine,
+            freq=freq,
+            data_version=portfolio.data_version,
+        )
+        .order_by("-created_at")
+        .first()
+    )
+    if existing:
+        return existing
+
+    job = TimeseriesJob.objects.create(
+        portfolio=portfolio,
+        start=start,
+        end=end,
+        engine=engine,
+        freq=freq,
+        data_version=portfolio.data_version,
+    )
+    if jobs_mode() == JOBS_MODE_PROCESS:
+        transaction.on_commit(lambda: timeseries_job_submit(job_id=job.id))
+    return job
+
+
+def timeseries_job_submit(*, job_id: UUID) -> None:
+    from portfolios.executors import process_executor, process_executor_discard
+
+    # Un pool roto (murio un hijo) rechaza todo submit: se reemplaza y se reintenta
+    for _ in range(2):
+        executor = process_executor()
+        try:
+            future = executor.submit(_timeseries_job_run_in_process, job_id=job_id)
+        except BrokenProcessPool:
+            process_executor_discard(executor)
+            continue
+        except RuntimeError:
+            # Pool cerrado (shutdown): el job queda PENDING para el worker o el lease
+            logger.exception("No se pudo enviar el job %s al pool de procesos", job_id)
+            return
+        future.add_done_callback(partial(_timeseries_job_done, job_id=job_id, executor=executor))
+        return
+
+    logger.error("No se pudo enviar el job %s: el pool de procesos sigue roto", job_id)
+
+
+def _timeseries_job_done(future: Future, *, job_id: UUID, executor) -> None:
+    # Corre en el hilo de gestion del pool, en el proceso web
+    from portfolios.executors import process_executor_discard
+
+    if future.cancelled() or not isinstance(future.exception(), BrokenProcessPool):
+        return
+
+    process_executor_discard(executor)
+    try:
+        # El hijo murio: si el job ya corria (probablemente es el que lo mato)
+        # no se reintenta; si seguia en la cola del pool, va a un pool nuevo
+        TimeseriesJob.objects.filter(id=job_id, status=TimeseriesJob.RUNNING).update(
+            status=TimeseriesJob.FAILED,
+            error="El proceso que ejecutaba el job termino inesperadamente",
+            finished_at=timezone.now(),
+        )
+        pending = TimeseriesJob.objects.filter(id=job_id, status=TimeseriesJob.PENDING).exists()
+    finally:
+        close_old_connections()
+    if pending:
+        timeseries_job_submit(job_id=job_id)
+
+
+def _timeseries_job_run_in_process(*, job_id: UUID) -> bool:
+    # Los procesos del pool viven mucho: igual que en un request, se
+    # descartan las conexiones vencidas (CONN_MAX_AGE) antes y despues
+    close_old_connections()
+    try:
+        return timeseries_job_run(job_id=job_id)
+    finally:
+        close_old_connections()
+
+
+def timeseries_job_next() -> UUID | None:
+    return (
+        TimeseriesJob.objects.filter(status=TimeseriesJob.PENDING)
+        .order_by("created_at")
+        .values_list("id", flat=True)
+        .first()
+    )
+
+
+def timeseries_job_run(*, job_id: UUID) -> bool:
+    """
+    Ejecuta un job PENDING. La toma es un UPDATE condicional: si otro
+    proceso ya lo tomo retorna False. Los errores quedan en el job (FAILED).
+    """
+    claimed = TimeseriesJob.objects.filter(id=job_id, status=TimeseriesJob.PENDING).update(
+        status=TimeseriesJob.RUNNING, started_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    job = TimeseriesJob.objects.select_related("portfolio").get(id=job_id)
+    try:
+        result = portfolio_timeseries(
+            portfolio_id=job.portfolio_id,
+            start=job.start,
+            end=job.end,
+            engine=job.engine,
+            freq=job.freq,
+        )
+    except Exception as exc:
+        if not isinstance(exc, ValueError):
+            logger.exception("Job de timeseries %s fallo", job_id)
+        TimeseriesJob.objects.filter(id=job_id).update(
+            status=TimeseriesJob.FAILED, error=str(exc), finished_at=timezone.now()
+        )
+        return True
+
+    TimeseriesJob.objects.filter(id=job_id).update(
+        status=TimeseriesJob.SUCCESS,
+        result=result,
+        # Version de los datos leidos (puede ser posterior a la del encolado)
+        data_version=job.portfolio.data_version,
+        finished_at=timezone.now(),
+    )
+    return True
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterator
+
+import numpy as np
+
+from portfolios.selectors.prices import price_points_in_range
+from portfolios.services.timeseries import Frame, PortfolioState
+
+
+# ---------------------------------------------------------------------
+# Motor vectorizado de la serie temporal
+# ---------------------------------------------------------------------
+# Mismo modelo que el motor Decimal, expresado con matrices fecha x activo:
+#   P[t, i] = precio (NaN si no hay precio ese dia)
+#   Q[t, i] = q_i(base) + cumsum_t(delta_qty[t, i])
+#   X = P * Q (0 donde no hay precio),  V = sum_i X,  W = X / V
+#
+# Todo se calcula en float64, por lo que los resultados difieren del motor
+# Decimal solo por redondeo binario. Tolerancia documentada (ver tests de
+# paridad): error relativo <= 1e-9 en V y error absoluto <= 1e-9 en pesos.
+RELATIVE_TOLERANCE_V = 1e-9
+ABSOLUTE_TOLERANCE_WEIGHTS = 1e-9
+
+
+def price_matrix(
+    *, asset_ids: list[int], start: date, end: date, dates: list[date] | None = None
+) -> tuple[list[date], np.ndarray]:
+    """
+    Matriz densa de precios fecha x activo (columnas en el orden de asset_ids),
+    con NaN donde no hay precio. Solo incluye fechas con algun precio
+    (y, si se indica `dates`, solo esas fechas).
+    """
+    points = list(price_points_in_range(asset_ids=asset_ids, start=start, end=end, dates=dates))
+    if not points:
+        raise ValueError("No hay precios disponibles en el rango solicitado")
+
+    dates = sorted({dt for dt, _, _ in points})
+    date_idx = {dt: i for i, dt in enumerate(dates)}
+    asset_idx = {aid: j for j, aid in enumerate(asset_ids)}
+
+    rows_i = np.fromiter((date_idx[dt] for dt, _, _ in points), dtype=np.intp, count=len(points))
+    cols_j = np.fromiter((asset_idx[aid] for _, aid, _ in points), dtype=np.intp, count=len(points))
+    values = np.fromiter((px for _, _, px in points), dtype=np.float64, count=len(points))
+
+    P = np.full((len(dates), len(asset_ids)), np.nan)
+    P[rows_i, cols_j] = values
+    return dates, P
+
+
+def price_submatrix(
+    *, dates: list[date], P: np.ndarray, columns: list[int]
+) -> tuple[list[date], np.ndarray]:
+    """
+    Columnas de una matriz compartida (p.ej. la union de activos de varios
+    portafolios), descartando las fechas sin ningun precio en esas columnas.
+    """
+    own = P[:, columns]
+    has_price = ~np.isnan(own).all(axis=1)
+    if not has_price.any():
+        raise ValueError("No hay precios disponibles en el rango solicitado")
+    return [dt for dt, keep in zip(dates, has_price) if keep], own[has_price]
+
+
+def numpy_frames(
+    *,
+    state: PortfolioState,
+    dates: list[date],
+    P: np.ndarray,
+) -> Iterator[Frame]:
+    asset_ids = state.asset_ids
+    date_idx = {dt: i for i, dt in enumerate(dates)}
+    asset_idx = {aid: j for j, aid in enumerate(asset_ids)}
+
+    # ------------------------------------------------------------------
+    # 1) Cantidades: base + suma acumulada de deltas por fecha
+    # ------------------------------------------------------------------
+    base = np.array([float(state.base_qty.get(aid, 0)) for aid in asset_ids], dtype=np.float64)
+
+    D = np.zeros_like(P)
+    for (dt, aid), delta in state.delta_qty_by_date_asset.items():
+        # Igual que el motor Decimal: solo aplican deltas en fechas con precio
+        i = date_idx.get(dt)
+        j = asset_idx.get(aid)
+        if i is not None and j is not None:
+            D[i, j] += float(delta)
+
+    Q = base + np.cumsum(D, axis=0)
+
+    # ------------------------------------------------------------------
+    # 2) Valores, V_t y pesos
+    # ------------------------------------------------------------------
+    X = np.where(np.isnan(P), 0.0, P * Q)
+    V = X.sum(axis=1)
+
+    # Caso defensivo (V == 0): pesos en 0, igual que el motor Decimal
+    W = np.divide(X, V[:, None], out=np.zeros_like(X), where=V[:, None] != 0)
+
+    # Las matrices son float64 (8 bytes por celda); los objetos Python de
+    # cada fila se construyen recien al iterar
+    return ((dt, float(V[i]), W[i].tolist()) for i, dt in enumerate(dates))
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterator
+
+from django.db import connection
+
+from portfolios.models import Price, TradeLeg
+from portfolios.services.timeseries import Frame, PortfolioState
+
+
+# ---------------------------------------------------------------------
+# Motor SQL (pushdown con funciones de ventana)
+# ---------------------------------------------------------------------
+# Mismo modelo que los motores decimal / numpy, calculado en la BD:
+#   q_{i,t} = q_i(base) + SUM(delta_{i,s}) OVER (PARTITION BY i ORDER BY t)
+#   x_{i,t} = precio_{i,t} * q_{i,t},   V_t = SUM(x_{i,t}) OVER (PARTITION BY t)
+# Python solo envia las cantidades base (una por activo) y recibe, por fecha
+# y activo con precio, el peso ya calculado y V_t: los precios crudos nunca
+# salen de la BD. Funciona en SQLite (>= 3.25) y PostgreSQL.
+#
+# La aritmetica es float de la BD (REAL en SQLite; en PostgreSQL numeric
+# por float8): misma tolerancia que el motor numpy frente al de referencia.
+
+# Filas leidas por viaje desde el cursor
+SQL_FETCH_SIZE = 5000
+
+
+def _q(name: str) -> str:
+    return connection.ops.quote_name(name)
+
+
+def _timeseries_sql(*, n_assets: int, n_dates: int) -> str:
+    price = _q(Price._meta.db_table)
+    trade = _q(TradeLeg._meta.db_table)
+    base_values = ", ".join(["(%s, %s)"] * n_assets)
+    asset_list = ", ".join(["%s"] * n_assets)
+    # Con freq != D solo se devuelven los cierres de periodo; la suma
+    # acumulada igual recorre todas las fechas con precio
+    date_filter = f"WHERE v.{_q('date')} IN ({', '.join(['%s'] * n_dates)})" if n_dates else ""
+    d, a = _q("date"), _q("asset_id")
+
+    return f"""
+        WITH base (asset_id, qty) AS (
+            VALUES {base_values}
+        ),
+        px AS (
+            SELECT p.{d} AS dt, p.{a} AS asset_id, p.{_q('price')} AS price
+            FROM {price} p
+            WHERE p.{a} IN ({asset_list}) AND p.{d} BETWEEN %s AND %s
+        ),
+        days AS (
+            SELECT DISTINCT dt FROM px
+        ),
+        deltas AS (
+            -- Cantidad firmada de los trades del rango; los trades sin
+            -- cantidad registrada se convierten con el precio de su fecha.
+            -- Sin precio o con precio 0 quedan en NULL y SUM los ignora
+            -- (como signed_trade_quantities; PostgreSQL fallaria al dividir por 0)
+            SELECT t.{d} AS dt, t.{a} AS asset_id,
+                   SUM(
+                       CASE WHEN t.{_q('side')} = %s THEN -1.0 ELSE 1.0 END
+                       * COALESCE(
+                           t.{_q('quantity')},
+                           t.{_q('amount_usd')} * 1.0 / NULLIF(tp.{_q('price')}, 0)
+                       )
+                   ) AS dq
+            FROM {trade} t
+            LEFT JOIN {price} tp ON tp.{a} = t.{a} AND tp.{d} = t.{d}
+            WHERE t.{_q('portfolio_id')} = %s AND t.{d} BETWEEN %s AND %s
+            GROUP BY t.{d}, t.{a}
+        ),
+        qty AS (
+            -- Solo aplican deltas en fechas con precio (igual que los otros motores)
+            SELECT g.dt, b.asset_id,
+                   b.qty + SUM(COALESCE(dl.dq, 0)) OVER (
+                       PARTITION BY b.asset_id ORDER BY g.dt ROWS UNBOUNDED PRECEDING
+                   ) AS q
+            FROM days g
+            CROSS JOIN base b
+            LEFT JOIN deltas dl ON dl.dt = g.dt AND dl.asset_id = b.asset_id
+        ),
+        vals AS (
+            SELECT q.dt AS {d}, q.asset_id, px.price * q.q AS x
+            FROM qty q
+            JOIN px ON px.dt = q.dt AND px.asset_id = q.asset_id
+        ),
+        v AS (
+            SELECT {d}, asset_id, x, SUM(x) OVER (PARTITION BY {d}) AS total
+            FROM vals
+        )
+        SELECT v.{d}, v.asset_id, v.x / NULLIF(v.total, 0), v.total
+        FROM v
+        {date_filter}
+        ORDER BY v.{d}, v.asset_id
+    """
+
+
+def sql_frames(
+    *,
+    state: PortfolioState,
+    start: date,
+    end: date,
+    dates: list[date] | None = None,
+) -> Iterator[Frame]:
+    """
+    Frames de la serie calculados en la BD. `state` solo aporta activos y
+    cantidades base (los deltas del rango se leen en SQL); `dates` limita
+    la salida a esas fechas (cierres de periodo).
+    """
+    asset_ids = state.asset_ids
+    adapt = connection.ops.adapt_datefield_value
+    sql = _timeseries_sql(n_assets=len(asset_ids), n_dates=len(dates or ()))
+    params = [
+        *(value for aid in asset_ids for value in (aid, float(state.base_qty.get(aid, 0)))),
+        *asset_ids,
+        adapt(start),
+        adapt(end),
+        TradeLeg.SELL,
+        state.portfolio_id,
+        adapt(start),
+        adapt(end),
+        *(adapt(dt) for dt in dates or ()),
+    ]
+
+    cursor = connection.cursor()
+    cursor.execute(sql, params)
+    first = cursor.fetchmany(SQL_FETCH_SIZE)
+    if not first:
+        cursor.close()
+        raise ValueError("No hay precios disponibles en el rango solicitado")
+
+    return _frames(asset_ids=asset_ids, cursor=cursor, first=first)
+
+
+def _frames(*, asset_ids: list[int], cursor, first: list[tuple]) -> Iterator[Frame]:
+    def rows():
+        try:
+            yield from first
+            while chunk := cursor.fetchmany(SQL_FETCH_SIZE):
+                yield from chunk
+        finally:
+            cursor.close()
+
+    column = {aid: j for j, aid in enumerate(asset_ids)}
+    for dt, day_rows in groupby(rows(), key=itemgetter(0)):
+        weights = [0.0] * len(asset_ids)
+        V = 0.0
+        for _, aid, weight, total in day_rows:
+            # weight es NULL cuando V_t == 0 (pesos en 0, igual que los otros motores)
+            weights[column[aid]] = float(weight or 0.0)
+            V = float(total or 0.0)
+        # SQLite devuelve las fechas como texto
+        yield (dt if isinstance(dt, date) else date.fromisoformat(str(dt))), V, weights
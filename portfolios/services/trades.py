@@ -8,10 +8,18 @@ from datetime import date
 from django.db import transaction
 from django.core.exceptions import ValidationError
 
+from portfolios.instrumentation import timed
 from portfolios.models import TradeLeg, Asset
-from portfolios.selectors.prices import price_on_date
-from portfolios.selectors.holdings import initial_holdings_for_portfolio
-from portfolios.selectors.trades import trades_for_portfolio
+from portfolios.selectors.positions import position_ledger_for_portfolio
+from portfolios.selectors.prices import price_on_date, prices_for_trades
+from portfolios.services.portfolios import portfolio_data_version_bump, portfolio_lock
+from portfolios.services.positions import (
+    position_ledger_apply,
+    position_ledger_latest_date,
+    position_ledger_rebuild,
+    position_quantities,
+    position_snapshot_record,
+)
 
 
 # ---------------------------------------------------------------------
@@ -36,26 +44,14 @@ class TradeLegInput:
 # ---------------------------------------------------------------------
 def _current_quantities(*, portfolio_id: int, up_to_dt: date) -> dict[int, Decimal]:
     """
-    Cantidades actuales por asset calculadas a partir de holdings iniciales
-    y trades ya persistidos hasta la fecha indicada (inclusive).
+    Cantidades actuales por asset calculadas a partir del snapshot mas reciente
+    (o los holdings iniciales) y los trades persistidos hasta la fecha indicada (inclusive).
     """
-    quantities: dict[int, Decimal] = defaultdict(lambda: Decimal("0"))
-
-    for holding in initial_holdings_for_portfolio(portfolio_id=portfolio_id):
-        quantities[holding.asset_id] += Decimal(holding.quantity)
-
-    for tr in trades_for_portfolio(portfolio_id=portfolio_id, end=up_to_dt):
-        px = price_on_date(asset_id=tr.asset_id, dt=tr.date)
-        if not px or Decimal(px.price) == 0:
-            continue
-        delta = Decimal(tr.amount_usd) / Decimal(px.price)
-        if tr.side == TradeLeg.SELL:
-            delta = -delta
-        quantities[tr.asset_id] += delta
-
-    return quantities
+    return position_quantities(portfolio_id=portfolio_id, up_to_dt=up_to_dt)
 
 
+# timed por fuera de atomic: incluye el commit
+@timed("trade_create")
 @transaction.atomic
 def trade_create(
     *,
@@ -70,10 +66,30 @@ def trade_create(
     - Cada leg representa una operacion independiente
     - El impacto real en el portafolio se calcula luego, al reconstruir la serie temporal (no aqui)
     - La funcion es atomica: o se crean todos los legs o ninguno
+    - El ledger de posiciones, el snapshot al cierre de dt y la data_version
+      del portafolio se actualizan en la misma transaccion
     """
 
     created: list[TradeLeg] = []
-    quantities = _current_quantities(portfolio_id=portfolio_id, up_to_dt=dt)
+
+    # El portafolio queda bloqueado hasta el commit (antes de leer el ledger,
+    # que puede estar vacio): dos trades concurrentes del mismo portafolio no
+    # validan contra el mismo saldo ni reconstruyen el ledger a la vez
+    portfolio_lock(portfolio_id=portfolio_id)
+    ledger = position_ledger_for_portfolio(portfolio_id=portfolio_id, for_update=True)
+    if not ledger:
+        # Ledger aun no inicializado (datos previos o recien importados)
+        ledger = position_ledger_rebuild(portfolio_id=portfolio_id)
+
+    latest = position_ledger_latest_date(ledger=ledger)
+    if latest is None or dt >= latest:
+        # El ledger ya refleja todos los trades hasta dt: una fila por activo
+        quantities = {asset_id: Decimal(row.quantity) for asset_id, row in ledger.items()}
+    else:
+        # Trade retroactivo: las cantidades en dt se reconstruyen desde snapshots
+        quantities = _current_quantities(portfolio_id=portfolio_id, up_to_dt=dt)
+
+    deltas: dict[int, Decimal] = defaultdict(lambda: Decimal("0"))
 
     for leg in legs:
         asset = Asset.objects.filter(code=leg.asset_code).first()
@@ -94,8 +110,10 @@ def trade_create(
                     {"legs": f"Cantidad insuficiente de {asset.code} para vender; disponible={available}, solicitado={delta_qty}"}
                 )
             quantities[asset.id] = new_qty
+            deltas[asset.id] -= delta_qty
         else:
             quantities[asset.id] = quantities.get(asset.id, Decimal("0")) + delta_qty
+            deltas[asset.id] += delta_qty
 
         created.append(
             TradeLeg.objects.create(
@@ -104,6 +122,58 @@ def trade_create(
                 asset=asset,
                 side=leg.side,
                 amount_usd=leg.amount_usd,
+                executed_price=px.price,
+                quantity=delta_qty,
             )
         )
+
+    position_ledger_apply(
+        portfolio_id=portfolio_id,
+        ledger=ledger,
+        deltas=deltas,
+        last_dates=dict.fromkeys(deltas, dt),
+    )
+    position_snapshot_record(portfolio_id=portfolio_id, dt=dt, quantities=quantities)
+    portfolio_data_version_bump(portfolio_ids=[portfolio_id])
     return created
+
+
+# ---------------------------------------------------------------------
+# Backfill de precio/cantidad ejecutados
+# ---------------------------------------------------------------------
+def trade_quantities_backfill(*, batch_size: int = 1000) -> tuple[int, int]:
+    """
+    Completa executed_price y quantity de los trades que no los tienen,
+    con el precio de su fecha. Avanza por id en lotes (una transaccion por
+    lote) y deja en nulo los trades sin precio.
+
+    Retorna (actualizados, sin_precio).
+    """
+    updated = skipped = 0
+    last_id = 0
+
+    while True:
+        batch = list(
+            TradeLeg.objects
+            .filter(quantity__isnull=True, id__gt=last_id)
+            .order_by("id")[:batch_size]
+        )
+        if not batch:
+            return updated, skipped
+        last_id = batch[-1].id
+
+        with transaction.atomic():
+            prices = prices_for_trades(trades=TradeLeg.objects.filter(id__in=[tr.id for tr in batch]))
+
+            to_update = []
+            for tr in batch:
+                px = prices.get((tr.asset_id, tr.date))
+                if not px:
+                    skipped += 1
+                    continue
+                tr.executed_price = px
+                tr.quantity = Decimal(tr.amount_usd) / px
+                to_update.append(tr)
+
+            TradeLeg.objects.bulk_update(to_update, ["executed_price", "quantity"], batch_size=batch_size)
+            updated += len(to_update)
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import csv
+import json
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import groupby
+from typing import Iterable, Iterator, TextIO
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from portfolios.instrumentation import timed
+from portfolios.models import Asset, Portfolio, TradeLeg
+from portfolios.selectors.positions import position_ledger_for_portfolio
+from portfolios.selectors.prices import prices_for_pairs
+from portfolios.selectors.trades import trades_for_portfolio
+from portfolios.services.portfolios import portfolio_data_version_bump, portfolio_lock
+from portfolios.services.positions import (
+    position_ledger_apply,
+    position_ledger_rebuild,
+    position_quantities,
+    position_snapshots_record,
+    signed_trade_quantities,
+)
+
+
+# ---------------------------------------------------------------------
+# Carga masiva de trades
+# ---------------------------------------------------------------------
+# A diferencia de trade_create (un request = una fecha, un portafolio), aqui
+# se procesan miles de filas de una vez:
+# - activos, portafolios y precios se resuelven con unas pocas queries
+# - la cantidad disponible se valida en memoria, en orden cronologico
+# - los TradeLegs se insertan con bulk_create en lotes, en una transaccion
+# Las filas invalidas se reportan (numero de fila + motivo) y no detienen la
+# carga, salvo en modo estricto.
+
+TRADE_ROW_FIELDS = ("portfolio", "date", "asset", "side", "amount_usd")
+
+# Limites de TradeLeg.amount_usd (DecimalField(max_digits=20, decimal_places=2))
+_AMOUNT_FIELD = TradeLeg._meta.get_field("amount_usd")
+AMOUNT_MAX_INTEGER_DIGITS = _AMOUNT_FIELD.max_digits - _AMOUNT_FIELD.decimal_places
+AMOUNT_QUANTUM = Decimal(1).scaleb(-_AMOUNT_FIELD.decimal_places)
+
+
+@dataclass(frozen=True)
+class TradeRowInput:
+    row: int            # numero de fila en la entrada (para reportar rechazos)
+    portfolio_id: int
+    date: date
+    asset_code: str
+    side: str
+    amount_usd: Decimal
+
+
+@dataclass(frozen=True)
+class TradeRowReject:
+    row: int
+    error: str
+
+
+@dataclass
+class TradesBulkResult:
+    created: int = 0
+    rejected: list[TradeRowReject] = field(default_factory=list)
+    # Sentencias INSERT usadas (ver trade_legs_batch_size)
+    batches: int = 0
+
+
+# ---------------------------------------------------------------------
+# Parsing (CSV / JSONL / dicts)
+# ---------------------------------------------------------------------
+
+def trade_row_parse(*, row: int, raw: dict) -> TradeRowInput | TradeRowReject:
+    """
+    Convierte un dict con TRADE_ROW_FIELDS en TradeRowInput, o en un
+    rechazo con el motivo si el formato es invalido.
+    """
+    missing = [f for f in TRADE_ROW_FIELDS if raw.get(f) in (None, "")]
+    if missing:
+        return TradeRowReject(row=row, error=f"Faltan campos: {', '.join(missing)}")
+
+    try:
+        portfolio_id = int(raw["portfolio"])
+        dt = raw["date"] if isinstance(raw["date"], date) else date.fromisoformat(str(raw["date"]))
+        amount_usd = Decimal(str(raw["amount_usd"]))
+    except (TypeError, ValueError, InvalidOperation) as exc:
+        return TradeRowReject(row=row, error=f"Formato invalido: {exc}")
+
+    side = str(raw["side"]).upper()
+    if side not in (TradeLeg.BUY, TradeLeg.SELL):
+        return TradeRowReject(row=row, error=f"side invalido: {raw['side']}")
+    if not _amount_usd_valid(amount_usd):
+        return TradeRowReject(row=row, error=f"amount_usd invalido: {raw['amount_usd']}")
+
+    return TradeRowInput(
+        row=row,
+        portfolio_id=portfolio_id,
+        date=dt,
+        asset_code=str(raw["asset"]).strip(),
+        side=side,
+        amount_usd=amount_usd,
+    )
+
+
+def _amount_usd_valid(amount_usd: Decimal) -> bool:
+    # NaN / Infinity no se comparan ni cuantizan: se descartan antes
+    if not amount_usd.is_finite() or amount_usd <= 0:
+        return False
+    # Entra en la columna: a lo sumo 2 decimales y 18 digitos enteros
+    # (chequeado antes de quantize, que falla con exponentes enormes)
+    if amount_usd.adjusted() >= AMOUNT_MAX_INTEGER_DIGITS:
+        return False
+    try:
+        return amount_usd == amount_usd.quantize(AMOUNT_QUANTUM)
+    except InvalidOperation:
+        return False
+
+
+def trade_rows_from_csv(*, stream: TextIO) -> Iterator[TradeRowInput | TradeRowReject]:
+    # Fila 1 es la cabecera: los numeros coinciden con las lineas del archivo
+    for line, raw in enumerate(csv.DictReader(stream), start=2):
+        yield trade_row_parse(row=line, raw=raw)
+
+
+def trade_rows_from_jsonl(*, stream: TextIO) -> Iterator[TradeRowInput | TradeRowReject]:
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            raw = json.loads(text)
+        except json.JSONDecodeError as exc:
+            yield TradeRowReject(row=line, error=f"JSON invalido: {exc.msg}")
+            continue
+        if not isinstance(raw, dict):
+            yield TradeRowReject(row=line, error="Se esperaba un objeto JSON")
+            continue
+        yield trade_row_parse(row=line, raw=raw)
+
+
+# ---------------------------------------------------------------------
+# Validacion y persistencia
+# ---------------------------------------------------------------------
+
+@timed("trades_bulk")
+@transaction.atomic
+def trades_bulk_create(
+    *,
+    rows: Iterable[TradeRowInput | TradeRowReject],
+    strict: bool = False,
+    batch_size: int = 1000,
+) -> TradesBulkResult:
+    """
+    Valida e inserta un lote de trades de uno o mas portafolios.
+
+    Mismas reglas que trade_create (activo y precio existentes, un SELL no
+    puede dejar la cantidad en negativo a su fecha), evaluadas en orden
+    (fecha, fila) por portafolio. Los rechazos de parsing recibidos en
+    `rows` se incluyen en el resultado.
+
+    strict=True: cualquier rechazo levanta ValidationError y no se inserta nada.
+    """
+    result = TradesBulkResult()
+    accepted_input: list[TradeRowInput] = []
+    for row in rows:
+        if isinstance(row, TradeRowReject):
+            result.rejected.append(row)
+        else:
+            accepted_input.append(row)
+
+    # ------------------------------------------------------------------
+    # 1) Resolucion en bloque: portafolios, activos y precios
+    # ------------------------------------------------------------------
+    portfolio_ids = set(
+        Portfolio.objects
+        .filter(id__in={r.portfolio_id for r in accepted_input})
+        .values_list("id", flat=True)
+    )
+    asset_ids = dict(
+        Asset.objects
+        .filter(code__in={r.asset_code for r in accepted_input})
+        .values_list("code", "id")
+    )
+
+    candidates: list[tuple[TradeRowInput, int]] = []
+    for r in accepted_input:
+        if r.portfolio_id not in portfolio_ids:
+            result.rejected.append(TradeRowReject(row=r.row, error=f"Portfolio {r.portfolio_id} no existe"))
+        elif r.asset_code not in asset_ids:
+            result.rejected.append(TradeRowReject(row=r.row, error=f"Asset no existe: {r.asset_code}"))
+        else:
+            candidates.append((r, asset_ids[r.asset_code]))
+
+    prices = prices_for_pairs(pairs={(aid, r.date) for r, aid in candidates}) if candidates else {}
+
+    # ------------------------------------------------------------------
+    # 2) Validacion cronologica en memoria, por portafolio
+    # ------------------------------------------------------------------
+    legs: list[TradeLeg] = []
+    candidates.sort(key=lambda c: (c[0].portfolio_id, c[0].date, c[0].row))
+
+    for portfolio_id, group in groupby(candidates, key=lambda c: c[0].portfolio_id):
+        group = list(group)
+        accepted = _portfolio_rows_validate(
+            portfolio_id=portfolio_id, rows=group, prices=prices, rejected=result.rejected
+        )
+        legs.extend(
+            TradeLeg(
+                portfolio_id=portfolio_id,
+                date=r.date,
+                asset_id=asset_id,
+                side=r.side,
+                amount_usd=r.amount_usd,
+                executed_price=px,
+                quantity=quantity,
+            )
+            for r, asset_id, px, quantity in accepted
+        )
+
+    result.rejected.sort(key=lambda reject: reject.row)
+    if strict and result.rejected:
+        raise ValidationError(
+            {"rows": [f"fila {reject.row}: {reject.error}" for reject in result.rejected]}
+        )
+
+    # ------------------------------------------------------------------
+    # 3) Persistencia
+    # ------------------------------------------------------------------
+    size = trade_legs_batch_size(legs=legs, batch_size=batch_size)
+    TradeLeg.objects.bulk_create(legs, batch_size=size)
+    result.created = len(legs)
+    result.batches = math.ceil(len(legs) / size)
+
+    touched = {leg.portfolio_id for leg in legs}
+    if touched:
+        portfolio_data_version_bump(portfolio_ids=sorted(touched))
+    return result
+
+
+def trade_legs_batch_size(*, legs: list[TradeLeg], batch_size: int) -> int:
+    """
+    Filas por INSERT: batch_size acotado por el limite del backend para
+    TradeLeg (p.ej. variables por sentencia en SQLite).
+    """
+    fields = [f for f in TradeLeg._meta.concrete_fields if not f.primary_key]
+    return max(1, min(batch_size, connection.ops.bulk_batch_size(fields, legs)))
+
+
+def _portfolio_rows_validate(
+    *,
+    portfolio_id: int,
+    rows: list[tuple[TradeRowInput, int]],
+    prices: dict[tuple[int, date], Decimal],
+    rejected: list[TradeRowReject],
+) -> list[tuple[TradeRowInput, int, Decimal, Decimal]]:
+    """
+    Valida las filas de un portafolio (ordenadas por fecha) y actualiza su
+    ledger y snapshots con las aceptadas. Retorna las filas aceptadas como
+    (fila, asset_id, precio, cantidad).
+    """
+    # Bloquea el portafolio y su ledger (igual que trade_create)
+    portfolio_lock(portfolio_id=portfolio_id)
+    ledger = position_ledger_for_portfolio(portfolio_id=portfolio_id, for_update=True)
+    if not ledger:
+        ledger = position_ledger_rebuild(portfolio_id=portfolio_id)
+
+    # Estado al dia anterior a la primera fila + trades ya persistidos dentro
+    # del rango del lote (carga retroactiva), aplicados antes que las filas
+    # nuevas de la misma fecha
+    first_dt, last_dt = rows[0][0].date, rows[-1][0].date
+    quantities = position_quantities(portfolio_id=portfolio_id, up_to_dt=first_dt - timedelta(days=1))
+    existing: dict[date, list[tuple[int, Decimal]]] = defaultdict(list)
+    for tr, delta in signed_trade_quantities(
+        trades_qs=trades_for_portfolio(portfolio_id=portfolio_id, start=first_dt, end=last_dt)
+    ):
+        existing[tr.date].append((tr.asset_id, delta))
+
+    accepted: list[tuple[TradeRowInput, int, Decimal, Decimal]] = []
+    deltas: dict[int, Decimal] = defaultdict(lambda: Decimal("0"))
+    last_dates: dict[int, date] = {}
+    checkpoints: dict[date, dict[int, Decimal]] = {}
+
+    def apply_existing(until: date) -> None:
+        for dt in sorted(d for d in existing if d <= until):
+            for asset_id, delta in existing.pop(dt):
+                quantities[asset_id] += delta
+
+    for dt, day_rows in groupby(rows, key=lambda c: c[0].date):
+        apply_existing(dt)
+
+        day_accepted = False
+        for r, asset_id in day_rows:
+            px = prices.get((asset_id, dt))
+            if not px:
+                rejected.append(TradeRowReject(row=r.row, error=f"No hay precio para {r.asset_code} en {dt}"))
+                continue
+
+            # amount_usd / price = cantidad transada
+            delta_qty = r.amount_usd / px
+            if r.side == TradeLeg.SELL:
+                available = quantities.get(asset_id, Decimal("0"))
+                if available - delta_qty < 0:
+                    rejected.append(
+                        TradeRowReject(
+                            row=r.row,
+                            error=f"Cantidad insuficiente de {r.asset_code} para vender; disponible={available}, solicitado={delta_qty}",
+                        )
+                    )
+                    continue
+                delta_qty = -delta_qty
+
+            quantities[asset_id] += delta_qty
+            deltas[asset_id] += delta_qty
+            last_dates[asset_id] = dt
+            accepted.append((r, asset_id, px, abs(delta_qty)))
+            day_accepted = True
+
+        if day_accepted:
+            checkpoints[dt] = dict(quantities)
+
+    if accepted:
+        position_ledger_apply(
+            portfolio_id=portfolio_id, ledger=ledger, deltas=deltas, last_dates=last_dates
+        )
+        position_snapshots_record(portfolio_id=portfolio_id, checkpoints=checkpoints)
+    return accepted
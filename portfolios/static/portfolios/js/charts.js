@@ -39,47 +39,23 @@
     };
   }
 
-  // Retornos simples desde V(t)
-  function calcReturns(V) {
-    const r = [];
-    for (let i = 1; i < V.length; i++) {
-      const prev = V[i - 1];
-      const cur = V[i];
-      if (isFinite(prev) && isFinite(cur) && prev !== 0) r.push(cur / prev - 1);
-    }
-    return r;
-  }
-
-  function mean(arr) {
-    return arr.length ? arr.reduce((a, b) => a + b, 0) / arr.length : 0;
-  }
-
-  function stdev(arr) {
-    if (arr.length < 2) return 0;
-    const m = mean(arr);
-    const v = mean(arr.map((x) => (x - m) ** 2));
-    return Math.sqrt(v);
-  }
-
-  // Drawdown: (V / maxHastaAhora) - 1
-  function calcDrawdown(V) {
-    let peak = -Infinity;
-    return V.map((v) => {
-      if (v > peak) peak = v;
-      return peak > 0 ? v / peak - 1 : 0;
-    });
+  function validateTimeseries(data) {
+    if (!data || typeof data !== "object") throw new Error("Respuesta invalida: el JSON no es objeto.");
+    if (!Array.isArray(data.dates)) throw new Error("Respuesta invalida: falta 'dates'.");
+    if (!Array.isArray(data.V)) throw new Error("Respuesta invalida: falta 'V'.");
+    if (!Array.isArray(data.weights)) throw new Error("Respuesta invalida: falta 'weights'.");
+    if (!Array.isArray(data.assets)) throw new Error("Respuesta invalida: falta 'assets'.");
   }
 
-  function validatePayload(data) {
+  function validateAnalytics(data) {
     if (!data || typeof data !== "object") throw new Error("Respuesta invalida: el JSON no es objeto.");
-    if (!Array.isArray(data.rows)) throw new Error("Respuesta invalida: falta 'rows'.");
-    if (!Array.isArray(data.assets)) throw new Error("Respuesta invalida: falta 'assets'.");
+    if (!data.summary) throw new Error("Respuesta invalida: falta 'summary'.");
+    if (!Array.isArray(data.drawdown)) throw new Error("Respuesta invalida: falta 'drawdown'.");
   }
 
-  async function fetchTimeseries({ portfolioId, start, end, signal }) {
-    const api = new URL(`/api/portfolios/${portfolioId}/timeseries/`, window.location.origin);
-    api.searchParams.set("start", start);
-    api.searchParams.set("end", end);
+  async function fetchJson(path, params, signal) {
+    const api = new URL(path, window.location.origin);
+    Object.entries(params).forEach(([k, v]) => api.searchParams.set(k, v));
 
     const res = await fetch(api.toString(), {
       signal,
@@ -98,8 +74,26 @@
       const detail = body?.detail || body?.start || body?.error || res.statusText;
       throw new Error(`API error ${res.status}: ${detail}`);
     }
+    return body;
+  }
+
+  // Serie en formato columnar: dates, V y weights (fecha x activo), sin
+  // repetir codigos de activo por fila
+  async function fetchTimeseries({ portfolioId, start, end, signal }) {
+    const body = await fetchJson(
+      `/api/portfolios/${portfolioId}/timeseries/`,
+      { start, end, format: "columnar" },
+      signal
+    );
+    validateTimeseries(body);
+    return body;
+  }
 
-    validatePayload(body);
+  // Retornos, volatilidad y drawdown se calculan en el servidor sobre la
+  // misma serie cacheada
+  async function fetchAnalytics({ portfolioId, start, end, signal }) {
+    const body = await fetchJson(`/api/portfolios/${portfolioId}/analytics/`, { start, end }, signal);
+    validateAnalytics(body);
     return body;
   }
 
@@ -134,10 +128,10 @@
     });
   }
 
-  function buildWeightsChart({ labels, rows, assets }) {
-    const datasets = assets.map((a) => ({
+  function buildWeightsChart({ labels, weights, assets }) {
+    const datasets = assets.map((a, j) => ({
       label: a,
-      data: rows.map((r) => Number((r.weights && r.weights[a]) ?? 0)),
+      data: weights.map((w) => Number(w[j] ?? 0)),
       pointRadius: 0,
       borderWidth: 1,
       tension: 0.25,
@@ -201,16 +195,11 @@
     });
   }
 
-  function setKpis({ V }) {
-    const v0 = V[0] ?? 0;
-    const vT = V[V.length - 1] ?? 0;
-    const ret = (v0 && vT) ? vT / v0 - 1 : 0;
-
-    const r = calcReturns(V);
-    const vol = stdev(r);
-
-    const dd = calcDrawdown(V);
-    const maxDD = dd.length ? Math.min(...dd) : 0;
+  function setKpis({ summary }) {
+    const vT = summary.final_value ?? NaN;
+    const ret = summary.total_return ?? NaN;
+    const vol = summary.annualized_volatility ?? NaN;
+    const maxDD = summary.max_drawdown ?? NaN;
 
     const ids = ["kpiValue", "kpiReturn", "kpiVol", "kpiDD"];
     const values = [
@@ -225,8 +214,10 @@
     });
 
     const ddMeta = document.getElementById("ddMeta");
-    if (ddMeta) ddMeta.textContent = `Minimo: ${fmtPct.format(maxDD)}`;
-    return dd;
+    if (ddMeta && isFinite(maxDD)) {
+      ddMeta.textContent = `Minimo: ${fmtPct.format(maxDD)}` +
+        (summary.max_drawdown_date ? ` (${summary.max_drawdown_date})` : "");
+    }
   }
 
   async function load() {
@@ -242,22 +233,26 @@
     const badge = document.getElementById("rangeBadge");
     if (badge) badge.textContent = `Rango: ${start} a ${end}`;
 
-    let data;
+    let data, analytics;
     try {
-      data = await fetchTimeseries({ portfolioId, start, end, signal: abortCtl.signal });
+      const signal = abortCtl.signal;
+      // En secuencia: con la cache fria, dos requests en paralelo calcularian
+      // la serie dos veces; analytics llega despues y la lee de la cache
+      data = await fetchTimeseries({ portfolioId, start, end, signal });
+      analytics = await fetchAnalytics({ portfolioId, start, end, signal });
     } catch (err) {
       console.error(err);
       setStatus("danger", err.message || "Fallo al obtener la serie.");
       return;
     }
 
-    if (!data.rows.length) {
+    if (!data.dates.length) {
       setStatus("warning", "No hay datos en el rango seleccionado.");
       return;
     }
 
-    const labels = data.rows.map((r) => r.date);
-    const V = data.rows.map((r) => Number(r.V ?? 0));
+    const labels = data.dates;
+    const V = data.V.map((v) => Number(v ?? 0));
 
     const vMeta = document.getElementById("vMeta");
     if (vMeta) vMeta.textContent = `${labels.length} puntos`;
@@ -266,11 +261,11 @@
 
     initChartDefaults();
 
-    const dd = setKpis({ V });
+    setKpis({ summary: analytics.summary });
 
     charts.v = buildValueChart({ labels, V });
-    charts.w = buildWeightsChart({ labels, rows: data.rows, assets: data.assets });
-    charts.dd = buildDrawdownChart({ labels, dd });
+    charts.w = buildWeightsChart({ labels, weights: data.weights, assets: data.assets });
+    charts.dd = buildDrawdownChart({ labels, dd: analytics.drawdown });
 
     setStatus(null, null);
   }
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import AsyncRequestFactory, TransactionTestCase, override_settings
+
+from portfolios.apis import portfolio_timeseries as timeseries_api
+from portfolios.apis.async_views import async_api
+from portfolios.apis.import_status import LatestImportStatusApi
+from portfolios.apis.portfolio_timeseries import PortfolioTimeseriesApi
+from portfolios.executors import POOL_COMPUTE, executors_shutdown
+from portfolios.instrumentation import PerformanceMiddleware
+from portfolios.models import Asset, DataImport, InitialHolding, Portfolio, Price
+
+
+# Las vistas async corren en hilos del pool: con TestCase no verian los datos
+# de la transaccion del test
+class AsyncApiTests(TransactionTestCase):
+    def setUp(self):
+        caches["timeseries"].clear()
+        self.addCleanup(executors_shutdown)
+        self.factory = AsyncRequestFactory()
+
+        asset = Asset.objects.create(code="US", name="United States")
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=date(2022, 2, 15),
+            initial_value=Decimal("1000000"),
+        )
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=asset, quantity=Decimal("10"))
+        for day, px in ((15, "100"), (16, "110")):
+            Price.objects.create(asset=asset, date=date(2022, 2, day), price=Decimal(px))
+        DataImport.objects.create(source_name="datos.xlsx", file_hash="abc123", status="SUCCESS")
+
+        self.timeseries = async_api(PortfolioTimeseriesApi, pool=POOL_COMPUTE)
+        self.import_status = async_api(LatestImportStatusApi)
+
+    def _timeseries_request(self, **params):
+        return self.factory.get(
+            f"/api/portfolios/{self.portfolio.id}/timeseries/",
+            {"start": "2022-02-15", "end": "2022-02-16", **params},
+        )
+
+    def _blocking_timeseries(self, *, started: threading.Semaphore, release: threading.Event):
+        compute = timeseries_api.portfolio_timeseries_cached
+
+        def slow(**kwargs):
+            started.release()
+            release.wait(5)
+            return compute(**kwargs)
+
+        return mock.patch.object(timeseries_api, "portfolio_timeseries_cached", side_effect=slow)
+
+    async def test_timeseries_matches_streamed_response(self):
+        buffered = await self.timeseries(self._timeseries_request(), portfolio_id=self.portfolio.id)
+        streamed = await self.timeseries(
+            self._timeseries_request(stream="true"), portfolio_id=self.portfolio.id
+        )
+
+        self.assertEqual(buffered.status_code, 200)
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(b"".join([chunk async for chunk in streamed]), buffered.content)
+
+    async def test_validation_errors_are_returned(self):
+        resp = await self.timeseries(
+            self._timeseries_request(start="2020-01-01"), portfolio_id=self.portfolio.id
+        )
+
+        self.assertEqual(resp.status_code, 400)
+
+    @override_settings(PORTFOLIOS_ASYNC_POOLS={"compute": 1, "default": 1})
+    async def test_cheap_request_does_not_queue_behind_timeseries(self):
+        started, release = threading.Semaphore(0), threading.Event()
+
+        with self._blocking_timeseries(started=started, release=release):
+            slow = asyncio.ensure_future(
+                self.timeseries(self._timeseries_request(), portfolio_id=self.portfolio.id)
+            )
+            self.assertTrue(await asyncio.to_thread(started.acquire, timeout=5))
+
+            # El pool "compute" esta ocupado: el status se atiende igual
+            resp = await asyncio.wait_for(self.import_status(self.factory.get("/api/imports/latest/")), 2)
+            self.assertEqual(resp.status_code, 200)
+            self.assertFalse(slow.done())
+
+            release.set()
+            self.assertEqual((await slow).status_code, 200)
+
+    @override_settings(PORTFOLIOS_ASYNC_POOLS={"compute": 1, "default": 1})
+    async def test_compute_pool_bounds_concurrent_timeseries(self):
+        started, release = threading.Semaphore(0), threading.Event()
+
+        with self._blocking_timeseries(started=started, release=release):
+            requests = [
+                asyncio.ensure_future(
+                    self.timeseries(self._timeseries_request(), portfolio_id=self.portfolio.id)
+                )
+                for _ in range(2)
+            ]
+            self.assertTrue(await asyncio.to_thread(started.acquire, timeout=5))
+            # El segundo espera en la cola del pool
+            self.assertFalse(await asyncio.to_thread(started.acquire, timeout=0.2))
+
+            release.set()
+            responses = await asyncio.gather(*requests)
+
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+
+    async def test_middleware_records_queries_from_pool_threads(self):
+        async def get_response(request):
+            return await self.timeseries(request, portfolio_id=self.portfolio.id)
+
+        middleware = PerformanceMiddleware(get_response)
+        resp = await middleware(self._timeseries_request())
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertRegex(resp["Server-Timing"], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn("timeseries;dur=", resp["Server-Timing"])
@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from portfolios.apis import portfolio_timeseries as timeseries_api
+from portfolios.models import Asset, DataImport, InitialHolding, Portfolio, Price
+from portfolios.services.trades import TradeLegInput, trade_create
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        caches["timeseries"].clear()
+        self.client = APIClient()
+        asset = Asset.objects.create(code="US", name="United States")
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=date(2022, 2, 15),
+            initial_value=Decimal("1000000"),
+        )
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=asset, quantity=Decimal("10"))
+        for day, px in ((15, "100"), (16, "110")):
+            Price.objects.create(asset=asset, date=date(2022, 2, day), price=Decimal(px))
+        DataImport.objects.create(source_name="datos.xlsx", file_hash="abc123", status="SUCCESS")
+        # Last-Modified tiene resolucion de segundos: el import queda en el pasado
+        DataImport.objects.update(imported_at=timezone.now() - timedelta(hours=1))
+
+        self.url = f"/api/portfolios/{self.portfolio.id}/timeseries/"
+        self.params = {"start": "2022-02-15", "end": "2022-02-16"}
+
+    def test_timeseries_not_modified_skips_computation(self):
+        first = self.client.get(self.url, self.params)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", first)
+
+        with mock.patch.object(timeseries_api, "portfolio_timeseries_cached") as compute:
+            with self.assertNumQueries(1):
+                resp = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b"")
+        compute.assert_not_called()
+
+    def test_timeseries_etag_depends_on_representation(self):
+        rows = self.client.get(self.url, self.params)
+        columnar = self.client.get(self.url, {**self.params, "format": "columnar"})
+        other_range = self.client.get(self.url, {**self.params, "end": "2022-02-15"})
+
+        self.assertEqual(len({rows["ETag"], columnar["ETag"], other_range["ETag"]}), 3)
+        resp = self.client.get(
+            self.url, {**self.params, "format": "columnar"}, HTTP_IF_NONE_MATCH=rows["ETag"]
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    def test_timeseries_etag_changes_with_new_trade(self):
+        first = self.client.get(self.url, self.params)
+
+        trade_create(
+            portfolio_id=self.portfolio.id,
+            dt=date(2022, 2, 16),
+            legs=[TradeLegInput(asset_code="US", side="BUY", amount_usd=Decimal("110"))],
+        )
+
+        resp = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], first["ETag"])
+        # Last-Modified avanza con el cambio de datos del portafolio
+        modified = self.client.get(self.url, self.params, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(modified.status_code, 200)
+
+    def test_timeseries_unknown_portfolio_has_no_validators(self):
+        resp = self.client.get("/api/portfolios/999/timeseries/", self.params)
+
+        self.assertEqual(resp.status_code, 404)
+        self.assertNotIn("ETag", resp)
+
+    def test_import_status_conditional_requests(self):
+        first = self.client.get("/api/imports/latest/")
+        self.assertEqual(first.status_code, 200)
+
+        by_etag = self.client.get("/api/imports/latest/", HTTP_IF_NONE_MATCH=first["ETag"])
+        by_date = self.client.get("/api/imports/latest/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual((by_etag.status_code, by_date.status_code), (304, 304))
+
+        DataImport.objects.create(
+            source_name="datos.xlsx",
+            file_hash="def456",
+            status="SUCCESS",
+        )
+
+        resp = self.client.get("/api/imports/latest/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["file_hash"], "def456")
+        self.assertNotEqual(resp["Last-Modified"], first["Last-Modified"])
@@ -0,0 +1,70 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from portfolios.models import Asset, InitialHolding, Portfolio, Price
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        caches["timeseries"].clear()
+        self.client = APIClient()
+        asset = Asset.objects.create(code="US", name="United States")
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=date(2022, 2, 15),
+            initial_value=Decimal("1000000"),
+        )
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=asset, quantity=Decimal("10"))
+        Price.objects.create(asset=asset, date=date(2022, 2, 15), price=Decimal("100"))
+
+    def _timeseries(self):
+        return self.client.get(
+            f"/api/portfolios/{self.portfolio.id}/timeseries/",
+            {"start": "2022-02-15", "end": "2022-02-15"},
+        )
+
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs("portfolios.performance", level="INFO") as logs:
+            resp = self._timeseries()
+
+        self.assertEqual(resp.status_code, 200)
+        names = [entry.split(";")[0].strip() for entry in resp["Server-Timing"].split(",")]
+        self.assertEqual(names, ["db", "timeseries", "serialize", "total"])
+        self.assertRegex(resp["Server-Timing"], r'db;dur=[\d.]+;desc="\d+ queries"')
+
+        payload = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(payload["status"], 200)
+        self.assertGreater(payload["queries"], 0)
+        self.assertIn("timeseries", payload["timings_ms"])
+
+    def test_trade_create_is_timed(self):
+        resp = self.client.post(
+            f"/api/portfolios/{self.portfolio.id}/trades/",
+            {"date": "2022-02-15", "legs": [{"asset": "US", "side": "BUY", "amount_usd": "100.00"}]},
+            format="json",
+        )
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertIn("trade_create;dur=", resp["Server-Timing"])
+
+    @override_settings(PORTFOLIOS_SLOW_REQUEST_MS=0, PORTFOLIOS_SLOW_REQUEST_QUERIES=2)
+    def test_slow_request_logs_slowest_queries(self):
+        with self.assertLogs("portfolios.performance", level="WARNING") as logs:
+            self._timeseries()
+
+        payload = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(payload["event"], "slow_request")
+        self.assertEqual(len(payload["slowest_queries"]), 2)
+        self.assertIn("SELECT", payload["slowest_queries"][0]["sql"])
+
+    @override_settings(PORTFOLIOS_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        with self.assertLogs("portfolios.performance", level="INFO"):
+            resp = self._timeseries()
+
+        self.assertNotIn("Server-Timing", resp)
@@ -1,6 +1,10 @@
+import io
 from datetime import date
 from decimal import Decimal
 
+import numpy as np
+
+from django.core.cache import caches
 from django.test import TestCase
 from rest_framework.test import APIClient
 
@@ -16,6 +20,7 @@ from portfolios.models import (
 
 class PortfolioApiTests(TestCase):
     def setUp(self):
+        caches["timeseries"].clear()
         self.client = APIClient()
         self.asset_us = Asset.objects.create(code="US", name="United States")
         self.portfolio = Portfolio.objects.create(
@@ -101,6 +106,7 @@ class PortfolioApiTests(TestCase):
             rows_inserted=10,
             rows_updated=0,
             notes="test",
+            metrics={"total_seconds": 0.5, "phases": {"prices": {"seconds": 0.5, "rows": 10}}},
         )
 
         resp = self.client.get("/api/imports/latest/")
@@ -110,3 +116,219 @@ class PortfolioApiTests(TestCase):
         self.assertEqual(payload["source_name"], "datos.xlsx")
         self.assertIn("assets", payload)
         self.assertIn("prices", payload)
+        self.assertEqual(payload["metrics"]["phases"]["prices"]["rows"], 10)
+
+    def test_latest_import_status_uses_recorded_totals(self):
+        DataImport.objects.create(
+            source_name="datos.xlsx",
+            file_hash="abc123",
+            status="SUCCESS",
+            assets_total=17,
+            prices_total=6239,
+            holdings_total=34,
+            portfolios_total=2,
+        )
+
+        # Solo la lectura del ultimo import: sin COUNT(*) sobre las tablas
+        with self.assertNumQueries(1):
+            resp = self.client.get("/api/imports/latest/")
+
+        self.assertEqual(resp.status_code, 200)
+        payload = resp.json()
+        self.assertEqual(
+            [payload[k] for k in ("assets", "prices", "holdings", "portfolios")],
+            [17, 6239, 34, 2],
+        )
+
+    def test_timeseries_cache_stats_endpoint(self):
+        for _ in range(2):
+            self.client.get(
+                f"/api/portfolios/{self.portfolio.id}/timeseries/",
+                {"start": "2022-02-15", "end": "2022-02-16"},
+            )
+
+        resp = self.client.get("/api/cache/timeseries/")
+
+        self.assertEqual(resp.status_code, 200)
+        payload = resp.json()
+        self.assertGreaterEqual(payload["hits"], 1)
+        self.assertIn("evictions", payload)
+
+    def test_timeseries_stream_is_byte_compatible(self):
+        params = {"start": "2022-02-15", "end": "2022-02-16"}
+        url = f"/api/portfolios/{self.portfolio.id}/timeseries/"
+
+        for engine in ("decimal", "numpy"):
+            buffered = self.client.get(url, {**params, "engine": engine})
+            streamed = self.client.get(url, {**params, "engine": engine, "stream": "true"})
+
+            self.assertEqual(streamed.status_code, 200)
+            self.assertTrue(streamed.streaming)
+            self.assertEqual(streamed["Content-Type"], "application/json")
+            self.assertEqual(b"".join(streamed.streaming_content), buffered.content)
+
+    def test_timeseries_stream_reports_domain_errors_as_400(self):
+        resp = self.client.get(
+            f"/api/portfolios/{self.portfolio.id}/timeseries/",
+            {"start": "2030-01-01", "end": "2030-01-02", "stream": "true"},
+        )
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("No hay precios", str(resp.json()))
+
+    def test_timeseries_columnar_format(self):
+        url = f"/api/portfolios/{self.portfolio.id}/timeseries/"
+        params = {"start": "2022-02-15", "end": "2022-02-16"}
+
+        rows = self.client.get(url, params).json()
+        resp = self.client.get(url, {**params, "format": "columnar"})
+
+        self.assertEqual(resp.status_code, 200)
+        payload = resp.json()
+        self.assertEqual(payload["assets"], rows["assets"])
+        self.assertEqual(payload["dates"], [r["date"] for r in rows["rows"]])
+        self.assertEqual(payload["V"], [r["V"] for r in rows["rows"]])
+        self.assertEqual(
+            payload["weights"],
+            [[r["weights"][code] for code in rows["assets"]] for r in rows["rows"]],
+        )
+
+    def test_timeseries_npz_format(self):
+        resp = self.client.get(
+            f"/api/portfolios/{self.portfolio.id}/timeseries/",
+            {"start": "2022-02-15", "end": "2022-02-16", "format": "npz"},
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Type"], "application/octet-stream")
+        with np.load(io.BytesIO(resp.content)) as npz:
+            self.assertEqual(npz["assets"].tolist(), ["US"])
+            self.assertEqual(str(npz["dates"][0]), "2022-02-15")
+            self.assertEqual(npz["V"].tolist(), [1000.0, 1100.0])
+            self.assertEqual(npz["weights"].shape, (2, 1))
+
+    def test_timeseries_npz_errors_are_json(self):
+        resp = self.client.get(
+            f"/api/portfolios/{self.portfolio.id}/timeseries/",
+            {"start": "2022-01-01", "end": "2022-02-16", "format": "npz"},
+        )
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp["Content-Type"], "application/json")
+        self.assertIn("fecha inicial no disponible", str(resp.json()))
+
+    def test_timeseries_stream_requires_row_format(self):
+        resp = self.client.get(
+            f"/api/portfolios/{self.portfolio.id}/timeseries/",
+            {"start": "2022-02-15", "end": "2022-02-16", "format": "columnar", "stream": "true"},
+        )
+
+        self.assertEqual(resp.status_code, 400)
+
+    def test_batch_timeseries_returns_each_portfolio(self):
+        other = Portfolio.objects.create(
+            name="Portfolio 2",
+            start_date=date(2022, 2, 15),
+            initial_value=Decimal("1000000"),
+        )
+        InitialHolding.objects.create(portfolio=other, asset=self.asset_us, quantity=Decimal("20"))
+
+        resp = self.client.get(
+            "/api/portfolios/timeseries/",
+            {"ids": f"{self.portfolio.id},{other.id}", "start": "2022-02-15", "end": "2022-02-16"},
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        payload = resp.json()
+        self.assertEqual(payload["start"], "2022-02-15")
+        self.assertEqual([p["portfolio_id"] for p in payload["portfolios"]], [self.portfolio.id, other.id])
+        self.assertEqual(payload["portfolios"][1]["rows"][0]["V"], 2000.0)
+
+    def test_batch_timeseries_rejects_unknown_portfolio(self):
+        resp = self.client.get(
+            "/api/portfolios/timeseries/",
+            {"ids": f"{self.portfolio.id},999", "start": "2022-02-15", "end": "2022-02-16"},
+        )
+        self.assertEqual(resp.status_code, 404)
+
+    def test_batch_timeseries_rejects_invalid_ids(self):
+        resp = self.client.get(
+            "/api/portfolios/timeseries/",
+            {"ids": "1,abc", "start": "2022-02-15", "end": "2022-02-16"},
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("ids", resp.json())
+
+    def test_analytics_returns_summary_and_series(self):
+        resp = self.client.get(
+            f"/api/portfolios/{self.portfolio.id}/analytics/",
+            {"start": "2022-02-15", "end": "2022-02-16", "window": 2},
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        payload = resp.json()
+        self.assertEqual(payload["dates"], ["2022-02-15", "2022-02-16"])
+        self.assertAlmostEqual(payload["returns"][1], 0.1)
+        self.assertEqual(payload["drawdown"], [0.0, 0.0])
+        self.assertAlmostEqual(payload["summary"]["total_return"], 0.1)
+        self.assertEqual(payload["rolling"]["mean"], [None, None])
+
+    def test_analytics_rejects_start_before_launch(self):
+        resp = self.client.get(
+            f"/api/portfolios/{self.portfolio.id}/analytics/",
+            {"start": "2022-01-01", "end": "2022-02-16"},
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("fecha inicial no disponible", str(resp.json()))
+
+    def test_timeseries_monthly_freq_returns_period_closes(self):
+        Price.objects.create(asset=self.asset_us, date=date(2022, 3, 1), price=Decimal("120"))
+
+        resp = self.client.get(
+            f"/api/portfolios/{self.portfolio.id}/timeseries/",
+            {"start": "2022-02-15", "end": "2022-03-01", "freq": "M"},
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r["date"] for r in resp.json()["rows"]], ["2022-02-16", "2022-03-01"])
+
+    def test_timeseries_rejects_unknown_freq(self):
+        resp = self.client.get(
+            f"/api/portfolios/{self.portfolio.id}/timeseries/",
+            {"start": "2022-02-15", "end": "2022-02-16", "freq": "Y"},
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("freq", resp.json())
+
+    def test_bulk_trades_endpoint_reports_rejects(self):
+        resp = self.client.post(
+            "/api/trades/bulk/",
+            {
+                "trades": [
+                    {"portfolio": self.portfolio.id, "date": "2022-02-16", "asset": "US", "side": "BUY", "amount_usd": "110"},
+                    {"portfolio": self.portfolio.id, "date": "2022-02-16", "asset": "US", "side": "SELL", "amount_usd": "99999"},
+                    {"portfolio": self.portfolio.id, "date": "bad", "asset": "US", "side": "BUY", "amount_usd": "1"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(resp.status_code, 201)
+        payload = resp.json()
+        self.assertEqual(payload["created"], 1)
+        self.assertEqual([r["row"] for r in payload["rejected"]], [2, 3])
+
+    def test_bulk_trades_strict_mode_returns_400(self):
+        resp = self.client.post(
+            "/api/trades/bulk/",
+            {
+                "strict": True,
+                "trades": [
+                    {"portfolio": self.portfolio.id, "date": "2022-02-16", "asset": "XX", "side": "BUY", "amount_usd": "1"},
+                ],
+            },
+            format="json",
+        )
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(TradeLeg.objects.exists())
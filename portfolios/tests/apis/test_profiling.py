@@ -0,0 +1,77 @@
+import json
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from portfolios.models import Asset, InitialHolding, Portfolio, Price
+
+
+class ProfilingCaptureTests(TestCase):
+    def setUp(self):
+        caches["timeseries"].clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.profiles = Path(self.tmp.name)
+
+        self.client = APIClient()
+        self.staff = get_user_model().objects.create_user("ops", password="x", is_staff=True)
+        asset = Asset.objects.create(code="US", name="United States")
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=date(2022, 2, 15),
+            initial_value=Decimal("1000000"),
+        )
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=asset, quantity=Decimal("10"))
+        Price.objects.create(asset=asset, date=date(2022, 2, 15), price=Decimal("100"))
+
+    def _timeseries(self, **extra):
+        return self.client.get(
+            f"/api/portfolios/{self.portfolio.id}/timeseries/",
+            {"start": "2022-02-15", "end": "2022-02-15", "profile": "1"},
+            **extra,
+        )
+
+    def test_staff_request_writes_profile(self):
+        self.client.force_login(self.staff)
+
+        with override_settings(PORTFOLIOS_PROFILING_ENABLED=True, PORTFOLIOS_PROFILING_DIR=self.profiles):
+            resp = self._timeseries()
+
+            self.assertEqual(resp.status_code, 200)
+            capture_id = resp["X-Profile-Id"]
+            self.assertTrue((self.profiles / f"{capture_id}.prof").exists())
+            meta = json.loads((self.profiles / f"{capture_id}.json").read_text())
+            self.assertEqual(meta["view"], f"PortfolioTimeseriesApi-{self.portfolio.id}")
+            self.assertEqual(meta["status"], 200)
+            self.assertTrue(meta["top_functions"])
+            self.assertTrue(meta["top_allocations"])
+
+            out = StringIO()
+            call_command("profiles", stdout=out)
+            self.assertIn(capture_id, out.getvalue())
+
+            out = StringIO()
+            call_command("profiles", "--show", capture_id, "--limit", "5", stdout=out)
+            self.assertIn("Asignaciones de memoria", out.getvalue())
+
+    def test_non_staff_and_disabled_requests_are_not_profiled(self):
+        user = get_user_model().objects.create_user("viewer", password="x")
+        self.client.force_login(user)
+        with override_settings(PORTFOLIOS_PROFILING_ENABLED=True, PORTFOLIOS_PROFILING_DIR=self.profiles):
+            resp = self._timeseries(HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile-Id", resp)
+
+        self.client.force_login(self.staff)
+        with override_settings(PORTFOLIOS_PROFILING_ENABLED=False, PORTFOLIOS_PROFILING_DIR=self.profiles):
+            resp = self._timeseries()
+        self.assertNotIn("X-Profile-Id", resp)
+
+        self.assertEqual(list(self.profiles.iterdir()), [])
@@ -0,0 +1,175 @@
+import json
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from portfolios.models import Asset, InitialHolding, Portfolio, Price, TimeseriesJob
+from portfolios.services import timeseries_jobs
+from portfolios.services.portfolios import portfolio_data_version_bump
+from portfolios.services.timeseries import portfolio_timeseries
+
+
+@override_settings(PORTFOLIOS_TIMESERIES_JOBS="worker")
+class TimeseriesJobApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        asset = Asset.objects.create(code="US", name="United States")
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=date(2022, 2, 15),
+            initial_value=Decimal("1000000"),
+        )
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=asset, quantity=Decimal("10"))
+        for day, px in ((15, "100"), (16, "110")):
+            Price.objects.create(asset=asset, date=date(2022, 2, day), price=Decimal(px))
+
+        self.url = f"/api/portfolios/{self.portfolio.id}/timeseries/jobs/"
+        self.params = {"start": "2022-02-15", "end": "2022-02-16"}
+
+    def _work(self):
+        call_command("timeseries_worker", "--once", stdout=StringIO())
+
+    def test_job_lifecycle(self):
+        resp = self.client.post(self.url, self.params, format="json")
+
+        self.assertEqual(resp.status_code, 202)
+        job = resp.json()
+        self.assertEqual(job["status"], "PENDING")
+        self.assertEqual(resp["Location"], job["status_url"])
+        self.assertIsNone(job["result_url"])
+
+        pending = self.client.get(f"{job['status_url']}result/")
+        self.assertEqual(pending.status_code, 409)
+
+        self._work()
+
+        status_resp = self.client.get(job["status_url"])
+        self.assertEqual(status_resp.json()["status"], "SUCCESS")
+
+        result = self.client.get(status_resp.json()["result_url"])
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(
+            json.loads(result.content),
+            portfolio_timeseries(
+                portfolio_id=self.portfolio.id, start=date(2022, 2, 15), end=date(2022, 2, 16)
+            ),
+        )
+
+    def test_status_poll_is_a_single_query(self):
+        job_id = self.client.post(self.url, self.params, format="json").json()["id"]
+        self._work()
+
+        with self.assertNumQueries(1):
+            resp = self.client.get(f"{self.url}{job_id}/")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_same_request_reuses_job_until_data_changes(self):
+        first = self.client.post(self.url, self.params, format="json").json()
+        self.assertEqual(self.client.post(self.url, self.params, format="json").json()["id"], first["id"])
+
+        self._work()
+        done = self.client.post(self.url, self.params, format="json")
+        self.assertEqual(done.status_code, 200)
+        self.assertEqual(done.json()["id"], first["id"])
+
+        # Datos nuevos: nuevo calculo
+        portfolio_data_version_bump(portfolio_ids=[self.portfolio.id])
+        again = self.client.post(self.url, self.params, format="json")
+        self.assertEqual(again.status_code, 202)
+        self.assertNotEqual(again.json()["id"], first["id"])
+
+    def test_domain_errors_fail_the_job(self):
+        job_id = self.client.post(
+            self.url, {"start": "2030-01-01", "end": "2030-01-02"}, format="json"
+        ).json()["id"]
+        self._work()
+
+        job = self.client.get(f"{self.url}{job_id}/").json()
+        self.assertEqual(job["status"], "FAILED")
+        self.assertIn("No hay precios", job["error"])
+
+    def test_rejects_invalid_range(self):
+        resp = self.client.post(self.url, {"start": "2022-02-16", "end": "2022-02-15"}, format="json")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_unknown_job_returns_404(self):
+        resp = self.client.get(f"{self.url}00000000-0000-0000-0000-000000000000/")
+        self.assertEqual(resp.status_code, 404)
+
+    def test_job_runs_only_once(self):
+        job_id = self.client.post(self.url, self.params, format="json").json()["id"]
+
+        self.assertTrue(timeseries_jobs.timeseries_job_run(job_id=job_id))
+        self.assertFalse(timeseries_jobs.timeseries_job_run(job_id=job_id))
+
+    @override_settings(PORTFOLIOS_TIMESERIES_JOBS="process")
+    def test_process_mode_submits_on_commit(self):
+        with mock.patch.object(timeseries_jobs, "timeseries_job_submit") as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                job_id = self.client.post(self.url, self.params, format="json").json()["id"]
+
+        submit.assert_called_once_with(job_id=TimeseriesJob.objects.get().id)
+        self.assertEqual(str(submit.call_args.kwargs["job_id"]), job_id)
+
+    def test_stale_running_job_fails_and_is_not_reused(self):
+        job_id = self.client.post(self.url, self.params, format="json").json()["id"]
+        # El proceso que lo tomo murio hace mas de un lease
+        TimeseriesJob.objects.filter(id=job_id).update(
+            status=TimeseriesJob.RUNNING, started_at=timezone.now() - timedelta(hours=2)
+        )
+
+        job = self.client.get(f"{self.url}{job_id}/").json()
+        self.assertEqual(job["status"], "FAILED")
+        self.assertIn("lease", job["error"])
+
+        again = self.client.post(self.url, self.params, format="json")
+        self.assertEqual(again.status_code, 202)
+        self.assertNotEqual(again.json()["id"], job_id)
+
+    def test_stale_pending_job_is_not_reused(self):
+        job_id = self.client.post(self.url, self.params, format="json").json()["id"]
+        TimeseriesJob.objects.filter(id=job_id).update(created_at=timezone.now() - timedelta(hours=2))
+
+        again = self.client.post(self.url, self.params, format="json").json()
+        self.assertNotEqual(again["id"], job_id)
+
+        self.assertEqual(timeseries_jobs.timeseries_jobs_expire(), 1)
+        self.assertEqual(TimeseriesJob.objects.get(id=job_id).status, TimeseriesJob.FAILED)
+
+    def test_submit_replaces_broken_pool(self):
+        broken, healthy = mock.Mock(), mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool("hijo muerto")
+
+        with mock.patch("portfolios.executors.process_executor", side_effect=[broken, healthy]), \
+                mock.patch("portfolios.executors.process_executor_discard") as discard:
+            timeseries_jobs.timeseries_job_submit(job_id="job")
+
+        discard.assert_called_once_with(broken)
+        healthy.submit.assert_called_once()
+
+    def test_dead_child_fails_running_job_and_resubmits_queued(self):
+        running = self.client.post(self.url, self.params, format="json").json()["id"]
+        queued = self.client.post(self.url, {**self.params, "freq": "M"}, format="json").json()["id"]
+        TimeseriesJob.objects.filter(id=running).update(
+            status=TimeseriesJob.RUNNING, started_at=timezone.now()
+        )
+
+        future = Future()
+        future.set_exception(BrokenProcessPool("hijo muerto"))
+        executor = mock.Mock()
+        with mock.patch("portfolios.executors.process_executor_discard") as discard, \
+                mock.patch.object(timeseries_jobs, "timeseries_job_submit") as submit:
+            for job_id in (running, queued):
+                timeseries_jobs._timeseries_job_done(future, job_id=job_id, executor=executor)
+
+        discard.assert_called_with(executor)
+        self.assertEqual(TimeseriesJob.objects.get(id=running).status, TimeseriesJob.FAILED)
+        submit.assert_called_once_with(job_id=queued)
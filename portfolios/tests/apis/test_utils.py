@@ -0,0 +1,21 @@
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from portfolios.apis.utils import stream_json_object
+
+
+class StreamJsonObjectTests(SimpleTestCase):
+    def assertMatchesRenderer(self, header, items, **kwargs):
+        streamed = b"".join(stream_json_object(header=header, key="rows", items=iter(items), **kwargs))
+        rendered = JSONRenderer().render({**header, "rows": items})
+        self.assertEqual(streamed, rendered)
+
+    def test_matches_renderer_across_batches(self):
+        rows = [{"date": f"2022-02-{d:02d}", "V": d * 1.5, "weights": {"US": 0.25}} for d in range(1, 12)]
+        self.assertMatchesRenderer({"portfolio_id": 1, "assets": ["US"]}, rows, batch_size=4)
+
+    def test_matches_renderer_without_items(self):
+        self.assertMatchesRenderer({"portfolio_id": 1}, [])
+
+    def test_matches_renderer_with_unicode_and_line_separators(self):
+        self.assertMatchesRenderer({"name": "A\u00f1o\u2028"}, [{"code": "\u20ac\u2029"}])
@@ -0,0 +1,81 @@
+import math
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from portfolios.models import Asset, Portfolio, Price, InitialHolding
+from portfolios.services.analytics import PERIODS_PER_YEAR, portfolio_analytics
+from portfolios.services.timeseries_cache import portfolio_timeseries_cached
+
+
+class PortfolioAnalyticsTests(TestCase):
+    START = date(2022, 2, 15)
+    PRICES = ["100", "110", "99", "120", "90", "95", "130", "125"]
+
+    def setUp(self):
+        caches["timeseries"].clear()
+
+        self.asset_us = Asset.objects.create(code="US", name="United States")
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=self.START,
+            initial_value=Decimal("1000000"),
+        )
+        for d, px in enumerate(self.PRICES):
+            Price.objects.create(
+                asset=self.asset_us, date=self.START + timedelta(days=d), price=Decimal(px)
+            )
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=self.asset_us, quantity=Decimal("10"))
+
+        self.end = self.START + timedelta(days=len(self.PRICES) - 1)
+        self.values = [float(px) * 10 for px in self.PRICES]
+
+    def test_returns_and_drawdown(self):
+        result = portfolio_analytics(portfolio=self.portfolio, start=self.START, end=self.end, window=3)
+
+        self.assertIsNone(result["returns"][0])
+        self.assertAlmostEqual(result["returns"][1], 0.1)
+        self.assertEqual(len(result["drawdown"]), len(self.PRICES))
+
+        # Peor caida: 90 desde el maximo 120
+        summary = result["summary"]
+        self.assertAlmostEqual(summary["max_drawdown"], 90 / 120 - 1)
+        self.assertEqual(summary["max_drawdown_date"], (self.START + timedelta(days=4)).isoformat())
+        self.assertAlmostEqual(summary["total_return"], 0.25)
+        self.assertEqual(summary["final_value"], 1250.0)
+
+        returns = [b / a - 1 for a, b in zip(self.values, self.values[1:])]
+        m = sum(returns) / len(returns)
+        vol = math.sqrt(sum((r - m) ** 2 for r in returns) / len(returns))
+        self.assertAlmostEqual(summary["volatility"], vol)
+        self.assertAlmostEqual(summary["annualized_volatility"], vol * math.sqrt(PERIODS_PER_YEAR))
+
+    def test_rolling_metrics_match_naive_window(self):
+        window = 3
+        result = portfolio_analytics(portfolio=self.portfolio, start=self.START, end=self.end, window=window)
+        returns = result["returns"]
+
+        for i, (m, v) in enumerate(zip(result["rolling"]["mean"], result["rolling"]["volatility"])):
+            if i < window:
+                self.assertIsNone(m)
+                self.assertIsNone(v)
+                continue
+            chunk = returns[i - window + 1: i + 1]
+            expected_mean = sum(chunk) / window
+            expected_vol = math.sqrt(sum((r - expected_mean) ** 2 for r in chunk) / window)
+            self.assertAlmostEqual(m, expected_mean)
+            self.assertAlmostEqual(v, expected_vol)
+
+    def test_reuses_cached_columnar_timeseries(self):
+        portfolio_timeseries_cached(
+            portfolio=self.portfolio, start=self.START, end=self.end, columnar=True
+        )
+
+        with self.assertNumQueries(0):
+            portfolio_analytics(portfolio=self.portfolio, start=self.START, end=self.end)
+
+    def test_rejects_window_shorter_than_two(self):
+        with self.assertRaises(ValueError):
+            portfolio_analytics(portfolio=self.portfolio, start=self.START, end=self.end, window=1)
@@ -0,0 +1,96 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from portfolios.benchmarks.data import BENCH_START
+from portfolios.models import Asset, DataImport, InitialHolding, Price, TradeLeg
+from portfolios.services.etl import import_datos_xlsx
+
+
+class BenchCommandTests(TestCase):
+    ARGS = ["--assets", "3", "--years", "1", "--trades", "20", "--warmup", "0", "--repeat", "1"]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_writes_results_and_rolls_back_dataset(self):
+        output = Path(self.tmp.name) / "bench.json"
+
+        call_command("bench", *self.ARGS, "--output", str(output), stdout=StringIO())
+
+        report = json.loads(output.read_text())
+        self.assertEqual(report["meta"]["assets"], 3)
+        self.assertEqual(
+            set(report["results"]),
+            {
+                "timeseries_decimal",
+                "timeseries_numpy",
+                "timeseries_sql",
+                "current_quantities_end",
+                "current_quantities_mid",
+                "trade_create_latest",
+            },
+        )
+        self.assertGreater(report["results"]["timeseries_numpy"]["queries"], 0)
+        # Sin --keep el dataset sintetico no queda en la BD
+        self.assertFalse(Asset.objects.exists() or Price.objects.exists() or TradeLeg.objects.exists())
+
+    def test_fails_when_baseline_is_exceeded(self):
+        baseline = Path(self.tmp.name) / "baseline.json"
+        baseline.write_text(json.dumps({
+            "results": {"current_quantities_end": {"median": 1e-9, "queries": 0}},
+        }))
+
+        with self.assertRaisesMessage(CommandError, "current_quantities_end"):
+            call_command(
+                "bench", *self.ARGS, "--engines", "numpy", "--baseline", str(baseline), stdout=StringIO()
+            )
+
+
+class BenchEtlCommandTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_written_workbook_matches_import_layout(self):
+        path = Path(self.tmp.name) / "bench.xlsx"
+
+        call_command("bench_etl", "--write", str(path), "--assets", "3", "--days", "4", stdout=StringIO())
+        data_import = import_datos_xlsx(path=str(path), start_date=BENCH_START)
+
+        self.assertEqual(data_import.rows_inserted, 12)
+        self.assertEqual(InitialHolding.objects.count(), 6)
+
+    def test_reports_runs_per_scenario(self):
+        output = Path(self.tmp.name) / "bench_etl.json"
+
+        call_command("bench_etl", "--assets", "2", "--days", "5", "--output", str(output), stdout=StringIO())
+
+        results = json.loads(output.read_text())["results"]
+        self.assertEqual(set(results), {"fresh", "prepopulated"})
+        for runs in results.values():
+            self.assertEqual(runs["first"]["rows_inserted"], 10)
+            self.assertTrue(runs["rehash"]["skipped"])
+            self.assertEqual(runs["force"]["rows_updated"], 0)
+            self.assertIn("prices", runs["first"]["phases"])
+        # Cada escenario se revierte
+        self.assertFalse(Price.objects.exists() or DataImport.objects.exists())
+
+    def test_trace_memory_adds_peaks_from_a_separate_pass(self):
+        output = Path(self.tmp.name) / "bench_etl.json"
+
+        call_command(
+            "bench_etl", "--assets", "2", "--days", "5", "--scenarios", "fresh",
+            "--trace-memory", "--output", str(output), stdout=StringIO(),
+        )
+
+        first = json.loads(output.read_text())["results"]["fresh"]["first"]
+        self.assertGreater(first["peak_alloc_kb"], 0)
+        self.assertIsNotNone(first["phases"]["read"]["peak_alloc_kb"])
+        self.assertFalse(Price.objects.exists() or DataImport.objects.exists())
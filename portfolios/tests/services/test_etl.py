@@ -0,0 +1,286 @@
+import importlib.util
+import tempfile
+import tracemalloc
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.test import TestCase
+from openpyxl import Workbook, load_workbook
+
+from portfolios.models import (
+    Asset,
+    DataImport,
+    InitialHolding,
+    Portfolio,
+    PositionLedger,
+    PositionSnapshot,
+    Price,
+    TradeLeg,
+)
+from portfolios.services.etl import import_datos_xlsx, import_prices
+from portfolios.services.positions import (
+    position_ledger_rebuild,
+    position_quantities,
+    position_snapshot_record,
+)
+from portfolios.services.etl_readers import price_reader_for
+
+
+class ImportDatosXlsxTests(TestCase):
+    START = date(2022, 2, 15)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _workbook(self, name="datos.xlsx", bad_cell=None):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "weights"
+        ws.append(["Fecha", "Activo", "Portfolio 1", "Portfolio 2"])
+        ws.append([datetime(2022, 2, 15), "US", 0.6, 0.3])
+        ws.append([datetime(2022, 2, 15), "EU", 0.4, 0.7])
+
+        prices = wb.create_sheet("Precios")
+        prices.append(["Dates", "US", "EU", "JP"])
+        for d in range(10):
+            prices.append([
+                datetime(2022, 2, 15) + timedelta(days=d),
+                100 + d,
+                200 - d,
+                None if d < 5 else 50,
+            ])
+        if bad_cell:
+            prices.append([datetime(2022, 3, 1), bad_cell, 1, 1])
+
+        path = Path(self.tmp.name) / name
+        wb.save(path)
+        return str(path)
+
+    def test_streams_prices_in_chunks(self):
+        data_import = import_datos_xlsx(path=self._workbook(), start_date=self.START, chunk_size=3)
+
+        self.assertEqual(data_import.status, "SUCCESS")
+        self.assertEqual(data_import.rows_inserted, 25)
+        self.assertEqual(Price.objects.count(), 25)
+        self.assertEqual(set(Asset.objects.values_list("code", flat=True)), {"US", "EU", "JP"})
+        self.assertEqual(InitialHolding.objects.count(), 4)
+        self.assertNotIn("peak_alloc_kb=", data_import.notes)
+
+        phases = data_import.metrics["phases"]
+        self.assertEqual(set(phases), {"hash", "read", "assets", "prices", "holdings"})
+        self.assertEqual(phases["prices"]["rows"], 25)
+        self.assertEqual(phases["assets"]["rows"], 3)
+        self.assertEqual(phases["holdings"]["rows"], 4)
+        self.assertGreater(phases["read"]["seconds"], 0)
+        # Sin trace_memory no se traza la memoria (solo tiempos)
+        self.assertIsNone(data_import.metrics["peak_alloc_kb"])
+        self.assertIsNone(phases["read"]["peak_alloc_kb"])
+
+        holding = InitialHolding.objects.get(portfolio__name="Portfolio 1", asset__code="US")
+        self.assertEqual(holding.quantity, Decimal("0.6") * Decimal("1000000000") / Decimal("100"))
+
+    def test_trace_memory_records_import_scoped_peaks(self):
+        data_import = import_datos_xlsx(
+            path=self._workbook(), start_date=self.START, chunk_size=3, trace_memory=True
+        )
+
+        # Picos del propio import (tracemalloc), no del proceso
+        phases = data_import.metrics["phases"]
+        self.assertIn("peak_alloc_kb=", data_import.notes)
+        self.assertGreater(phases["read"]["peak_alloc_kb"], 0)
+        self.assertEqual(
+            data_import.metrics["peak_alloc_kb"], max(p["peak_alloc_kb"] for p in phases.values())
+        )
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_failure_after_flushed_chunks_rolls_back_everything(self):
+        with self.assertRaises(Exception), self.assertLogs("portfolios.services.etl", level="ERROR"):
+            import_datos_xlsx(
+                path=self._workbook(bad_cell="n/d"), start_date=self.START, chunk_size=3
+            )
+
+        self.assertFalse(Price.objects.exists())
+        self.assertFalse(Asset.objects.exists())
+        self.assertEqual(DataImport.objects.get().status, "FAILED")
+        # Totales recontados tras el rollback
+        self.assertEqual(DataImport.objects.get().prices_total, 0)
+        # Metricas parciales: la lectura llego a los bloques previos al error
+        self.assertGreater(DataImport.objects.get().metrics["phases"]["read"]["rows"], 0)
+
+    def test_totals_track_writes_outside_the_etl(self):
+        import_datos_xlsx(path=self._workbook(), start_date=self.START, chunk_size=3)
+        # Borrado en cascada fuera del ETL (tambien se borran sus precios)
+        Asset.objects.filter(code="JP").delete()
+
+        data_import = import_datos_xlsx(path=self._workbook(), start_date=self.START, force=True)
+
+        self.assertGreater(data_import.rows_inserted, 0)
+        self.assertEqual(data_import.prices_total, Price.objects.count())
+        self.assertEqual(data_import.assets_total, Asset.objects.count())
+
+    def test_new_prices_invalidate_positions_of_unpriced_trades(self):
+        import_datos_xlsx(path=self._workbook(), start_date=self.START)
+        p1 = Portfolio.objects.get(name="Portfolio 1")
+        # Portafolio fuera del ETL con un trade legacy (sin cantidad) en una
+        # fecha sin precio de JP: se omite al construir snapshots y ledger
+        p3 = Portfolio.objects.create(name="Portfolio 3", start_date=self.START, initial_value=Decimal("1000"))
+        InitialHolding.objects.create(portfolio=p3, asset=Asset.objects.get(code="EU"), quantity=Decimal("1"))
+        TradeLeg.objects.create(
+            portfolio=p3,
+            date=self.START + timedelta(days=2),
+            asset=Asset.objects.get(code="JP"),
+            side=TradeLeg.BUY,
+            amount_usd=Decimal("400"),
+        )
+        for portfolio in (p1, p3):
+            dt = self.START + timedelta(days=2)
+            position_snapshot_record(
+                portfolio_id=portfolio.id,
+                dt=dt,
+                quantities=position_quantities(portfolio_id=portfolio.id, up_to_dt=dt),
+            )
+            position_ledger_rebuild(portfolio_id=portfolio.id)
+        self.assertTrue(PositionSnapshot.objects.filter(portfolio=p3).exists())
+
+        # El libro corregido trae el precio que faltaba (solo un insert)
+        path = self._workbook(name="datos_v2.xlsx")
+        wb = load_workbook(path)
+        wb["Precios"]["D4"] = 40
+        wb.save(path)
+        data_import = import_datos_xlsx(path=path, start_date=self.START)
+
+        self.assertEqual((data_import.rows_inserted, data_import.rows_updated), (1, 0))
+        self.assertFalse(PositionSnapshot.objects.filter(portfolio=p3).exists())
+        self.assertFalse(PositionLedger.objects.filter(portfolio=p3).exists())
+        # Sin trades legacy ni holdings nuevos: sus posiciones siguen vigentes
+        self.assertTrue(PositionLedger.objects.filter(portfolio=p1).exists())
+        self.assertTrue(PositionSnapshot.objects.filter(portfolio=p1).exists())
+
+    def test_reimport_updates_only_changed_prices(self):
+        import_datos_xlsx(path=self._workbook(), start_date=self.START, chunk_size=3)
+        version = Portfolio.objects.get(name="Portfolio 1").data_version
+
+        # Mismo libro con una correccion en un dia
+        path = self._workbook(name="datos_v2.xlsx")
+        wb = load_workbook(path)
+        wb["Precios"]["B5"] = 999
+        wb.save(path)
+
+        data_import = import_datos_xlsx(path=path, start_date=self.START, chunk_size=3)
+
+        self.assertEqual((data_import.rows_inserted, data_import.rows_updated), (0, 1))
+        self.assertEqual(data_import.prices_total, Price.objects.count())
+        self.assertEqual(data_import.assets_total, 3)
+        self.assertIn("prices_unchanged=24", data_import.notes)
+        self.assertEqual(
+            Price.objects.get(asset__code="US", date=self.START + timedelta(days=3)).price,
+            Decimal("999"),
+        )
+        self.assertGreater(Portfolio.objects.get(name="Portfolio 1").data_version, version)
+
+    def test_identical_reimport_with_force_changes_nothing(self):
+        path = self._workbook()
+        import_datos_xlsx(path=path, start_date=self.START)
+        version = Portfolio.objects.get(name="Portfolio 1").data_version
+
+        data_import = import_datos_xlsx(path=path, start_date=self.START, force=True)
+
+        self.assertEqual(DataImport.objects.count(), 1)
+        self.assertEqual((data_import.rows_inserted, data_import.rows_updated), (0, 0))
+        self.assertIn("prices_unchanged=25", data_import.notes)
+        # --force reconstruye los holdings: la cache se invalida igual
+        self.assertGreater(Portfolio.objects.get(name="Portfolio 1").data_version, version)
+
+
+class ImportPricesReadersTests(TestCase):
+    START = date(2022, 2, 15)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _csv(self, name, lines):
+        path = Path(self.tmp.name) / name
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return str(path)
+
+    def _sources(self):
+        prices = self._csv("precios.csv", [
+            "Dates,US,EU,JP",
+            "2022-02-15,100,200,",
+            "2022-02-16,101,199.5,",
+            "2022-02-17,102,199,50",
+        ])
+        weights = self._csv("weights.csv", [
+            "Fecha,Activo,Portfolio 1,Portfolio 2",
+            "2022-02-15,US,0.6,0.3",
+            "2022-02-15,EU,0.4,0.7",
+        ])
+        return prices, weights
+
+    def test_csv_prices_with_csv_weights(self):
+        prices, weights = self._sources()
+
+        data_import = import_prices(path=prices, weights_path=weights, start_date=self.START)
+
+        self.assertEqual(data_import.status, "SUCCESS")
+        self.assertEqual(data_import.rows_inserted, 7)
+        self.assertEqual(
+            Price.objects.get(asset__code="EU", date=date(2022, 2, 16)).price,
+            Decimal("199.5"),
+        )
+        self.assertEqual(InitialHolding.objects.count(), 4)
+
+        # El hash cubre ambos archivos: sin cambios, el import se salta
+        self.assertEqual(
+            import_prices(path=prices, weights_path=weights, start_date=self.START).pk,
+            data_import.pk,
+        )
+
+    @skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow no instalado")
+    def test_parquet_prices_match_csv(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        _, weights = self._sources()
+        path = Path(self.tmp.name) / "precios.parquet"
+        pq.write_table(
+            pa.table({
+                "Dates": [date(2022, 2, 15), date(2022, 2, 16)],
+                "US": [100.0, 101.0],
+                "EU": [200.0, None],
+            }),
+            path,
+        )
+
+        data_import = import_prices(path=str(path), weights_path=weights, start_date=self.START)
+
+        self.assertEqual(data_import.rows_inserted, 3)
+        self.assertFalse(Price.objects.filter(asset__code="EU", date=date(2022, 2, 16)).exists())
+
+    def test_csv_without_weights_is_rejected(self):
+        prices, _ = self._sources()
+
+        with self.assertRaisesMessage(ValueError, "weights_path"):
+            import_prices(path=prices, start_date=self.START)
+        self.assertFalse(DataImport.objects.exists())
+
+    def test_unsupported_extension(self):
+        path = self._csv("precios.txt", ["Dates,US"])
+
+        with self.assertRaisesMessage(ValueError, "Formato no soportado: .txt"):
+            price_reader_for(path)
+
+    def test_load_prices_command(self):
+        prices, weights = self._sources()
+        out = StringIO()
+
+        call_command("load_prices", prices, "--weights", weights, stdout=out)
+
+        self.assertIn("inserted=7", out.getvalue())
+        self.assertEqual(Asset.objects.count(), 3)
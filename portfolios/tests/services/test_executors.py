@@ -0,0 +1,26 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+from django.test import SimpleTestCase, override_settings
+
+from portfolios.executors import executors_shutdown, process_executor, process_executor_discard
+
+
+@override_settings(PORTFOLIOS_TIMESERIES_JOB_PROCESSES=1)
+class ProcessExecutorTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(executors_shutdown)
+
+    def test_broken_pool_is_replaced(self):
+        executor = process_executor()
+        # Un hijo que muere (como un OOM kill) rompe el pool completo
+        with self.assertRaises(BrokenProcessPool):
+            executor.submit(os._exit, 1).result(timeout=60)
+        with self.assertRaises(BrokenProcessPool):
+            executor.submit(os.getpid)
+
+        process_executor_discard(executor)
+
+        replacement = process_executor()
+        self.assertIsNot(replacement, executor)
+        self.assertIsInstance(replacement.submit(os.getpid).result(timeout=60), int)
@@ -0,0 +1,217 @@
+from datetime import date
+from io import StringIO
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from portfolios.models import (
+    Asset,
+    InitialHolding,
+    PositionLedger,
+    PositionSnapshot,
+    Portfolio,
+    Price,
+    TradeLeg,
+)
+from portfolios.services.positions import (
+    position_ledger_discrepancies,
+    position_quantities,
+    position_snapshots_rebuild,
+)
+from portfolios.services.timeseries import portfolio_timeseries
+from portfolios.services.trades import trade_create, TradeLegInput
+
+
+class PositionSnapshotTests(TestCase):
+    def setUp(self):
+        self.asset_us = Asset.objects.create(code="US", name="United States")
+        self.asset_eu = Asset.objects.create(code="EU", name="Europe")
+
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=date(2022, 2, 15),
+            initial_value=Decimal("1000000"),
+        )
+
+        for day, px_us, px_eu in ((15, "100", "200"), (16, "110", "190"), (17, "125", "250"), (18, "100", "200")):
+            Price.objects.create(asset=self.asset_us, date=date(2022, 2, day), price=Decimal(px_us))
+            Price.objects.create(asset=self.asset_eu, date=date(2022, 2, day), price=Decimal(px_eu))
+
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=self.asset_us, quantity=Decimal("50"))
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=self.asset_eu, quantity=Decimal("20"))
+
+    def _trade(self, dt, asset_code, side, amount):
+        return trade_create(
+            portfolio_id=self.portfolio.id,
+            dt=dt,
+            legs=[TradeLegInput(asset_code=asset_code, side=side, amount_usd=Decimal(amount))],
+        )
+
+    def test_trade_create_records_snapshot(self):
+        self._trade(date(2022, 2, 16), "US", TradeLeg.BUY, "1100")
+
+        snapshot = {
+            s.asset_id: s.quantity
+            for s in PositionSnapshot.objects.filter(portfolio=self.portfolio, date=date(2022, 2, 16))
+        }
+        self.assertEqual(snapshot[self.asset_us.id], Decimal("60"))
+        self.assertEqual(snapshot[self.asset_eu.id], Decimal("20"))
+
+    def test_quantities_replay_only_the_tail_after_snapshot(self):
+        self._trade(date(2022, 2, 16), "US", TradeLeg.BUY, "1100")
+
+        # snapshot + trades posteriores (ninguno: no se consultan precios)
+        with self.assertNumQueries(2):
+            quantities = position_quantities(portfolio_id=self.portfolio.id, up_to_dt=date(2022, 2, 18))
+
+        self.assertEqual(quantities[self.asset_us.id], Decimal("60"))
+
+    def test_backdated_trade_invalidates_later_snapshots(self):
+        self._trade(date(2022, 2, 17), "US", TradeLeg.SELL, "1250")
+        self._trade(date(2022, 2, 16), "EU", TradeLeg.BUY, "1900")
+
+        self.assertFalse(
+            PositionSnapshot.objects.filter(portfolio=self.portfolio, date__gt=date(2022, 2, 16)).exists()
+        )
+
+        quantities = position_quantities(portfolio_id=self.portfolio.id, up_to_dt=date(2022, 2, 18))
+        self.assertEqual(quantities[self.asset_us.id], Decimal("40"))
+        self.assertEqual(quantities[self.asset_eu.id], Decimal("30"))
+
+    def test_rebuild_matches_full_replay(self):
+        TradeLeg.objects.create(
+            portfolio=self.portfolio, date=date(2022, 2, 16), asset=self.asset_us,
+            side=TradeLeg.BUY, amount_usd=Decimal("1100"),
+        )
+        TradeLeg.objects.create(
+            portfolio=self.portfolio, date=date(2022, 2, 17), asset=self.asset_eu,
+            side=TradeLeg.SELL, amount_usd=Decimal("2500"),
+        )
+
+        created = position_snapshots_rebuild(portfolio_id=self.portfolio.id)
+
+        self.assertEqual(created, 4)
+        snapshot = {
+            s.asset_id: s.quantity
+            for s in PositionSnapshot.objects.filter(portfolio=self.portfolio, date=date(2022, 2, 17))
+        }
+        self.assertEqual(snapshot[self.asset_us.id], Decimal("60"))
+        self.assertEqual(snapshot[self.asset_eu.id], Decimal("10"))
+
+    def test_timeseries_from_snapshot_matches_full_replay(self):
+        self._trade(date(2022, 2, 16), "US", TradeLeg.BUY, "1100")
+        self._trade(date(2022, 2, 17), "EU", TradeLeg.SELL, "2500")
+
+        with_snapshots = portfolio_timeseries(
+            portfolio_id=self.portfolio.id, start=date(2022, 2, 17), end=date(2022, 2, 18)
+        )
+        PositionSnapshot.objects.all().delete()
+        full_replay = portfolio_timeseries(
+            portfolio_id=self.portfolio.id, start=date(2022, 2, 17), end=date(2022, 2, 18)
+        )
+
+        self.assertEqual(with_snapshots, full_replay)
+
+    def test_rebuild_command(self):
+        self._trade(date(2022, 2, 16), "US", TradeLeg.BUY, "1100")
+        PositionSnapshot.objects.all().delete()
+
+        call_command("rebuild_position_snapshots", portfolio_ids=[self.portfolio.id], stdout=StringIO())
+
+        self.assertEqual(PositionSnapshot.objects.filter(portfolio=self.portfolio).count(), 2)
+
+
+class PositionLedgerTests(TestCase):
+    def setUp(self):
+        self.asset_us = Asset.objects.create(code="US", name="United States")
+        self.asset_eu = Asset.objects.create(code="EU", name="Europe")
+
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=date(2022, 2, 15),
+            initial_value=Decimal("1000000"),
+        )
+
+        for day, px_us, px_eu in ((15, "100", "200"), (16, "110", "190"), (17, "125", "250")):
+            Price.objects.create(asset=self.asset_us, date=date(2022, 2, day), price=Decimal(px_us))
+            Price.objects.create(asset=self.asset_eu, date=date(2022, 2, day), price=Decimal(px_eu))
+
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=self.asset_us, quantity=Decimal("50"))
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=self.asset_eu, quantity=Decimal("20"))
+
+    def _trade(self, dt, asset_code, side, amount):
+        return trade_create(
+            portfolio_id=self.portfolio.id,
+            dt=dt,
+            legs=[TradeLegInput(asset_code=asset_code, side=side, amount_usd=Decimal(amount))],
+        )
+
+    def _ledger(self):
+        return {
+            row.asset_id: (row.quantity, row.as_of)
+            for row in PositionLedger.objects.filter(portfolio=self.portfolio)
+        }
+
+    def test_trade_create_initializes_and_updates_ledger(self):
+        self._trade(date(2022, 2, 16), "US", TradeLeg.BUY, "1100")
+        self._trade(date(2022, 2, 17), "US", TradeLeg.SELL, "2500")
+
+        ledger = self._ledger()
+        self.assertEqual(ledger[self.asset_us.id], (Decimal("40"), date(2022, 2, 17)))
+        self.assertEqual(ledger[self.asset_eu.id][0], Decimal("20"))
+
+    def test_sell_validation_reads_ledger_instead_of_history(self):
+        self._trade(date(2022, 2, 16), "US", TradeLeg.BUY, "1100")
+
+        # Un trade en la ultima fecha no reconstruye posiciones (sin
+        # holdings, snapshots ni precios de trades previos)
+        with CaptureQueriesContext(connection) as ctx:
+            self._trade(date(2022, 2, 17), "US", TradeLeg.SELL, "1250")
+
+        tables = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("portfolios_initialholding", tables)
+        self.assertNotIn('FROM "portfolios_tradeleg"', tables)
+
+    def test_sell_beyond_ledger_quantity_is_rejected(self):
+        self._trade(date(2022, 2, 16), "US", TradeLeg.SELL, "5000")
+
+        # Quedan 50 - 5000/110 ~= 4.55 US; vender 1000 USD a 125 son 8
+        with self.assertRaises(ValidationError):
+            self._trade(date(2022, 2, 17), "US", TradeLeg.SELL, "1000")
+
+        self.assertLess(self._ledger()[self.asset_us.id][0], Decimal("5"))
+
+    def test_backdated_trade_keeps_ledger_consistent(self):
+        self._trade(date(2022, 2, 17), "US", TradeLeg.BUY, "1250")
+        self._trade(date(2022, 2, 16), "EU", TradeLeg.SELL, "1900")
+
+        ledger = self._ledger()
+        self.assertEqual(ledger[self.asset_eu.id], (Decimal("10"), date(2022, 2, 16)))
+        self.assertEqual(ledger[self.asset_us.id], (Decimal("60"), date(2022, 2, 17)))
+        self.assertEqual(position_ledger_discrepancies(portfolio_id=self.portfolio.id), [])
+
+    def test_check_command_detects_and_fixes_drift(self):
+        self._trade(date(2022, 2, 16), "US", TradeLeg.BUY, "1100")
+        # Trade fuera del servicio: el ledger queda desfasado
+        TradeLeg.objects.create(
+            portfolio=self.portfolio,
+            date=date(2022, 2, 17),
+            asset=self.asset_eu,
+            side=TradeLeg.BUY,
+            amount_usd=Decimal("2500"),
+        )
+
+        with self.assertRaises(CommandError):
+            call_command("check_position_ledger", stdout=StringIO())
+
+        out = StringIO()
+        call_command("check_position_ledger", "--fix", stdout=out)
+        self.assertIn("ledger reconstruido", out.getvalue())
+        self.assertEqual(self._ledger()[self.asset_eu.id], (Decimal("30"), date(2022, 2, 17)))
+
+        call_command("check_position_ledger", stdout=StringIO())
@@ -1,10 +1,12 @@
 from datetime import date
 from decimal import Decimal
+from unittest import mock
 
 from django.test import TestCase
 
-from portfolios.models import Asset, Portfolio, Price, InitialHolding
-from portfolios.services.timeseries import portfolio_timeseries
+from portfolios.models import Asset, Portfolio, Price, InitialHolding, TradeLeg
+from portfolios.services import timeseries
+from portfolios.services.timeseries import portfolio_timeseries, portfolios_timeseries
 
 
 class PortfolioTimeseriesTests(TestCase):
@@ -58,3 +60,150 @@ class PortfolioTimeseriesTests(TestCase):
         # 3) Los pesos suman ~1
         total_weight = sum(row["weights"].values())
         self.assertAlmostEqual(total_weight, 1.0, places=6)
+
+    def test_timeseries_query_count_is_constant_in_trade_history(self):
+        # Muchos trades en el rango: el precio de cada uno se resuelve en bloque
+        for i in range(20):
+            TradeLeg.objects.create(
+                portfolio=self.portfolio,
+                date=date(2022, 2, 15 + (i % 2)),
+                asset=self.asset_us if i % 3 else self.asset_eu,
+                side=TradeLeg.BUY,
+                amount_usd=Decimal("1000"),
+            )
+
+        # holdings + snapshot + trades + precios de trades (sin cantidad registrada) + precios del rango
+        with self.assertNumQueries(5):
+            result = portfolio_timeseries(
+                portfolio_id=self.portfolio.id,
+                start=date(2022, 2, 15),
+                end=date(2022, 2, 16),
+            )
+
+        self.assertEqual(len(result["rows"]), 2)
+
+    def test_timeseries_skips_trade_prices_for_recorded_quantities(self):
+        for i in range(20):
+            TradeLeg.objects.create(
+                portfolio=self.portfolio,
+                date=date(2022, 2, 15 + (i % 2)),
+                asset=self.asset_us,
+                side=TradeLeg.BUY,
+                amount_usd=Decimal("1100"),
+                executed_price=Decimal("110"),
+                quantity=Decimal("10"),
+            )
+
+        # holdings + snapshot + trades + precios del rango
+        with self.assertNumQueries(4):
+            portfolio_timeseries(
+                portfolio_id=self.portfolio.id,
+                start=date(2022, 2, 15),
+                end=date(2022, 2, 16),
+            )
+
+
+    def test_sql_engine_query_count_is_constant_in_range_trades(self):
+        for i in range(20):
+            TradeLeg.objects.create(
+                portfolio=self.portfolio,
+                date=date(2022, 2, 15 + (i % 2)),
+                asset=self.asset_us if i % 3 else self.asset_eu,
+                side=TradeLeg.BUY,
+                amount_usd=Decimal("1000"),
+            )
+
+        # holdings + snapshot + trades previos a start + serie completa en SQL
+        with self.assertNumQueries(4):
+            result = portfolio_timeseries(
+                portfolio_id=self.portfolio.id,
+                start=date(2022, 2, 15),
+                end=date(2022, 2, 16),
+                engine="sql",
+            )
+
+        self.assertEqual(len(result["rows"]), 2)
+
+
+class PortfoliosTimeseriesBatchTests(TestCase):
+    def setUp(self):
+        self.asset_us = Asset.objects.create(code="US", name="United States")
+        self.asset_eu = Asset.objects.create(code="EU", name="Europe")
+        self.asset_jp = Asset.objects.create(code="JP", name="Japan")
+
+        self.p1 = Portfolio.objects.create(
+            name="Portfolio 1", start_date=date(2022, 2, 15), initial_value=Decimal("1000000")
+        )
+        self.p2 = Portfolio.objects.create(
+            name="Portfolio 2", start_date=date(2022, 2, 15), initial_value=Decimal("1000000")
+        )
+
+        for day, us, eu, jp in ((15, "100", "200", None), (16, "110", "190", "50"), (17, None, None, "55")):
+            for asset, px in ((self.asset_us, us), (self.asset_eu, eu), (self.asset_jp, jp)):
+                if px is not None:
+                    Price.objects.create(asset=asset, date=date(2022, 2, day), price=Decimal(px))
+
+        InitialHolding.objects.create(portfolio=self.p1, asset=self.asset_us, quantity=Decimal("5000"))
+        InitialHolding.objects.create(portfolio=self.p1, asset=self.asset_eu, quantity=Decimal("2500"))
+        InitialHolding.objects.create(portfolio=self.p2, asset=self.asset_eu, quantity=Decimal("100"))
+        InitialHolding.objects.create(portfolio=self.p2, asset=self.asset_jp, quantity=Decimal("400"))
+
+        TradeLeg.objects.create(
+            portfolio=self.p2,
+            date=date(2022, 2, 16),
+            asset=self.asset_jp,
+            side=TradeLeg.BUY,
+            amount_usd=Decimal("1000"),
+        )
+
+    def test_batch_matches_single_portfolio_results(self):
+        for engine in ("decimal", "numpy", "sql"):
+            batch = portfolios_timeseries(
+                portfolio_ids=[self.p1.id, self.p2.id],
+                start=date(2022, 2, 15),
+                end=date(2022, 2, 17),
+                engine=engine,
+            )
+            singles = [
+                portfolio_timeseries(
+                    portfolio_id=pid, start=date(2022, 2, 15), end=date(2022, 2, 17), engine=engine
+                )
+                for pid in (self.p1.id, self.p2.id)
+            ]
+            self.assertEqual(batch, singles)
+
+        # Cada portafolio conserva solo las fechas con precio de sus activos
+        self.assertEqual([r["date"] for r in batch[0]["rows"]], ["2022-02-15", "2022-02-16"])
+        self.assertEqual(len(batch[1]["rows"]), 3)
+
+    def test_batch_loads_prices_once(self):
+        # Por portafolio: holdings + snapshot + trades (+ precios de trades si hay);
+        # los precios del rango se leen una unica vez para la union de activos
+        with self.assertNumQueries(3 + 4 + 1):
+            portfolios_timeseries(
+                portfolio_ids=[self.p1.id, self.p2.id],
+                start=date(2022, 2, 15),
+                end=date(2022, 2, 17),
+            )
+
+    def test_batch_decimal_walks_prices_once(self):
+        # Un unico recorrido (generador) de los precios para todos los portafolios
+        with mock.patch.object(timeseries, "_price_days", wraps=timeseries._price_days) as price_days:
+            batch = portfolios_timeseries(
+                portfolio_ids=[self.p1.id, self.p2.id, self.p1.id],
+                start=date(2022, 2, 15),
+                end=date(2022, 2, 17),
+                engine="decimal",
+            )
+
+        price_days.assert_called_once()
+        self.assertEqual(batch[0], batch[2])
+        self.assertEqual(len(batch[1]["rows"]), 3)
+
+    def test_batch_raises_when_a_portfolio_has_no_prices(self):
+        with self.assertRaises(ValueError):
+            portfolios_timeseries(
+                portfolio_ids=[self.p1.id, self.p2.id],
+                start=date(2022, 2, 17),
+                end=date(2022, 2, 17),
+            )
@@ -0,0 +1,90 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from portfolios.models import Asset, Portfolio, Price, InitialHolding
+from portfolios.services.portfolios import portfolio_data_version_bump
+from portfolios.services.timeseries_cache import (
+    portfolio_timeseries_cached,
+    timeseries_cache_stats,
+    timeseries_cache_stats_reset,
+)
+from portfolios.services.trades import trade_create, TradeLegInput
+
+
+class TimeseriesCacheTests(TestCase):
+    def setUp(self):
+        caches["timeseries"].clear()
+        timeseries_cache_stats_reset()
+
+        self.asset_us = Asset.objects.create(code="US", name="United States")
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=date(2022, 2, 15),
+            initial_value=Decimal("1000000"),
+        )
+        Price.objects.create(asset=self.asset_us, date=date(2022, 2, 15), price=Decimal("100"))
+        Price.objects.create(asset=self.asset_us, date=date(2022, 2, 16), price=Decimal("110"))
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=self.asset_us, quantity=Decimal("10"))
+
+    def _get(self):
+        self.portfolio.refresh_from_db()
+        return portfolio_timeseries_cached(
+            portfolio=self.portfolio, start=date(2022, 2, 15), end=date(2022, 2, 16)
+        )
+
+    def test_second_call_is_served_from_cache(self):
+        first = self._get()
+
+        with self.assertNumQueries(0):
+            second = portfolio_timeseries_cached(
+                portfolio=self.portfolio, start=date(2022, 2, 15), end=date(2022, 2, 16)
+            )
+
+        self.assertEqual(first, second)
+        stats = timeseries_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_trade_create_invalidates_cached_result(self):
+        before = self._get()
+
+        trade_create(
+            portfolio_id=self.portfolio.id,
+            dt=date(2022, 2, 16),
+            legs=[TradeLegInput(asset_code="US", side="BUY", amount_usd=Decimal("1100"))],
+        )
+        after = self._get()
+
+        self.assertEqual(before["rows"][1]["V"], 1100.0)
+        self.assertEqual(after["rows"][1]["V"], 2200.0)
+        self.assertEqual(timeseries_cache_stats()["misses"], 2)
+
+    def test_version_bump_invalidates_cached_result(self):
+        self._get()
+        Price.objects.filter(date=date(2022, 2, 16)).update(price=Decimal("120"))
+        portfolio_data_version_bump()
+
+        self.assertEqual(self._get()["rows"][1]["V"], 1200.0)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "timeseries": {
+                "BACKEND": "portfolios.cache.CountingLocMemCache",
+                "LOCATION": "test-timeseries-evictions",
+                "OPTIONS": {"MAX_ENTRIES": 1, "CULL_FREQUENCY": 1},
+            },
+        }
+    )
+    def test_evictions_are_counted(self):
+        evictions_before = timeseries_cache_stats()["evictions"]
+
+        for end in (date(2022, 2, 15), date(2022, 2, 16)):
+            portfolio_timeseries_cached(portfolio=self.portfolio, start=date(2022, 2, 15), end=end)
+
+        stats = timeseries_cache_stats()
+        self.assertEqual(stats["evictions"] - evictions_before, 1)
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["max_entries"], 1)
@@ -0,0 +1,210 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+
+from portfolios.models import Asset, Portfolio, Price, InitialHolding, TradeLeg
+from portfolios.services.timeseries import portfolio_timeseries
+from portfolios.services.timeseries_numpy import (
+    ABSOLUTE_TOLERANCE_WEIGHTS,
+    RELATIVE_TOLERANCE_V,
+)
+
+
+class TimeseriesEngineParityTests(TestCase):
+    """
+    Los motores numpy y sql deben coincidir con el motor Decimal (referencia)
+    dentro de la tolerancia documentada en timeseries_numpy.
+    """
+
+    START = date(2022, 2, 15)
+
+    def setUp(self):
+        rng = random.Random(42)
+
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=self.START,
+            initial_value=Decimal("1000000"),
+        )
+        self.assets = [
+            Asset.objects.create(code=f"A{i:02d}", name=f"Asset {i}") for i in range(6)
+        ]
+
+        prices = []
+        for d in range(40):
+            dt = self.START + timedelta(days=d)
+            for asset in self.assets:
+                # Huecos de precio para un activo: peso 0 esos dias
+                if asset.code == "A03" and d % 7 == 3:
+                    continue
+                prices.append(
+                    Price(
+                        asset=asset,
+                        date=dt,
+                        price=Decimal(str(round(rng.uniform(50, 150), 4))),
+                    )
+                )
+        Price.objects.bulk_create(prices)
+
+        for asset in self.assets:
+            InitialHolding.objects.create(
+                portfolio=self.portfolio,
+                asset=asset,
+                quantity=Decimal(str(rng.randint(100, 1000))),
+            )
+
+        # Trades antes y dentro de los rangos consultados
+        for d in (2, 5, 12, 20, 33):
+            TradeLeg.objects.create(
+                portfolio=self.portfolio,
+                date=self.START + timedelta(days=d),
+                asset=self.assets[d % len(self.assets)],
+                side=TradeLeg.SELL if d % 2 else TradeLeg.BUY,
+                amount_usd=Decimal("2500.00"),
+            )
+
+    def assertEnginesMatch(self, *, start, end):
+        for engine in ("numpy", "sql"):
+            with self.subTest(engine=engine):
+                self.assertEngineMatches(engine=engine, start=start, end=end)
+
+    def assertEngineMatches(self, *, engine, start, end):
+        reference = portfolio_timeseries(
+            portfolio_id=self.portfolio.id, start=start, end=end, engine="decimal"
+        )
+        vectorized = portfolio_timeseries(
+            portfolio_id=self.portfolio.id, start=start, end=end, engine=engine
+        )
+
+        self.assertEqual(reference["assets"], vectorized["assets"])
+        self.assertEqual(len(reference["rows"]), len(vectorized["rows"]))
+
+        for ref_row, vec_row in zip(reference["rows"], vectorized["rows"]):
+            self.assertEqual(ref_row["date"], vec_row["date"])
+            self.assertLessEqual(
+                abs(ref_row["V"] - vec_row["V"]),
+                RELATIVE_TOLERANCE_V * abs(ref_row["V"]),
+            )
+            self.assertEqual(list(ref_row["weights"]), list(vec_row["weights"]))
+            for code, weight in ref_row["weights"].items():
+                self.assertAlmostEqual(
+                    weight, vec_row["weights"][code], delta=ABSOLUTE_TOLERANCE_WEIGHTS
+                )
+
+    def test_parity_full_range(self):
+        self.assertEnginesMatch(start=self.START, end=self.START + timedelta(days=39))
+
+    def test_parity_with_trades_before_start(self):
+        self.assertEnginesMatch(
+            start=self.START + timedelta(days=10),
+            end=self.START + timedelta(days=30),
+        )
+
+    def test_parity_single_day(self):
+        self.assertEnginesMatch(
+            start=self.START + timedelta(days=12),
+            end=self.START + timedelta(days=12),
+        )
+
+    def test_parity_when_portfolio_value_is_zero(self):
+        InitialHolding.objects.filter(portfolio=self.portfolio).update(quantity=0)
+        TradeLeg.objects.all().delete()
+
+        self.assertEnginesMatch(start=self.START, end=self.START + timedelta(days=5))
+
+    def test_parity_with_trade_quantities(self):
+        # Trades con cantidad registrada (no se convierten con el precio)
+        TradeLeg.objects.filter(date__gte=self.START + timedelta(days=12)).update(
+            quantity=Decimal("12.5")
+        )
+
+        self.assertEnginesMatch(start=self.START, end=self.START + timedelta(days=39))
+
+    def test_parity_with_zero_price_on_legacy_trade_date(self):
+        # El ETL guarda celdas "-", "N/A" o "null" como precio 0: los trades
+        # sin cantidad de esa fecha no se convierten (PostgreSQL no debe
+        # dividir por 0). Un trade con cantidad registrada el mismo dia si aplica
+        trade = TradeLeg.objects.get(date=self.START + timedelta(days=20))
+        Price.objects.filter(asset_id=trade.asset_id, date=trade.date).update(price=0)
+        TradeLeg.objects.create(
+            portfolio=self.portfolio,
+            date=trade.date,
+            asset_id=trade.asset_id,
+            side=TradeLeg.BUY,
+            amount_usd=Decimal("100.00"),
+            quantity=Decimal("3"),
+        )
+
+        self.assertEnginesMatch(start=self.START, end=self.START + timedelta(days=39))
+
+    def test_vectorized_engines_raise_without_prices(self):
+        for engine in ("numpy", "sql"):
+            with self.subTest(engine=engine), self.assertRaises(ValueError):
+                portfolio_timeseries(
+                    portfolio_id=self.portfolio.id,
+                    start=date(2030, 1, 1),
+                    end=date(2030, 1, 2),
+                    engine=engine,
+                )
+
+    @override_settings(PORTFOLIOS_TIMESERIES_ENGINE="numpy")
+    def test_engine_defaults_to_setting(self):
+        result = portfolio_timeseries(
+            portfolio_id=self.portfolio.id,
+            start=self.START,
+            end=self.START + timedelta(days=1),
+        )
+        self.assertEqual(len(result["rows"]), 2)
+
+    def test_unknown_engine_is_rejected(self):
+        with self.assertRaises(ValueError):
+            portfolio_timeseries(
+                portfolio_id=self.portfolio.id,
+                start=self.START,
+                end=self.START,
+                engine="gpu",
+            )
+
+    def test_resampled_series_matches_daily_period_closes(self):
+        end = self.START + timedelta(days=39)
+        for engine in ("decimal", "numpy", "sql"):
+            daily = portfolio_timeseries(
+                portfolio_id=self.portfolio.id, start=self.START, end=end, engine=engine
+            )
+            for freq, key in (
+                ("W", lambda d: d.isocalendar()[:2]),
+                ("M", lambda d: (d.year, d.month)),
+                ("Q", lambda d: (d.year, (d.month - 1) // 3)),
+            ):
+                # Ultima fila diaria de cada periodo
+                closes = {}
+                for row in daily["rows"]:
+                    closes[key(date.fromisoformat(row["date"]))] = row
+                expected = list(closes.values())
+
+                resampled = portfolio_timeseries(
+                    portfolio_id=self.portfolio.id, start=self.START, end=end, engine=engine, freq=freq
+                )
+
+                self.assertEqual(
+                    [r["date"] for r in resampled["rows"]], [r["date"] for r in expected]
+                )
+                for exp_row, row in zip(expected, resampled["rows"]):
+                    self.assertLessEqual(
+                        abs(exp_row["V"] - row["V"]), RELATIVE_TOLERANCE_V * abs(exp_row["V"])
+                    )
+                    for code, weight in exp_row["weights"].items():
+                        self.assertAlmostEqual(
+                            weight, row["weights"][code], delta=ABSOLUTE_TOLERANCE_WEIGHTS
+                        )
+
+    def test_unknown_freq_is_rejected(self):
+        with self.assertRaises(ValueError):
+            portfolio_timeseries(
+                portfolio_id=self.portfolio.id,
+                start=self.START,
+                end=self.START,
+                freq="Y",
+            )
@@ -1,10 +1,17 @@
+import threading
 from datetime import date
 from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
 
-from portfolios.models import Asset, Portfolio, Price, TradeLeg
-from portfolios.services.trades import trade_create, TradeLegInput
+from portfolios.models import Asset, InitialHolding, Portfolio, PositionLedger, Price, TradeLeg
+from portfolios.services import trades
+from portfolios.services.trades import trade_create, TradeLegInput, _current_quantities
 
 
 class TradeCreateTests(TestCase):
@@ -40,3 +47,135 @@ class TradeCreateTests(TestCase):
 
         self.assertEqual(len(created), 1)
         self.assertEqual(TradeLeg.objects.count(), 1)
+
+        trade = TradeLeg.objects.get()
+        self.assertEqual(trade.executed_price, Decimal("100"))
+        self.assertEqual(trade.quantity, Decimal("1000"))
+
+    def test_unknown_portfolio_is_rejected(self):
+        with self.assertRaisesMessage(ValidationError, "Portfolio 999 no existe"):
+            trade_create(
+                portfolio_id=999,
+                dt=date(2022, 5, 15),
+                legs=[TradeLegInput(asset_code="US", side="BUY", amount_usd=Decimal("100"))],
+            )
+        self.assertFalse(TradeLeg.objects.exists())
+
+    def test_current_quantities_query_count_is_constant(self):
+        for _ in range(20):
+            TradeLeg.objects.create(
+                portfolio=self.portfolio,
+                date=date(2022, 5, 15),
+                asset=self.asset_us,
+                side=TradeLeg.BUY,
+                amount_usd=Decimal("1000"),
+            )
+
+        # snapshot (no hay) + holdings + trades + precios de trades (sin cantidad registrada)
+        with self.assertNumQueries(4):
+            quantities = _current_quantities(
+                portfolio_id=self.portfolio.id,
+                up_to_dt=date(2022, 5, 15),
+            )
+
+        self.assertEqual(quantities[self.asset_us.id], Decimal("200"))
+
+    def test_current_quantities_skip_prices_for_recorded_quantities(self):
+        for _ in range(20):
+            TradeLeg.objects.create(
+                portfolio=self.portfolio,
+                date=date(2022, 5, 15),
+                asset=self.asset_us,
+                side=TradeLeg.BUY,
+                amount_usd=Decimal("1000"),
+                executed_price=Decimal("100"),
+                quantity=Decimal("10"),
+            )
+
+        # snapshot (no hay) + holdings + trades: sin query de precios
+        with self.assertNumQueries(3):
+            quantities = _current_quantities(
+                portfolio_id=self.portfolio.id,
+                up_to_dt=date(2022, 5, 15),
+            )
+
+        self.assertEqual(quantities[self.asset_us.id], Decimal("200"))
+
+    def test_backfill_command_fills_legacy_trades(self):
+        legacy = TradeLeg.objects.create(
+            portfolio=self.portfolio,
+            date=date(2022, 5, 15),
+            asset=self.asset_us,
+            side=TradeLeg.SELL,
+            amount_usd=Decimal("250"),
+        )
+        no_price = TradeLeg.objects.create(
+            portfolio=self.portfolio,
+            date=date(2022, 5, 16),
+            asset=self.asset_us,
+            side=TradeLeg.BUY,
+            amount_usd=Decimal("250"),
+        )
+
+        out, err = StringIO(), StringIO()
+        call_command("backfill_trade_quantities", "--batch-size", "1", stdout=out, stderr=err)
+
+        legacy.refresh_from_db()
+        no_price.refresh_from_db()
+        self.assertEqual((legacy.executed_price, legacy.quantity), (Decimal("100"), Decimal("2.5")))
+        self.assertIsNone(no_price.quantity)
+        self.assertIn("updated=1", out.getvalue())
+        self.assertIn("sin precio", err.getvalue())
+
+
+# Cada hilo usa su propia conexion: con TestCase no verian los datos del test
+@skipUnlessDBFeature("has_select_for_update")
+class TradeCreateConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        asset = Asset.objects.create(code="US", name="United States")
+        self.portfolio = Portfolio.objects.create(
+            name="Portfolio 1",
+            start_date=date(2022, 2, 15),
+            initial_value=Decimal("1000000"),
+        )
+        InitialHolding.objects.create(portfolio=self.portfolio, asset=asset, quantity=Decimal("10"))
+        Price.objects.create(asset=asset, date=date(2022, 5, 15), price=Decimal("100"))
+
+    def test_concurrent_sells_on_empty_ledger_are_serialized(self):
+        # Ledger vacio: sin el bloqueo del portafolio ambos hilos llegarian a
+        # la reconstruccion a la vez y venderian el mismo saldo
+        arrived = threading.Barrier(2)
+        rebuild = trades.position_ledger_rebuild
+
+        def rebuild_together(**kwargs):
+            try:
+                arrived.wait(timeout=1)
+            except threading.BrokenBarrierError:
+                pass
+            return rebuild(**kwargs)
+
+        outcomes = []
+
+        def sell_all():
+            try:
+                trade_create(
+                    portfolio_id=self.portfolio.id,
+                    dt=date(2022, 5, 15),
+                    legs=[TradeLegInput(asset_code="US", side="SELL", amount_usd=Decimal("1000"))],
+                )
+                outcomes.append("ok")
+            except ValidationError:
+                outcomes.append("rejected")
+            finally:
+                connection.close()
+
+        with mock.patch.object(trades, "position_ledger_rebuild", side_effect=rebuild_together):
+            threads = [threading.Thread(target=sell_all) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(outcomes), ["ok", "rejected"])
+        self.assertEqual(TradeLeg.objects.count(), 1)
+        self.assertEqual(PositionLedger.objects.get(portfolio=self.portfolio).quantity, Decimal("0"))
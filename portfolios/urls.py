@@ -1,15 +1,45 @@
+from django.conf import settings
 from django.urls import path
 
+from portfolios.apis.async_views import async_api
+from portfolios.executors import POOL_COMPUTE, POOL_DEFAULT
 from portfolios.views.home import HomeView
 from portfolios.apis.portfolio_timeseries import PortfolioTimeseriesApi
+from portfolios.apis.portfolios_timeseries import PortfoliosTimeseriesBatchApi
+from portfolios.apis.portfolio_analytics import PortfolioAnalyticsApi
 from portfolios.apis.portfolio_trades import PortfolioTradeCreateApi
+from portfolios.apis.trades_bulk import TradesBulkCreateApi
 from portfolios.apis.import_status import LatestImportStatusApi
+from portfolios.apis.timeseries_cache import TimeseriesCacheStatsApi
+from portfolios.apis.timeseries_jobs import (
+    PortfolioTimeseriesJobCreateApi,
+    TimeseriesJobDetailApi,
+    TimeseriesJobResultApi,
+)
 from portfolios.views.charts import PortfolioChartsView
 
+
+def api(view_class, *, pool: str = POOL_DEFAULT):
+    # Bajo ASGI (PORTFOLIOS_ASYNC_APIS) la variante async con executor acotado
+    if settings.PORTFOLIOS_ASYNC_APIS:
+        return async_api(view_class, pool=pool)
+    return view_class.as_view()
+
+
 urlpatterns = [
     path("", HomeView.as_view(), name="home"),
-    path("api/portfolios/<int:portfolio_id>/timeseries/", PortfolioTimeseriesApi.as_view()),
-    path("api/portfolios/<int:portfolio_id>/trades/", PortfolioTradeCreateApi.as_view()),
-    path("api/imports/latest/", LatestImportStatusApi.as_view()),
+    path("api/portfolios/timeseries/", api(PortfoliosTimeseriesBatchApi, pool=POOL_COMPUTE)),
+    path("api/portfolios/<int:portfolio_id>/timeseries/", api(PortfolioTimeseriesApi, pool=POOL_COMPUTE)),
+    path("api/portfolios/<int:portfolio_id>/timeseries/jobs/", api(PortfolioTimeseriesJobCreateApi)),
+    path("api/portfolios/<int:portfolio_id>/timeseries/jobs/<uuid:job_id>/", api(TimeseriesJobDetailApi)),
+    path(
+        "api/portfolios/<int:portfolio_id>/timeseries/jobs/<uuid:job_id>/result/",
+        api(TimeseriesJobResultApi),
+    ),
+    path("api/portfolios/<int:portfolio_id>/analytics/", api(PortfolioAnalyticsApi, pool=POOL_COMPUTE)),
+    path("api/portfolios/<int:portfolio_id>/trades/", api(PortfolioTradeCreateApi, pool=POOL_COMPUTE)),
+    path("api/trades/bulk/", api(TradesBulkCreateApi, pool=POOL_COMPUTE)),
+    path("api/imports/latest/", api(LatestImportStatusApi)),
+    path("api/cache/timeseries/", api(TimeseriesCacheStatsApi)),
     path("portfolios/<int:portfolio_id>/charts/", PortfolioChartsView.as_view()),
 ]